@@ -0,0 +1,147 @@
+# backend/aggregates.py
+
+# Dashboard aggregates behind /api/summary, maintained at write time. The Summary
+# subscribes to the store and, for every insert/update/delete, subtracts the old
+# record's contribution and adds the new one, so reading the dashboard never scans a
+# collection. Money is summed in integer cents so repeated add/subtract cannot drift.
+#
+# "Overdue" depends on today's date, so open tasks are kept in a sorted list of
+# (due_date, id) and the overdue count is a bisect against today's date.
+#
+# Each collection's version is tracked too. If it moves without us seeing the change
+# (another worker process writing to the SQLite backend, or a snapshot restore), that
+# collection's aggregates are rebuilt on the next read (store.catch_up). With several
+# workers on the SQLite backend, these aggregates, like the other indexes derived from
+# the store (search.py, pricing.py, indexes.py, ...), are a per-process cache: each
+# worker's copy is rebuilt in full on its first read after a sibling's write.
+
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date
+
+from store import catch_up
+
+TRACKED = ("clients", "services", "projects", "quotes", "invoices", "tasks", "bugs")
+OUTSTANDING_INVOICE_STATUSES = ("Sent", "Overdue")
+CLOSED_TASK_STATUSES = ("Completed",)
+CLOSED_BUG_STATUSES = ("Closed",)
+
+
+def _cents(amount):
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _label(value):
+    # Status/severity values come straight from request JSON; keep them usable as keys
+    return value if value is None or isinstance(value, (str, int, float)) else str(value)
+
+
+class Summary:
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self._seen = {}
+        self._counts = Counter()
+        self._status_counts = {name: Counter() for name in TRACKED}
+        self._status_cents = {name: Counter() for name in TRACKED}
+        self._open_bugs_by_severity = Counter()
+        self._open_tasks = 0
+        self._open_task_due = [] # sorted (due_date, task_id) for open tasks with a due date
+        with self._lock:
+            for name in TRACKED:
+                self._rebuild(name)
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        with self._lock:
+            if old is not None:
+                self._apply(collection_name, old, -1)
+            if new is not None:
+                self._apply(collection_name, new, 1)
+            self._seen[collection_name] += 1
+
+    def _apply(self, name, record, sign):
+        self._counts[name] += sign
+        status = _label(record.get("status"))
+        if name in ("projects", "quotes", "invoices"):
+            self._status_counts[name][status] += sign
+        if name in ("quotes", "invoices"):
+            self._status_cents[name][status] += sign * _cents(record.get("total_amount"))
+        elif name == "tasks" and status not in CLOSED_TASK_STATUSES:
+            due_date = record.get("due_date")
+            if isinstance(due_date, str) and due_date:
+                key = (due_date, record["id"])
+                if sign > 0:
+                    insort(self._open_task_due, key)
+                else:
+                    position = bisect_left(self._open_task_due, key)
+                    if position < len(self._open_task_due) and self._open_task_due[position] == key:
+                        del self._open_task_due[position]
+            self._open_tasks += sign
+        elif name == "bugs" and status not in CLOSED_BUG_STATUSES:
+            self._open_bugs_by_severity[_label(record.get("severity"))] += sign
+
+    def _rebuild(self, name):
+        # Caller holds the lock
+        version = self._db.version(name)
+        self._counts[name] = 0
+        self._status_counts[name].clear()
+        self._status_cents[name].clear()
+        if name == "tasks":
+            self._open_tasks = 0
+            self._open_task_due = []
+        elif name == "bugs":
+            self._open_bugs_by_severity.clear()
+        for record in self._db[name]:
+            self._apply(name, record, 1)
+        self._seen[name] = version
+
+    def _by_status(self, name):
+        by_status = {}
+        for status, count in self._status_counts[name].items():
+            if count > 0:
+                by_status[status] = {"count": count}
+                if name in ("quotes", "invoices"):
+                    by_status[status]["total"] = self._status_cents[name][status] / 100
+        return by_status
+
+    def snapshot(self, today=None):
+        today = (today or date.today()).isoformat()
+        catch_up(self._db, self._lock, self._seen, self._rebuild)
+        with self._lock:
+            invoice_counts = self._status_counts["invoices"]
+            invoice_cents = self._status_cents["invoices"]
+            quote_cents = self._status_cents["quotes"]
+            return {
+                "clients": {"count": self._counts["clients"]},
+                "services": {"count": self._counts["services"]},
+                "projects": {"count": self._counts["projects"], "by_status": self._by_status("projects")},
+                "quotes": {
+                    "count": self._counts["quotes"],
+                    "by_status": self._by_status("quotes"),
+                    "accepted_total": quote_cents["Accepted"] / 100,
+                    "draft_total": quote_cents["Draft"] / 100,
+                },
+                "invoices": {
+                    "count": self._counts["invoices"],
+                    "by_status": self._by_status("invoices"),
+                    "outstanding_count": sum(invoice_counts[s] for s in OUTSTANDING_INVOICE_STATUSES),
+                    "outstanding_total": sum(invoice_cents[s] for s in OUTSTANDING_INVOICE_STATUSES) / 100,
+                },
+                "tasks": {
+                    "count": self._counts["tasks"],
+                    "open": self._open_tasks,
+                    "overdue": bisect_left(self._open_task_due, (today,)),
+                },
+                "bugs": {
+                    "count": self._counts["bugs"],
+                    "open": sum(self._open_bugs_by_severity.values()),
+                    "open_by_severity": {s: n for s, n in self._open_bugs_by_severity.items() if n > 0},
+                },
+            }
@@ -0,0 +1,593 @@
+# backend/analytics.py
+
+# Columnar mirror of quotes, invoices and their line items, behind /api/reports/<name>.
+#
+# - Each of the two collections is held as two Tables of parallel array.array columns: one
+#   row per document and one per line item. Statuses are dictionary-encoded to small int
+#   codes, dates are stored as a day ordinal plus a month number (year * 12 + month - 1),
+#   and money is stored in integer cents. Line items carry their document's status and
+#   dates, so item reports need no join.
+# - The tables follow the store's mutation feed. As in aggregates.py, a collection whose
+#   version moved without us seeing the change is reloaded on the next report.
+# - A report copies the columns it needs under the lock (one memcpy per column) and
+#   computes outside it, so a scan never holds up writers. With NumPy installed, the
+#   copies are wrapped as ndarrays without another copy. Filtering uses boolean masks and
+#   grouping uses np.bincount over a combined integer key (np.unique when the key space is
+#   sparse). Without NumPy the same reports run as plain loops over the arrays.
+# - NumPy is an optional dependency, used by nothing else in the backend: `pip install
+#   numpy` turns the vectorized path on. tests/test_analytics.py checks that both paths
+#   give the same reports.
+# - Time buckets are always grouped by month first, then rolled up into quarters or years.
+#   The roll-up only touches the grouped rows.
+
+import heapq
+import math
+import threading
+from array import array
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from itertools import compress, repeat
+from operator import itemgetter
+
+from pricing import ITEM_FIELDS, MAX_CENTS, ONE, PricingError, to_cents
+from query import QueryError, parse_fields, parse_page
+from store import catch_up
+
+try:
+    import numpy
+except ImportError: # Optional (pip install numpy): the reports fall back to pure Python
+    numpy = None
+
+DATE_FIELDS = {"quotes": "quote_date", "invoices": "invoice_date"}
+DOCUMENT_COLUMNS = {"id": "q", "client": "q", "quote": "q", "status": "i", "day": "i", "month": "i", "cents": "q"}
+ITEM_COLUMNS = {"id": "q", "service": "q", "status": "i", "day": "i", "month": "i", "quantity": "d", "cents": "q"}
+INVOICED_STATUSES = ("Sent", "Paid", "Overdue")
+ACCEPTED_STATUS = "Accepted"
+DRAFT_STATUS = "Draft"
+PAID_STATUS = "Paid"
+TIME_BUCKETS = ("month", "quarter", "year")
+DENSE_KEY_SPACE = 1 << 22 # Up to this many possible keys, group with bincount instead of unique
+
+if numpy is not None:
+    DTYPES = {"q": numpy.int64, "i": numpy.int32, "d": numpy.float64}
+
+
+def _int(value):
+    # Ids are positive, so -1 stands for "none"
+    return value if isinstance(value, int) and not isinstance(value, bool) else -1
+
+
+def _label(value):
+    return value if value is None or isinstance(value, (str, int, float)) else str(value)
+
+
+def _day(value):
+    # (day ordinal, month number), or (0, -1) when the date is missing or malformed
+    try:
+        day = date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return 0, -1
+    return day.toordinal(), day.year * 12 + day.month - 1
+
+
+def _cents(amount):
+    try:
+        return to_cents(amount)
+    except PricingError:
+        return 0
+
+
+def _line(item):
+    # (quantity, amount in cents) of one line item; malformed lines count as zero
+    quantity = item.get("quantity", 1)
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or not 0 <= quantity <= MAX_CENTS:
+        return 0.0, 0
+    unit = _cents(item.get("price"))
+    if isinstance(quantity, int):
+        line = unit * quantity
+    else:
+        line = unit * Decimal(str(quantity))
+    if abs(line) > MAX_CENTS:
+        return 0.0, 0
+    if isinstance(quantity, int):
+        return float(quantity), line
+    return quantity, int(line.quantize(ONE, ROUND_HALF_UP))
+
+
+class Codes:
+    # Dictionary encoding: value <-> small int code. Codes are never reused.
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def find(self, value):
+        return self._codes.get(value)
+
+
+class Table:
+    # Parallel array.array columns. `_rows` maps a record id to the rows it owns. A delete
+    # moves the last row into the freed slot, so the columns never have holes.
+    def __init__(self, columns):
+        self.columns = {name: array(typecode) for name, typecode in columns.items()}
+        self._columns = tuple(self.columns.values())
+        self._ids = self.columns["id"]
+        self._rows = {} # record id -> [row numbers]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def put(self, record_id, rows):
+        # Replaces the record's rows; each row is a tuple of column values, id first
+        self.remove(record_id)
+        if rows:
+            positions = []
+            for row in rows:
+                positions.append(len(self._ids))
+                for column, value in zip(self._columns, row):
+                    column.append(value)
+            self._rows[record_id] = positions
+
+    def remove(self, record_id):
+        positions = self._rows.pop(record_id, None)
+        if not positions:
+            return
+        # Highest first, so the last row is never one of this record's not-yet-removed rows
+        for position in sorted(positions, reverse=True):
+            last = len(self._ids) - 1
+            if position != last:
+                moved = self._rows[self._ids[last]]
+                moved[moved.index(last)] = position
+                for column in self._columns:
+                    column[position] = column[last]
+            for column in self._columns:
+                column.pop()
+
+    def copy(self, names):
+        return {name: self.columns[name][:] for name in names}
+
+
+# --- Vectorized kernels, with pure-Python fallbacks ---
+
+def _frame(columns):
+    # The copied columns as ndarrays, sharing their memory
+    if numpy is None:
+        return columns
+    return {name: numpy.frombuffer(column, DTYPES[column.typecode]) if len(column)
+            else numpy.zeros(0, DTYPES[column.typecode]) for name, column in columns.items()}
+
+
+def _mask(frame, status_codes=None, start=None, end=None):
+    # Rows whose status is one of status_codes and whose day is in [start, end]. Returns
+    # a boolean ndarray, a list of bools without NumPy, or None when nothing is filtered.
+    if status_codes is None and start is None and end is None:
+        return None
+    status, day = frame["status"], frame["day"]
+    if numpy is not None:
+        mask = numpy.ones(len(day), bool)
+        if status_codes is not None:
+            mask &= numpy.isin(status, numpy.array(sorted(status_codes), numpy.int32))
+        if start is not None:
+            mask &= day >= start
+        if end is not None:
+            mask &= day <= end
+        return mask
+    codes = frozenset(status_codes) if status_codes is not None else None
+    start = start if start is not None else -math.inf
+    end = end if end is not None else math.inf
+    if codes is None:
+        return [start <= d <= end for d in day]
+    return [s in codes and start <= d <= end for s, d in zip(status, day)]
+
+
+def _and(mask, other):
+    if mask is None:
+        return other
+    if numpy is not None:
+        return mask & other
+    return [a and b for a, b in zip(mask, other)]
+
+
+def _group(keys, values, mask=None):
+    # Group-by over int key columns, summing each value column. Returns
+    # {key tuple: [row count, sum per value column...]}.
+    if numpy is not None:
+        return _group_numpy(keys, values, mask)
+    if mask is not None:
+        keys = [list(compress(column, mask)) for column in keys]
+        values = [list(compress(column, mask)) for column in values]
+    groups = {}
+    width = len(values)
+    for key, row in zip(zip(*keys) if keys else repeat(()), zip(*values)):
+        sums = groups.get(key)
+        if sums is None:
+            sums = groups[key] = [0] * (width + 1)
+        sums[0] += 1
+        for position in range(width):
+            sums[position + 1] += row[position]
+    return groups
+
+
+def _group_numpy(keys, values, mask):
+    if mask is not None:
+        keys = [column[mask] for column in keys]
+        values = [column[mask] for column in values]
+    length = len(values[0])
+    if not length:
+        return {}
+    # Mixed-radix key: each column is shifted to start at 0 and scaled by the spans after it
+    combined = numpy.zeros(length, numpy.int64)
+    bounds = []
+    space = 1
+    for column in keys:
+        low, high = int(column.min()), int(column.max())
+        span = high - low + 1
+        combined = combined * span + (column.astype(numpy.int64) - low)
+        bounds.append((low, span))
+        space *= span
+    if space <= max(DENSE_KEY_SPACE, 4 * length):
+        counts = numpy.bincount(combined, minlength=space)
+        present = numpy.flatnonzero(counts)
+        counts = counts[present]
+        sums = [numpy.bincount(combined, weights=column, minlength=space)[present] for column in values]
+    else:
+        present, inverse = numpy.unique(combined, return_inverse=True)
+        counts = numpy.bincount(inverse, minlength=len(present))
+        sums = [numpy.bincount(inverse, weights=column, minlength=len(present)) for column in values]
+    # bincount sums in float64: exact for integer cents below 2**53
+    sums = [numpy.rint(total).astype(numpy.int64) if column.dtype.kind in "iu" else total
+            for total, column in zip(sums, values)]
+
+    parts = []
+    rest = present
+    for low, span in reversed(bounds):
+        rest, part = numpy.divmod(rest, span)
+        parts.append((part + low).tolist())
+    parts.reverse()
+    rows = zip(counts.tolist(), *(total.tolist() for total in sums))
+    return {key: list(row) for key, row in zip(zip(*parts) if parts else repeat(()), rows)}
+
+
+def _quote_days(quote_ids, quote_days, invoice_quotes, invoice_days):
+    # Days from each invoice's quote to the invoice, and the rows where that is known
+    if numpy is not None:
+        if not len(quote_ids):
+            return numpy.zeros(len(invoice_quotes), numpy.int64), numpy.zeros(len(invoice_quotes), bool)
+        lookup = numpy.zeros(int(quote_ids.max()) + 1, numpy.int64)
+        lookup[quote_ids] = quote_days
+        found = (invoice_quotes >= 0) & (invoice_quotes < len(lookup))
+        start = numpy.zeros(len(invoice_quotes), numpy.int64)
+        start[found] = lookup[invoice_quotes[found]]
+        known = found & (start > 0) & (invoice_days > 0)
+        return invoice_days - start, known
+    lookup = dict(zip(quote_ids, quote_days))
+    start = [lookup.get(quote_id, 0) for quote_id in invoice_quotes]
+    known = [s > 0 and d > 0 for s, d in zip(start, invoice_days)]
+    return [d - s for s, d in zip(start, invoice_days)], known
+
+
+def _roll_up(groups, position, bucket):
+    # Re-keys month numbers at `position` to quarters or years (-1 stays -1), merging sums
+    rolled = {}
+    for key, sums in groups.items():
+        month = key[position]
+        if month < 0:
+            value = month
+        elif bucket == "quarter":
+            value = month // 3
+        else:
+            value = month // 12
+        key = key[:position] + (value,) + key[position + 1:]
+        target = rolled.get(key)
+        if target is None:
+            rolled[key] = list(sums)
+        else:
+            for index, value in enumerate(sums):
+                target[index] += value
+    return rolled
+
+
+# --- Reports ---
+
+class ReportQuery:
+    # Parsed query string shared by every report:
+    #   ?group=month,client  dimensions (time: month, quarter or year)
+    #   ?from=&to=           document date range, inclusive (YYYY-MM-DD)
+    #   ?status=Paid,Sent    document statuses, where the report takes them
+    #   ?order=total&limit=  sort by a measure, descending, and keep the first rows
+    def __init__(self, args, dimensions, measures):
+        self.group = parse_fields({"fields": args.get("group")}) or []
+        for dimension in self.group:
+            if dimension not in dimensions:
+                raise QueryError(f"Cannot group this report by '{dimension}'; use: {', '.join(dimensions)}")
+        if len(set(self.group)) != len(self.group) or len([d for d in self.group if d in TIME_BUCKETS]) > 1:
+            raise QueryError("'group' takes each dimension once, and at most one of month, quarter, year")
+        self.start = self._date(args, "from")
+        self.end = self._date(args, "to")
+        self.statuses = parse_fields({"fields": args.get("status")})
+        self.order = args.get("order") or "key"
+        if self.order != "key" and self.order not in measures:
+            raise QueryError(f"'order' must be 'key' or one of: {', '.join(measures)}")
+        self.limit = parse_page({"limit": args.get("limit")})[1]
+
+    @staticmethod
+    def _date(args, name):
+        value = args.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value).toordinal()
+        except ValueError:
+            raise QueryError(f"'{name}' must be a date (YYYY-MM-DD)")
+
+    def key_columns(self):
+        # Column grouped on for each dimension; time buckets all group on the month
+        return ["month" if dimension in TIME_BUCKETS else dimension for dimension in self.group]
+
+    def time_position(self):
+        for position, dimension in enumerate(self.group):
+            if dimension in TIME_BUCKETS:
+                return position
+        return None
+
+
+class Analytics:
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self._statuses = Codes()
+        self._tables = {}
+        self._seen = {}
+        with self._lock:
+            for name in ITEM_FIELDS:
+                self._rebuild(name)
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        with self._lock:
+            if new is None:
+                for table in self._tables[collection_name]:
+                    table.remove(old["id"])
+            else:
+                self._put(collection_name, new)
+            self._seen[collection_name] += 1
+
+    def _put(self, name, record):
+        # Caller holds the lock
+        documents, items = self._tables[name]
+        record_id = record["id"]
+        status = self._statuses.code(_label(record.get("status")))
+        day, month = _day(record.get(DATE_FIELDS[name]))
+        documents.put(record_id, [(record_id, _int(record.get("client_id")), _int(record.get("quote_id")),
+                                   status, day, month, _cents(record.get("total_amount")))])
+        lines = []
+        record_items = record.get(ITEM_FIELDS[name])
+        for item in record_items if isinstance(record_items, list) else ():
+            if isinstance(item, dict):
+                quantity, cents = _line(item)
+                lines.append((record_id, _int(item.get("service_id")), status, day, month, quantity, cents))
+        items.put(record_id, lines)
+
+    def _rebuild(self, name):
+        # Caller holds the lock
+        version = self._db.version(name)
+        self._tables[name] = (Table(DOCUMENT_COLUMNS), Table(ITEM_COLUMNS))
+        for record in self._db[name]:
+            self._put(name, record)
+        self._seen[name] = version
+
+    def _read(self, reads):
+        # Copies of the requested columns, all from the same state: {(collection, table): columns}
+        catch_up(self._db, self._lock, self._seen, self._rebuild)
+        with self._lock:
+            copies = {}
+            for (name, which), columns in reads.items():
+                table = self._tables[name][0 if which == "documents" else 1]
+                copies[(name, which)] = _frame(table.copy(columns))
+            return copies, list(self._statuses.values)
+
+    def _status_codes(self, statuses):
+        with self._lock:
+            return {code for code in map(self._statuses.find, statuses) if code is not None}
+
+    # Each report returns ({key: [count, sums...]}, statuses) grouped on query.key_columns()
+
+    def _revenue(self, query):
+        # Invoiced revenue: invoices in the given statuses (default Sent, Paid, Overdue)
+        codes = self._status_codes(query.statuses or INVOICED_STATUSES)
+        columns = set(query.key_columns()) | {"status", "day", "cents"}
+        copies, statuses = self._read({("invoices", "documents"): columns})
+        frame = copies[("invoices", "documents")]
+        mask = _mask(frame, codes, query.start, query.end)
+        return _group([frame[c] for c in query.key_columns()], [frame["cents"]], mask), statuses
+
+    def _services(self, query, source):
+        # Line items by service; invoices count in the invoiced statuses by default
+        statuses = query.statuses or (INVOICED_STATUSES if source == "invoices" else None)
+        codes = self._status_codes(statuses) if statuses else None
+        columns = set(query.key_columns()) | {"status", "day", "quantity", "cents"}
+        copies, statuses = self._read({(source, "items"): columns})
+        frame = copies[(source, "items")]
+        mask = _mask(frame, codes, query.start, query.end)
+        return _group([frame[c] for c in query.key_columns()], [frame["quantity"], frame["cents"]], mask), statuses
+
+    def _quote_conversion(self, query):
+        # Quotes by status within each group; the status is pivoted out by the caller
+        codes = self._status_codes(query.statuses) if query.statuses else None
+        columns = set(query.key_columns()) | {"status", "day", "cents"}
+        copies, statuses = self._read({("quotes", "documents"): columns})
+        frame = copies[("quotes", "documents")]
+        mask = _mask(frame, codes, query.start, query.end)
+        return _group([frame[c] for c in query.key_columns() + ["status"]], [frame["cents"]], mask), statuses
+
+    def _quote_to_paid(self, query):
+        # Paid invoices made from a quote: days from the quote date to the invoice date
+        codes = self._status_codes([PAID_STATUS])
+        columns = set(query.key_columns()) | {"status", "day", "quote"}
+        copies, statuses = self._read({("invoices", "documents"): columns, ("quotes", "documents"): ("id", "day")})
+        invoices, quotes = copies[("invoices", "documents")], copies[("quotes", "documents")]
+        days, known = _quote_days(quotes["id"], quotes["day"], invoices["quote"], invoices["day"])
+        mask = _and(_mask(invoices, codes, query.start, query.end), known)
+        return _group([invoices[c] for c in query.key_columns()], [days], mask), statuses
+
+    def report(self, name, args):
+        # The rows of the named report for a request's query string (raises QueryError)
+        dimensions, measures = REPORTS[name]
+        query = ReportQuery(args, dimensions, measures)
+        if name == "revenue":
+            groups, statuses = self._revenue(query)
+        elif name == "services":
+            source = args.get("source") or "invoices"
+            if source not in ITEM_FIELDS:
+                raise QueryError(f"'source' must be one of: {', '.join(ITEM_FIELDS)}")
+            groups, statuses = self._services(query, source)
+        elif name == "quote-conversion":
+            groups, statuses = self._quote_conversion(query)
+        else:
+            groups, statuses = self._quote_to_paid(query)
+
+        position = query.time_position()
+        if position is not None and query.group[position] != "month":
+            groups = _roll_up(groups, position, query.group[position])
+        if name == "quote-conversion":
+            groups = _pivot_statuses(groups, statuses)
+        totals = self._measures(name, _merge(groups.values()))
+
+        # Sort and cut on the raw int keys, so only the groups returned become rows. Ints
+        # sort in label order (-1, "none", first) except status codes, sorted by label.
+        entries = list(groups.items())
+        if "status" in query.group:
+            at = query.group.index("status")
+            entries.sort(key=lambda entry: entry[0][:at] + (_order(statuses[entry[0][at]]),) + entry[0][at + 1:])
+        else:
+            entries.sort(key=itemgetter(0))
+        if query.order != "key":
+            index = SUM_INDEX[name].get(query.order)
+            if index is not None: # A plain sum: read it without building the row
+                measure = lambda entry: entry[1][index]
+            else:
+                measure = lambda entry: self._measures(name, entry[1])[query.order] or 0
+            if query.limit is not None:
+                entries = heapq.nlargest(query.limit, entries, measure)
+            else:
+                entries.sort(key=measure, reverse=True)
+        elif query.limit is not None:
+            entries = entries[:query.limit]
+        rows = [self._row(query, key, name, sums, statuses) for key, sums in entries]
+        self._name_rows(rows, query.group)
+        return {"group": query.group, "rows": rows, "totals": totals}
+
+    def _row(self, query, key, name, sums, statuses):
+        row = {}
+        for dimension, value in zip(query.group, key):
+            if dimension == "status":
+                row["status"] = statuses[value]
+            elif dimension in ("client", "service"):
+                row[f"{dimension}_id"] = value if value >= 0 else None
+            elif value < 0: # Undated
+                row[dimension] = None
+            elif dimension == "month":
+                row["month"] = _month_label(value)
+            elif dimension == "quarter":
+                row["quarter"] = _quarter_label(value)
+            else:
+                row["year"] = value
+        row.update(self._measures(name, sums))
+        return row
+
+    @staticmethod
+    def _measures(name, sums):
+        if name == "quote-conversion":
+            by_status = sums[2] if sums else {}
+            count = sums[0] if sums else 0
+            decided = count - by_status.get(DRAFT_STATUS, 0)
+            return {"count": count, "total": (sums[1] if sums else 0) / 100, "by_status": by_status,
+                    "conversion_rate": round(by_status.get(ACCEPTED_STATUS, 0) / decided, 4) if decided else None}
+        count = sums[0] if sums else 0
+        if name == "revenue":
+            return {"count": count, "total": (sums[1] if sums else 0) / 100}
+        if name == "services":
+            return {"count": count, "quantity": sums[1] if sums else 0, "total": (sums[2] if sums else 0) / 100}
+        return {"count": count, "average_days": round(sums[1] / count, 1) if count else None}
+
+    def _name_rows(self, rows, group):
+        # Current names for the client/service ids in the returned rows only
+        for dimension, collection in (("client", "clients"), ("service", "services")):
+            if dimension in group:
+                field = f"{dimension}_id"
+                found = self._db[collection].get_many([row[field] for row in rows if row[field] is not None])
+                for row in rows:
+                    record = found.get(row[field])
+                    row[f"{dimension}_name"] = record.get("name") if record else None
+
+
+def _pivot_statuses(groups, statuses):
+    # {key + (status,): [count, cents]} -> {key: [count, cents, {status: count}]}
+    pivoted = {}
+    for key, (count, cents) in groups.items():
+        target = pivoted.get(key[:-1])
+        if target is None:
+            target = pivoted[key[:-1]] = [0, 0, {}]
+        target[0] += count
+        target[1] += cents
+        status = statuses[key[-1]]
+        target[2][status] = target[2].get(status, 0) + count
+    return pivoted
+
+
+def _merge(all_sums):
+    # Column-wise total of several groups' sums (None when there are none)
+    all_sums = list(all_sums)
+    if not all_sums:
+        return None
+    merged = []
+    for index, first in enumerate(all_sums[0]):
+        if isinstance(first, dict):
+            by_status = {}
+            for sums in all_sums:
+                for status, count in sums[index].items():
+                    by_status[status] = by_status.get(status, 0) + count
+            merged.append(by_status)
+        else:
+            merged.append(sum(map(itemgetter(index), all_sums)))
+    return merged
+
+
+@lru_cache(maxsize=4096)
+def _month_label(month):
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+@lru_cache(maxsize=1024)
+def _quarter_label(quarter):
+    return f"{quarter // 4:04d}-Q{quarter % 4 + 1}"
+
+
+def _order(label):
+    # Sort key for a status label, which may be None or not a string
+    return (label is not None, str(label))
+
+
+# Position in a group's sums of the measures that are plain sums, for ?order=
+SUM_INDEX = {
+    "revenue": {"count": 0, "total": 1},
+    "services": {"count": 0, "quantity": 1, "total": 2},
+    "quote-conversion": {"count": 0, "total": 1},
+    "quote-to-paid": {"count": 0},
+}
+REPORTS = {
+    # name: (dimensions, measures that ?order= accepts)
+    "revenue": (TIME_BUCKETS + ("client", "status"), ("count", "total")),
+    "services": (TIME_BUCKETS + ("service", "status"), ("count", "quantity", "total")),
+    "quote-conversion": (TIME_BUCKETS + ("client",), ("count", "total", "conversion_rate")),
+    "quote-to-paid": (TIME_BUCKETS + ("client",), ("count", "average_days")),
+}
@@ -1,21 +1,65 @@
 # backend/app.py
 
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, request, jsonify, session, make_response
 from flask_cors import CORS
 import os
-import smtplib
+import csv
+import hashlib
+from functools import wraps
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
+from store import Store
+from sqlite_store import SqliteStore
+from durability import Durability, SNAPSHOT_INTERVAL
+from aggregates import Summary
+from mailer import Mailer
+from search import SearchIndex, SEARCH_FIELDS, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from sessions import ServerSideSessionInterface, SqliteSessionBackend, MemorySessionBackend
+from reminders import ReminderScheduler, SqliteSentReminders, DEFAULT_LEAD_DAYS
+from enrichment import JOINS, enrich
+from fragments import FRAGMENT_CACHE_BYTES, JOIN_CHUNK, FragmentCache
+from compression import COMPRESS_MIN_BYTES, COMPRESSED_CACHE_BYTES, CompressedBodyCache, Compressor
+from jsonprovider import DEFAULT_PROVIDER, PROVIDERS
+from streaming import iter_json_array
+from changes import CHANGE_LOG_WINDOW, ChangeLog, SqliteChangeLog, parse_changes
+from bulk import COLUMNS as BULK_COLUMNS, FORMATS as BULK_FORMATS, import_rows, iter_rows, iter_export
+from indexes import QueryIndex, parse_index_query
+from query import QueryError, parse_page, parse_fields, parse_filters, filter_rows, page_rows, project
+from metrics import REGISTRY, SLOW_REQUEST_SECONDS, instrument, timed
+from pricing import PriceBook, PricingError, to_cents
+from analytics import REPORTS, Analytics
 
 app = Flask(__name__)
-CORS(app, supports_credentials=True) # Enable CORS for all origins, allow credentials
+
+# JSON encoding: JSON_PROVIDER=orjson (default when installed) or stdlib; see jsonprovider.py.
+# An unavailable choice falls back to the default.
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", DEFAULT_PROVIDER)
+app.json = PROVIDERS.get(JSON_PROVIDER, PROVIDERS[DEFAULT_PROVIDER])(app)
+CORS(app, supports_credentials=True, expose_headers=["X-Next-Cursor", "ETag"]) # Enable CORS for all origins, allow credentials
 app.secret_key = os.urandom(24) # Secret key for session management
 
+# Per-route latency/size/status metrics (see metrics.py), served at /metrics.
+# METRICS_ENABLED=0 turns the request hooks off; SLOW_REQUEST_MS sets the slow-request log threshold.
+if os.environ.get("METRICS_ENABLED", "1") != "0":
+    instrument(app, float(os.environ.get("SLOW_REQUEST_MS", SLOW_REQUEST_SECONDS * 1e3)) / 1e3)
+
+# Sessions are kept server-side (see sessions.py); the cookie only carries a random id, so
+# any worker process can serve any user and logins survive restarts.
+# SESSION_BACKEND=sqlite (default, stored in SESSION_DB) or memory (single process only).
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")
+SESSION_DB = os.environ.get("SESSION_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"))
+if SESSION_BACKEND == "memory":
+    app.session_interface = ServerSideSessionInterface(MemorySessionBackend())
+else:
+    app.session_interface = ServerSideSessionInterface(SqliteSessionBackend(SESSION_DB))
+
 # In-memory "database" for demonstration purposes
 # In a real application, you would use a proper database (e.g., PostgreSQL, MySQL, MongoDB)
 # and an ORM (e.g., SQLAlchemy, Peewee, PonyORM) for data management.
-db = {
+# The seed data below is loaded into an indexed Store (see store.py) so lookups by id are O(1).
+seed_data = {
     "users": [
         {"id": 1, "username": "admin", "password": "password123", "role": "admin"},
         {"id": 2, "username": "demo", "password": "demo", "role": "demo"} # Added demo user
@@ -135,9 +179,65 @@ db = {
     ]
 }
 
-# Helper to find next ID for a collection
+# Storage backend is picked by config: STORAGE_BACKEND=memory (default) or sqlite.
+# The SQLite file defaults to backend/store.db and can be moved with SQLITE_PATH.
+# The memory backend becomes durable when WAL_DIR is set (write-ahead log + snapshots).
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "store.db"))
+WAL_DIR = os.environ.get("WAL_DIR")
+
+durability = None
+if STORAGE_BACKEND == "sqlite":
+    db = SqliteStore(SQLITE_PATH, seed_data)
+else:
+    db = Store(seed_data)
+    if WAL_DIR:
+        snapshot_interval = int(os.environ.get("SNAPSHOT_INTERVAL", SNAPSHOT_INTERVAL))
+        durability = Durability(WAL_DIR, snapshot_interval).recover(db).start()
+
+# Dashboard aggregates, kept up to date by every create/update/delete
+summary = Summary(db)
+
+# Full-text index behind /api/search, kept up to date the same way
+search_index = SearchIndex(db)
+
+# Service price table for server-side quote/invoice totals (see pricing.py)
+price_book = PriceBook(db)
+
+# Columnar mirror of quotes and invoices behind /api/reports (see analytics.py)
+analytics = Analytics(db)
+
+# Change log behind /api/changes (see changes.py), holding the latest change of at most
+# CHANGE_LOG_WINDOW records. With SQLite it is a table shared by every worker process.
+change_log_window = int(os.environ.get("CHANGE_LOG_WINDOW", CHANGE_LOG_WINDOW))
+if STORAGE_BACKEND == "sqlite":
+    change_log = SqliteChangeLog(db, change_log_window)
+else:
+    change_log = ChangeLog(db, change_log_window)
+
+# Secondary indexes behind the filter and sort parameters of the list GETs (see indexes.py)
+query_index = QueryIndex(db)
+
+# Encoded-row cache for the list responses (see fragments.py), capped at FRAGMENT_CACHE_MB
+# (0 turns it off). SQLite reads return new dicts every time, so it is memory-backend only.
+FRAGMENT_CACHE_MB = float(os.environ.get("FRAGMENT_CACHE_MB", FRAGMENT_CACHE_BYTES / 2**20))
+fragments = None
+if STORAGE_BACKEND != "sqlite" and FRAGMENT_CACHE_MB > 0:
+    fragments = FragmentCache(db, app.json.dumpb, int(FRAGMENT_CACHE_MB * 2**20))
+
+# gzip/brotli compression of JSON, NDJSON and CSV responses (see compression.py).
+# COMPRESS=0 turns it off; COMPRESS_MIN_BYTES is the smallest body worth compressing, and
+# COMPRESSED_CACHE_MB caps the cache of compressed conditional-GET bodies (0 turns it off).
+compressor = None
+if os.environ.get("COMPRESS", "1") != "0":
+    COMPRESSED_CACHE_MB = float(os.environ.get("COMPRESSED_CACHE_MB", COMPRESSED_CACHE_BYTES / 2**20))
+    compressed_bodies = CompressedBodyCache(int(COMPRESSED_CACHE_MB * 2**20)) if COMPRESSED_CACHE_MB > 0 else None
+    compressor = Compressor(int(os.environ.get("COMPRESS_MIN_BYTES", COMPRESS_MIN_BYTES)), compressed_bodies)
+    app.after_request(compressor.after_request)
+
+# Helper to allocate the next ID for a collection (monotonic per-collection sequence)
 def get_next_id(collection_name):
-    return max([item['id'] for item in db[collection_name]], default=0) + 1
+    return db[collection_name].next_id()
 
 #--- Authentication Endpoints
 @app.route('/api/login', methods=['POST'])
@@ -146,7 +246,7 @@ def login():
     username = data.get('username')
     password = data.get('password')
 
-    user = next((u for u in db["users"] if u["username"] == username and u["password"] == password), None)
+    user = db["users"].find(lambda u: u["username"] == username and u["password"] == password)
 
     if user:
         session['logged_in'] = True
@@ -160,12 +260,12 @@ def login():
 @app.route('/api/demo_login', methods=['POST'])
 def demo_login():
     # Simulate a demo user login
-    demo_user = next((u for u in db["users"] if u["role"] == "demo"), None)
+    demo_user = db["users"].find(lambda u: u["role"] == "demo")
     if not demo_user:
         # Create a demo user if it doesn't exist (should ideally be seeded)
         new_id = get_next_id("users")
         demo_user = {"id": new_id, "username": "demo", "password": "demo", "role": "demo"}
-        db["users"].append(demo_user)
+        db["users"].insert(demo_user)
 
     session['logged_in'] = True
     session['user_id'] = demo_user['id']
@@ -189,15 +289,120 @@ def is_logged_in():
 def is_demo_user():
     return session.get('is_demo', False)
 
+# Helper to pick the stored rows a read returns: optional equality filters, then keyset
+# pagination. Returns (rows, next_cursor).
+def select_rows(view, collection_name, after=None, limit=None, filters=None):
+    collection = view[collection_name]
+    next_cursor = None
+    if filters:
+        with timed(f"scan.{collection_name}"):
+            rows = filter_rows(collection.all(), filters)
+        if limit is not None:
+            rows, next_cursor = page_rows(rows, after, limit)
+    elif limit is None:
+        with timed(f"scan.{collection_name}"):
+            rows = collection.all()
+    else:
+        rows, next_cursor = collection.page(after, limit)
+    return rows, next_cursor
+
+# Helper to read one collection: select_rows(), then enrichment of just the rows being
+# returned, then projection. Returns (rows, next_cursor).
+# `view` is what db.consistent_read() yields, for reads that must see one point in time
+def read_collection(collection_name, after=None, limit=None, fields=None, filters=None, cache=None, view=None):
+    view = db if view is None else view
+    rows, next_cursor = select_rows(view, collection_name, after, limit, filters)
+    return project(enrich(view, collection_name, rows, cache), fields), next_cursor
+
+# Helper to encode stored rows as they appear in a list body (enriched, projected), as
+# compact JSON bytes per row. Full rows come from the fragment cache when there is one.
+# Rows are joined a chunk at a time, like the cache does, to keep garbage collection cheap.
+def encode_rows(collection_name, rows, fields=None):
+    if fields is None and fragments is not None:
+        return fragments.encode(db, collection_name, rows)
+    encoded = []
+    for start in range(0, len(rows), JOIN_CHUNK):
+        chunk = project(enrich(db, collection_name, rows[start:start + JOIN_CHUNK]), fields)
+        encoded.extend(app.json.dumpb(row) for row in chunk)
+    return encoded
+
+# Helper for collection GETs: ?after=&limit= pagination, ?fields= projection, filters
+# and sort= (answered from the secondary indexes, see indexes.py) and ?stream=1, which
+# sends the JSON array in chunks instead of building it in memory
+def list_collection(collection_name):
+    try:
+        after, limit = parse_page(request.args)
+        fields = parse_fields(request.args)
+        query = parse_index_query(collection_name, request.args)
+    except QueryError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if query is not None:
+        # Only the matching records are read, so there is nothing to gain from streaming
+        try:
+            with timed(f"query.{collection_name}"):
+                rows, next_cursor = query_index.select(collection_name, query, after, limit)
+        except QueryError as e:
+            return jsonify({"message": str(e)}), 400
+    elif request.args.get("stream") in ("1", "true"):
+        # The headers go out before the last row is read, so a streamed response cannot
+        # carry X-Next-Cursor: it is always the whole collection, never a page
+        if after is not None or limit is not None:
+            return jsonify({"message": "'stream' cannot be combined with 'after' or 'limit'"}), 400
+        encode = lambda rows: encode_rows(collection_name, rows, fields)
+        chunks = iter_json_array(db, collection_name, encode)
+        return Response(chunks, mimetype="application/json"), 200
+    else:
+        rows, next_cursor = select_rows(db, collection_name, after, limit)
+
+    # The body jsonify would send outside debug mode, joined from per-row encodings
+    body = b"[" + b",".join(encode_rows(collection_name, rows, fields)) + b"]\n"
+    response = app.response_class(body, mimetype="application/json")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response, 200
+
+# Helper to build an ETag from the versions of every collection a response reads, plus the
+# URL (pagination and projection change the body)
+def data_etag(collection_names):
+    versions = ",".join(f"{name}:{db.version(name)}" for name in collection_names)
+    key = f"{db.epoch}|{versions}|{request.full_path}"
+    return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+# Decorator for GET routes: answers 304 straight from the version counters, before any
+# lookup, enrichment or serialization, when the client already has the current data.
+# Otherwise a compressed body cached at the same ETag is sent as it is.
+def conditional_get(*collection_names):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not is_logged_in():
+                return view(*args, **kwargs)
+            etag = data_etag(collection_names)
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                cached = compressor.cached(etag) if compressor is not None else None
+                response = make_response(cached if cached is not None else view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache" # Always revalidate
+            return response
+        return wrapper
+    return decorator
+
 # NEW: User Endpoints (for total user count - kept for potential future use, but not directly used in frontend summary now)
 @app.route('/api/users', methods=['GET'])
+@conditional_get("users")
 def get_users():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
-    return jsonify(db["users"]), 200
+    return list_collection("users")
 
 #--- Client Endpoints ---
 @app.route('/api/clients', methods=['GET', 'POST'])
+@conditional_get("clients")
 def clients():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -214,17 +419,18 @@ def clients():
             "company": data.get("company"),
             "notes": data.get("notes")
         }
-        db["clients"].append(new_client)
+        db["clients"].insert(new_client)
         return jsonify({"message": "Client added successfully", "client": new_client}), 201
     else: # GET
-        return jsonify(db["clients"]), 200
+        return list_collection("clients")
 
 @app.route('/api/clients/<int:client_id>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get("clients")
 def client_detail(client_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
 
-    client = next((c for c in db["clients"] if c["id"] == client_id), None)
+    client = db["clients"].get(client_id)
     if not client:
         return jsonify({"message": "Client not found"}), 404
 
@@ -232,7 +438,7 @@ def client_detail(client_id):
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        client.update({
+        client = db["clients"].update(client_id, {
             "name": data.get("name", client["name"]),
             "email": data.get("email", client["email"]),
             "phone": data.get("phone", client["phone"]),
@@ -243,20 +449,16 @@ def client_detail(client_id):
     elif request.method == 'DELETE':
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
-        db["clients"] = [c for c in db["clients"] if c["id"] != client_id]
-        # Also remove any quotes, projects, invoices associated with this client
-        db["quotes"] = [q for q in db["quotes"] if q["client_id"] != client_id]
-        db["projects"] = [p for p in db["projects"] if p["client_id"] != client_id]
-        db["invoices"] = [i for i in db["invoices"] if i["client_id"] != client_id]
-        # Also remove tasks and bugs associated with projects of this client (indirectly)
-        # For simplicity in this in-memory DB, direct deletion of client-related tasks/bugs is complex
-        # A real DB would handle cascading deletes.
+        # Also removes the client's quotes, projects and invoices, and the tasks and bugs
+        # of those projects (see CASCADES in store.py)
+        db.delete_cascade("clients", client_id)
         return jsonify({"message": "Client deleted successfully"}), 200
     else: # GET
         return jsonify(client), 200
 
 # --- Service Endpoints ---
 @app.route('/api/services', methods=['GET', 'POST'])
+@conditional_get("services")
 def services():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -272,27 +474,44 @@ def services():
             "price": float(data.get("price")),
             "unit": data.get("unit")
         }
-        db["services"].append(new_service)
+        db["services"].insert(new_service)
         return jsonify({"message": "Service added successfully", "service": new_service}), 201
     else: # GET
-        return jsonify(db["services"]), 200
+        return list_collection("services")
 
-@app.route('/api/services/<int:service_id>', methods=['DELETE'])
+@app.route('/api/services/<int:service_id>', methods=['PUT', 'DELETE'])
 def service_detail(service_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
     if is_demo_user():
         return jsonify({"message": "Write operations are disabled in demo mode."}), 403
 
-    service = next((s for s in db["services"] if s["id"] == service_id), None)
+    service = db["services"].get(service_id)
     if not service:
         return jsonify({"message": "Service not found"}), 404
 
-    db["services"] = [s for s in db["services"] if s["id"] != service_id]
+    if request.method == 'PUT':
+        data = request.get_json()
+        try:
+            price = to_cents(data.get("price", service["price"])) / 100
+        except PricingError as e:
+            return jsonify({"message": str(e)}), 400
+        service = db["services"].update(service_id, {
+            "name": data.get("name", service["name"]),
+            "description": data.get("description", service["description"]),
+            "price": price,
+            "unit": data.get("unit", service["unit"])
+        })
+        # Draft quotes and invoices follow the current price list
+        repriced = price_book.reprice_service(service_id)
+        return jsonify({"message": "Service updated successfully", "service": service, "repriced": repriced}), 200
+
+    db["services"].delete(service_id)
     return jsonify({"message": "Service deleted successfully"}), 200
 
 #--- Quote Endpoints ---
 @app.route('/api/quotes', methods=['GET', 'POST'])
+@conditional_get("quotes", "clients")
 def quotes():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -301,40 +520,39 @@ def quotes():
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        client = next((c for c in db["clients"] if c["id"] == data.get("client_id")), None)
+        client = db["clients"].get(data.get("client_id"))
         if not client:
             return jsonify({"message": "Client not found"}), 400
 
         new_quote = {
-            "id": get_next_id("quotes"),
+            "id": None,
             "client_id": data.get("client_id"),
             "client_name": client["name"],
             "client_company": client.get("company"),
             "quote_date": data.get("quote_date"),
             "status": data.get("status"),
-            "total_amount": float(data.get("total_amount")),
+            "total_amount": None, # Computed from the items below, not taken from the request
             "notes": data.get("notes"),
             "quote_items": data.get("quote_items", []) # Ensure items are included
         }
-        db["quotes"].append(new_quote)
+        try:
+            new_quote.update(price_book.price_document("quotes", new_quote))
+        except PricingError as e:
+            return jsonify({"message": str(e)}), 400
+        new_quote["id"] = get_next_id("quotes")
+        db["quotes"].insert(new_quote)
         return jsonify({"message": "Quote created successfully", "quote": new_quote}), 201
     else: # GET
         # For GET, enrich quotes with client company if available
-        enriched_quotes = []
-        for quote in db["quotes"]:
-            client = next((c for c in db["clients"] if c["id"] == quote["client_id"]), None)
-            if client:
-                enriched_quotes.append({**quote, "client_company": client.get("company")})
-            else:
-                enriched_quotes.append(quote) # Append as is if client not found
-        return jsonify(enriched_quotes), 200
+        return list_collection("quotes")
 
 @app.route('/api/quotes/<int:quote_id>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get("quotes", "clients")
 def quote_detail(quote_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
 
-    quote = next((q for q in db["quotes"] if q["id"] == quote_id), None)
+    quote = db["quotes"].get(quote_id)
     if not quote:
         return jsonify({"message": "Quote not found"}), 404
 
@@ -342,35 +560,42 @@ def quote_detail(quote_id):
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        client = next((c for c in db["clients"] if c["id"] == data.get("client_id")), None)
+        client = db["clients"].get(data.get("client_id"))
         if not client:
             return jsonify({"message": "Client not found"}), 400
 
-        quote.update({
+        changes = {
             "client_id": data.get("client_id", quote["client_id"]),
             "client_name": client["name"],
             "client_company": client.get("company"),
             "quote_date": data.get("quote_date", quote["quote_date"]),
             "status": data.get("status", quote["status"]),
-            "total_amount": float(data.get("total_amount", quote["total_amount"])),
             "notes": data.get("notes", quote["notes"]),
             "quote_items": data.get("quote_items", quote["quote_items"])
-        })
+        }
+        try:
+            changes.update(price_book.price_document("quotes", changes))
+        except PricingError as e:
+            return jsonify({"message": str(e)}), 400
+        quote = db["quotes"].update(quote_id, changes)
         return jsonify({"message": "Quote updated successfully", "quote": quote}), 200
     elif request.method == 'DELETE':
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
-        db["quotes"] = [q for q in db["quotes"] if q["id"] != quote_id]
+        db["quotes"].delete(quote_id)
         return jsonify({"message": "Quote deleted successfully"}), 200
     else: # GET
-        # Enrich quote with client company if available
-        client = next((c for c in db["clients"] if c["id"] == quote["client_id"]), None)
+        # Enrich a copy of the quote with client company if available (stored records are
+        # shared with concurrent readers and never modified in place)
+        quote = dict(quote)
+        client = db["clients"].get(quote["client_id"])
         if client:
             quote["client_company"] = client.get("company")
         return jsonify(quote), 200
 
 # --- Project Endpoints ---
 @app.route('/api/projects', methods=['GET', 'POST'])
+@conditional_get("projects", "clients")
 def projects():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -379,7 +604,7 @@ def projects():
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        client = next((c for c in db["clients"] if c["id"] == data.get("client_id")), None)
+        client = db["clients"].get(data.get("client_id"))
         new_project = {
             "id": get_next_id("projects"),
             "project_name": data.get("project_name"),
@@ -392,25 +617,19 @@ def projects():
             "status": data.get("status"),
             "notes": data.get("notes")
         }
-        db["projects"].append(new_project)
+        db["projects"].insert(new_project)
         return jsonify({"message": "Project added successfully", "project": new_project}), 201
     else: # GET
         # Enrich projects with client name/company
-        enriched_projects = []
-        for project in db["projects"]:
-            client = next((c for c in db["clients"] if c["id"] == project["client_id"]), None)
-            if client:
-                enriched_projects.append({**project, "client_name": client["name"], "client_company": client.get("company")})
-            else:
-                enriched_projects.append(project) # Append as is if client not found
-        return jsonify(enriched_projects), 200
+        return list_collection("projects")
 
 @app.route('/api/projects/<int:project_id>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get("projects", "clients")
 def project_detail(project_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
 
-    project = next((p for p in db["projects"] if p["id"] == project_id), None)
+    project = db["projects"].get(project_id)
     if not project:
         return jsonify({"message": "Project not found"}), 404
 
@@ -418,9 +637,9 @@ def project_detail(project_id):
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        client = next((c for c in db["clients"] if c["id"] == data.get("client_id")), None)
+        client = db["clients"].get(data.get("client_id"))
 
-        project.update({
+        project = db["projects"].update(project_id, {
             "project_name": data.get("project_name", project["project_name"]),
             "client_id": data.get("client_id", project["client_id"]),
             "client_name": client["name"] if client else project.get("client_name"),
@@ -435,14 +654,12 @@ def project_detail(project_id):
     elif request.method == 'DELETE':
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
-        db["projects"] = [p for p in db["projects"] if p["id"] != project_id]
-        # Also remove associated tasks and bugs
-        db["tasks"] = [t for t in db["tasks"] if t["project_id"] != project_id]
-        db["bugs"] = [b for b in db["bugs"] if b["project_id"] != project_id]
+        db.delete_cascade("projects", project_id) # Also removes its tasks and bugs
         return jsonify({"message": "Project deleted successfully"}), 200
     else: # GET
-        # Enrich project with client name/company
-        client = next((c for c in db["clients"] if c["id"] == project["client_id"]), None)
+        # Enrich a copy of the project with client name/company
+        project = dict(project)
+        client = db["clients"].get(project["client_id"])
         if client:
             project["client_name"] = client["name"]
             project["client_company"] = client.get("company")
@@ -450,6 +667,7 @@ def project_detail(project_id):
 
 # --- Invoice Endpoints ---
 @app.route('/api/invoices', methods=['GET', 'POST'])
+@conditional_get("invoices", "clients", "projects")
 def invoices():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -459,15 +677,15 @@ def invoices():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
 
-        client = next((c for c in db["clients"] if c["id"] == data.get("client_id")), None)
+        client = db["clients"].get(data.get("client_id"))
         if not client:
             return jsonify({"message": "Client not found"}), 400
         
-        quote = next((q for q in db["quotes"] if q["id"] == data.get("quote_id")), None)
-        project = next((p for p in db["projects"] if p["id"] == data.get("project_id")), None)
+        quote = db["quotes"].get(data.get("quote_id"))
+        project = db["projects"].get(data.get("project_id"))
 
         new_invoice = {
-            "id": get_next_id("invoices"),
+            "id": None,
             "client_id": data.get("client_id"),
             "client_name": client["name"],
             "client_company": client.get("company"),
@@ -477,37 +695,28 @@ def invoices():
             "invoice_date": data.get("invoice_date"),
             "due_date": data.get("due_date"),
             "status": data.get("status"),
-            "total_amount": float(data.get("total_amount")),
+            "total_amount": None, # Computed from the items below, not taken from the request
             "notes": data.get("notes"),
             "invoice_items": data.get("invoice_items", [])
         }
-        db["invoices"].append(new_invoice)
+        try:
+            new_invoice.update(price_book.price_document("invoices", new_invoice))
+        except PricingError as e:
+            return jsonify({"message": str(e)}), 400
+        new_invoice["id"] = get_next_id("invoices")
+        db["invoices"].insert(new_invoice)
         return jsonify({"message": "Invoice created successfully", "invoice": new_invoice}), 201
     else: # GET
         # Enrich invoices with client, quote, and project details
-        enriched_invoices = []
-        for invoice in db["invoices"]:
-            client = next((c for c in db["clients"] if c["id"] == invoice["client_id"]), None)
-            quote = next((q for q in db["quotes"] if q["id"] == invoice.get("quote_id")), None)
-            project = next((p for p in db["projects"] if p["id"] == invoice.get("project_id")), None)
-
-            enriched_invoice = {**invoice}
-            if client:
-                enriched_invoice["client_name"] = client["name"]
-                enriched_invoice["client_company"] = client.get("company")
-            if quote:
-                enriched_invoice["quote_id"] = quote["id"] # Ensure quote_id is present if linked
-            if project:
-                enriched_invoice["project_name"] = project["project_name"]
-            enriched_invoices.append(enriched_invoice)
-        return jsonify(enriched_invoices), 200
+        return list_collection("invoices")
 
 @app.route('/api/invoices/<int:invoice_id>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get("invoices", "clients", "quotes", "projects")
 def invoice_detail(invoice_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
 
-    invoice = next((i for i in db["invoices"] if i["id"] == invoice_id), None)
+    invoice = db["invoices"].get(invoice_id)
     if not invoice:
         return jsonify({"message": "Invoice not found"}), 404
 
@@ -516,14 +725,14 @@ def invoice_detail(invoice_id):
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
 
-        client = next((c for c in db["clients"] if c["id"] == data.get("client_id")), None)
+        client = db["clients"].get(data.get("client_id"))
         if not client:
             return jsonify({"message": "Client not found"}), 400
         
-        quote = next((q for q in db["quotes"] if q["id"] == data.get("quote_id")), None)
-        project = next((p for p in db["projects"] if p["id"] == data.get("project_id")), None)
+        quote = db["quotes"].get(data.get("quote_id"))
+        project = db["projects"].get(data.get("project_id"))
 
-        invoice.update({
+        changes = {
             "client_id": data.get("client_id", invoice["client_id"]),
             "client_name": client["name"],
             "client_company": client.get("company"),
@@ -533,31 +742,37 @@ def invoice_detail(invoice_id):
             "invoice_date": data.get("invoice_date", invoice["invoice_date"]),
             "due_date": data.get("due_date", invoice["due_date"]),
             "status": data.get("status", invoice["status"]),
-            "total_amount": float(data.get("total_amount", invoice["total_amount"])),
             "notes": data.get("notes", invoice["notes"]),
             "invoice_items": data.get("invoice_items", invoice["invoice_items"])
-        })
+        }
+        try:
+            changes.update(price_book.price_document("invoices", changes))
+        except PricingError as e:
+            return jsonify({"message": str(e)}), 400
+        invoice = db["invoices"].update(invoice_id, changes)
         return jsonify({"message": "Invoice updated successfully", "invoice": invoice}), 200
     elif request.method == 'DELETE':
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
-        db["invoices"] = [i for i in db["invoices"] if i["id"] != invoice_id]
+        db["invoices"].delete(invoice_id)
         return jsonify({"message": "Invoice deleted successfully"}), 200
     else: # GET
-        client = next((c for c in db["clients"] if c["id"] == invoice["client_id"]), None)
+        invoice = dict(invoice) # Enriched copy
+        client = db["clients"].get(invoice["client_id"])
         if client:
             invoice["client_name"] = client["name"]
             invoice["client_company"] = client.get("company")
-        quote = next((q for q in db["quotes"] if q["id"] == invoice.get("quote_id")), None)
+        quote = db["quotes"].get(invoice.get("quote_id"))
         if quote:
             invoice["quote_id"] = quote["id"]
-        project = next((p for p in db["projects"] if p["id"] == invoice.get("project_id")), None)
+        project = db["projects"].get(invoice.get("project_id"))
         if project:
             invoice["project_name"] = project["project_name"]
         return jsonify(invoice), 200
 
 # NEW: Task Endpoints
 @app.route('/api/tasks', methods=['GET', 'POST'])
+@conditional_get("tasks", "projects")
 def tasks():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -566,7 +781,7 @@ def tasks():
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        project = next((p for p in db["projects"] if p["id"] == data.get("project_id")), None)
+        project = db["projects"].get(data.get("project_id"))
         if not project:
             return jsonify({"message": "Project not found for task"}), 400
 
@@ -582,25 +797,19 @@ def tasks():
             "priority": data.get("priority"),
             "progress": data.get("progress", 0)
         }
-        db["tasks"].append(new_task)
+        db["tasks"].insert(new_task)
         return jsonify({"message": "Task added successfully", "task": new_task}), 201
     else: # GET
         # Enrich tasks with project and client names
-        enriched_tasks = []
-        for task in db["tasks"]:
-            project = next((p for p in db["projects"] if p["id"] == task["project_id"]), None)
-            if project:
-                enriched_tasks.append({**task, "project_name": project["project_name"], "client_name": project.get("client_name")})
-            else:
-                enriched_tasks.append(task) # Append as is if project not found
-        return jsonify(enriched_tasks), 200
+        return list_collection("tasks")
 
 @app.route('/api/tasks/<int:task_id>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get("tasks", "projects")
 def task_detail(task_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
 
-    task = next((t for t in db["tasks"] if t["id"] == task_id), None)
+    task = db["tasks"].get(task_id)
     if not task:
         return jsonify({"message": "Task not found"}), 404
 
@@ -608,11 +817,11 @@ def task_detail(task_id):
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        project = next((p for p in db["projects"] if p["id"] == data.get("project_id")), None)
+        project = db["projects"].get(data.get("project_id"))
         if not project:
             return jsonify({"message": "Project not found for task"}), 400
 
-        task.update({
+        task = db["tasks"].update(task_id, {
             "project_id": data.get("project_id", task["project_id"]),
             "project_name": project["project_name"],
             "client_name": project.get("client_name"),
@@ -627,10 +836,11 @@ def task_detail(task_id):
     elif request.method == 'DELETE':
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
-        db["tasks"] = [t for t in db["tasks"] if t["id"] != task_id]
+        db["tasks"].delete(task_id)
         return jsonify({"message": "Task deleted successfully"}), 200
     else: # GET
-        project = next((p for p in db["projects"] if p["id"] == task["project_id"]), None)
+        task = dict(task) # Enriched copy
+        project = db["projects"].get(task["project_id"])
         if project:
             task["project_name"] = project["project_name"]
             task["client_name"] = project.get("client_name")
@@ -638,6 +848,7 @@ def task_detail(task_id):
 
 # NEW: Bug Endpoints
 @app.route('/api/bugs', methods=['GET', 'POST'])
+@conditional_get("bugs", "projects")
 def bugs():
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
@@ -646,7 +857,7 @@ def bugs():
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        project = next((p for p in db["projects"] if p["id"] == data.get("project_id")), None)
+        project = db["projects"].get(data.get("project_id"))
         if not project:
             return jsonify({"message": "Project not found for bug"}), 400
 
@@ -660,25 +871,19 @@ def bugs():
             "status": data.get("status"),
             "reported_date": data.get("reported_date")
         }
-        db["bugs"].append(new_bug)
+        db["bugs"].insert(new_bug)
         return jsonify({"message": "Bug added successfully", "bug": new_bug}), 201
     else: # GET
         # Enrich bugs with project and client names
-        enriched_bugs = []
-        for bug in db["bugs"]:
-            project = next((p for p in db["projects"] if p["id"] == bug["project_id"]), None)
-            if project:
-                enriched_bugs.append({**bug, "project_name": project["project_name"], "client_name": project.get("client_name")})
-            else:
-                enriched_bugs.append(bug) # Append as is if project not found
-        return jsonify(enriched_bugs), 200
+        return list_collection("bugs")
 
 @app.route('/api/bugs/<int:bug_id>', methods=['GET', 'PUT', 'DELETE'])
+@conditional_get("bugs", "projects")
 def bug_detail(bug_id):
     if not is_logged_in():
         return jsonify({"message": "Unauthorized"}), 401
 
-    bug = next((b for b in db["bugs"] if b["id"] == bug_id), None)
+    bug = db["bugs"].get(bug_id)
     if not bug:
         return jsonify({"message": "Bug not found"}), 404
 
@@ -686,11 +891,11 @@ def bug_detail(bug_id):
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
         data = request.get_json()
-        project = next((p for p in db["projects"] if p["id"] == data.get("project_id")), None)
+        project = db["projects"].get(data.get("project_id"))
         if not project:
             return jsonify({"message": "Project not found for bug"}), 400
 
-        bug.update({
+        bug = db["bugs"].update(bug_id, {
             "project_id": data.get("project_id", bug["project_id"]),
             "project_name": project["project_name"],
             "client_name": project.get("client_name"),
@@ -703,15 +908,201 @@ def bug_detail(bug_id):
     elif request.method == 'DELETE':
         if is_demo_user():
             return jsonify({"message": "Write operations are disabled in demo mode."}), 403
-        db["bugs"] = [b for b in db["bugs"] if b["id"] != bug_id]
+        db["bugs"].delete(bug_id)
         return jsonify({"message": "Bug deleted successfully"}), 200
     else: # GET
-        project = next((p for p in db["projects"] if p["id"] == bug["project_id"]), None)
+        bug = dict(bug) # Enriched copy
+        project = db["projects"].get(bug["project_id"])
         if project:
             bug["project_name"] = project["project_name"]
             bug["client_name"] = project.get("client_name")
         return jsonify(bug), 200
 
+# --- Batch Read Endpoint ---
+# Serves several collection reads in one request, e.g. everything the invoices page needs:
+#   {"queries": [{"collection": "invoices", "filters": {"status": "Sent"}, "limit": 50},
+#                {"collection": "clients", "fields": ["id", "name"]}, ...]}
+# Each query may also set "after" and a "key" (defaults to the collection name) under which
+# its rows are returned. All queries read one consistent snapshot and share enrichment lookups.
+BATCH_COLLECTIONS = ("users", "clients", "services", "quotes", "projects", "invoices", "tasks", "bugs")
+MAX_BATCH_QUERIES = 20
+
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    queries = data.get("queries")
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"message": "'queries' must be a non-empty list"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"message": f"At most {MAX_BATCH_QUERIES} queries per batch"}), 400
+
+    plans = []
+    for query in queries:
+        if not isinstance(query, dict) or query.get("collection") not in BATCH_COLLECTIONS:
+            return jsonify({"message": "Each query needs a known 'collection'"}), 400
+        try:
+            after, limit = parse_page(query)
+            plans.append((str(query.get("key") or query["collection"]), query["collection"], after, limit,
+                          parse_fields(query), parse_filters(query.get("filters"))))
+        except QueryError as e:
+            return jsonify({"message": str(e)}), 400
+
+    results, cursors, cache = {}, {}, {}
+    # Only the queried collections and their join parents are frozen for the batch
+    names = {plan[1] for plan in plans} | {join[1] for plan in plans for join in JOINS.get(plan[1], ())}
+    with db.consistent_read(*names) as view:
+        for key, collection_name, after, limit, fields, filters in plans:
+            rows, next_cursor = read_collection(collection_name, after, limit, fields, filters, cache, view)
+            results[key] = rows
+            if next_cursor is not None:
+                cursors[key] = next_cursor
+    return jsonify({"results": results, "cursors": cursors}), 200
+
+# --- Dashboard Summary Endpoint ---
+# Outstanding invoice totals, quote value by status, overdue tasks and open bugs by
+# severity, read from aggregates maintained at write time (O(1) in the data size)
+@app.route('/api/summary', methods=['GET'])
+def get_summary():
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    return jsonify(summary.snapshot()), 200
+
+# --- Reports ---
+# GET /api/reports/<name>?group=month,client&from=2024-01-01&to=2024-12-31&status=Paid
+#   revenue           invoiced revenue (Sent, Paid, Overdue by default)
+#   services          line items by service (?source=invoices|quotes)
+#   quote-conversion  quotes by status and the share accepted of those no longer in Draft
+#   quote-to-paid     average days from quote date to invoice date for paid invoices
+# ?order=<measure> sorts by that measure, descending, and ?limit=<n> keeps the first rows.
+@app.route('/api/reports/<report_name>', methods=['GET'])
+def get_report(report_name):
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    if report_name not in REPORTS:
+        return jsonify({"message": f"No report named '{report_name}'"}), 404
+    try:
+        with timed(f"report.{report_name}"):
+            result = analytics.report(report_name, request.args)
+    except QueryError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(result), 200
+
+# --- Search Endpoint ---
+# GET /api/search?q=<words>&collections=clients,quotes&limit=20
+# Every word must match; the last one is a prefix, for typeahead. Answered from an
+# inverted index kept up to date by every create/update/delete (see search.py).
+@app.route('/api/search', methods=['GET'])
+@conditional_get(*SEARCH_FIELDS)
+def search():
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    try:
+        limit = parse_page({"limit": request.args.get("limit", DEFAULT_SEARCH_LIMIT)})[1]
+    except QueryError as e:
+        return jsonify({"message": str(e)}), 400
+    collections = parse_fields({"fields": request.args.get("collections")})
+    unknown = [name for name in collections or () if name not in SEARCH_FIELDS]
+    if unknown:
+        return jsonify({"message": f"Cannot search '{unknown[0]}'"}), 400
+
+    hits = search_index.search(request.args.get("q", ""), collections, min(limit, MAX_SEARCH_LIMIT))
+    records = {}
+    cache = {}
+    for name in {name for name, _ in hits}:
+        found = db[name].get_many([record_id for hit_name, record_id in hits if hit_name == name])
+        rows = enrich(db, name, list(found.values()), cache)
+        records[name] = {row["id"]: row for row in rows}
+    results = [{"collection": name, "record": records[name][record_id]} for name, record_id in hits if record_id in records[name]]
+    return jsonify({"results": results}), 200
+
+# --- Change Feed ---
+# GET /api/changes?since=<seq>&epoch=<epoch>&limit=1000&collections=quotes,tasks
+# The records created, updated or deleted after `seq`, oldest change first, each as its
+# list row looks now (see changes.py):
+#   {"epoch": "1f3a9c2e", "seq": 8, "reset": false, "has_more": false, "changes": [
+#     {"seq": 7, "collection": "quotes", "id": 3, "op": "upsert", "record": {...}},
+#     {"seq": 8, "collection": "tasks", "id": 9, "op": "delete"}]}
+# Send the returned seq and epoch next time. "reset": true means the changes since `seq`
+# are no longer all known: refetch the collections, then sync from the returned seq.
+# Without `since`, that is how a client starts.
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    try:
+        since, epoch, limit, collections = parse_changes(request.args)
+    except QueryError as e:
+        return jsonify({"message": str(e)}), 400
+    changed, seq, reset, has_more = change_log.changes(since, epoch, limit, collections)
+    # The current records, one batch lookup and join per collection
+    wanted = {}
+    for _, name, record_id, deleted in changed:
+        if not deleted:
+            wanted.setdefault(name, []).append(record_id)
+    current = {}
+    for name, record_ids in wanted.items():
+        found = db[name].get_many(record_ids)
+        for row in enrich(db, name, list(found.values())):
+            current[name, row["id"]] = row
+    changes = []
+    for change_seq, name, record_id, deleted in changed:
+        row = None if deleted else current.get((name, record_id)) # Gone since: deleted after all
+        change = {"seq": change_seq, "collection": name, "id": record_id, "op": "delete" if row is None else "upsert"}
+        if row is not None:
+            change["record"] = row
+        changes.append(change)
+    return jsonify({"epoch": change_log.epoch, "seq": seq, "reset": reset, "has_more": has_more, "changes": changes}), 200
+
+# --- Bulk Import / Export ---
+# POST /api/import/<collection>?format=csv|ndjson streams the body in, in batches;
+# GET /api/export/<collection>?format=csv|ndjson streams the collection out (see bulk.py).
+# Without ?format, a text/csv body or Accept header means CSV, anything else NDJSON.
+
+# Helper to pick the bulk format from ?format= or the given content type
+def bulk_format(content_type):
+    file_format = request.args.get("format") or ("csv" if content_type and "text/csv" in content_type else "ndjson")
+    if file_format not in BULK_FORMATS:
+        raise QueryError(f"'format' must be one of: {', '.join(BULK_FORMATS)}")
+    return file_format
+
+@app.route('/api/import/<collection_name>', methods=['POST'])
+def import_collection(collection_name):
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    if is_demo_user():
+        return jsonify({"message": "Write operations are disabled in demo mode."}), 403
+    if collection_name not in BULK_COLUMNS:
+        return jsonify({"message": f"Cannot import '{collection_name}'"}), 404
+    try:
+        file_format = bulk_format(request.content_type)
+    except QueryError as e:
+        return jsonify({"message": str(e)}), 400
+    try:
+        result = import_rows(db, collection_name, iter_rows(request.stream, file_format), price_book)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"message": f"Could not read the {file_format} body: {e}"}), 400
+    status = 201 if result["imported"] else 400
+    return jsonify({"message": f"Imported {result['imported']} {collection_name}, skipped {result['skipped']}.", **result}), status
+
+@app.route('/api/export/<collection_name>', methods=['GET'])
+def export_collection(collection_name):
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    if collection_name not in BULK_COLUMNS:
+        return jsonify({"message": f"Cannot export '{collection_name}'"}), 404
+    try:
+        file_format = bulk_format(request.headers.get("Accept"))
+    except QueryError as e:
+        return jsonify({"message": str(e)}), 400
+    dumps = lambda row: app.json.dumps(row, separators=(",", ":"))
+    mimetype = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    response = Response(iter_export(db, collection_name, file_format, dumps), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename={collection_name}.{file_format}"
+    return response, 200
+
 # --- Settings Endpoint (Hardcoded as per user request, no DB interaction needed) ---
 # This endpoint is kept for completeness but its values are hardcoded in the frontend
 # and not meant to be fetched from backend in this simplified version.
@@ -743,9 +1134,32 @@ def user_settings(user_id):
         # For this demo, we'll just acknowledge the request.
         return jsonify({"message": "Settings updated successfully (backend mock)"}), 200
 
-# --- Email Sending Endpoint ---
+# --- Email Sending ---
+# SMTP settings come from the environment (EMAIL_USER / EMAIL_PASS, as in backend/.env).
+# With the dummy defaults below, sending is only simulated.
+# For Gmail, you might need to enable "Less secure app access" or use App Passwords
+# For other providers, consult their SMTP settings.
+SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587)) # 587 for STARTTLS
+SMTP_USERNAME = os.environ.get("EMAIL_USER", "your_email@gmail.com")
+SMTP_PASSWORD = os.environ.get("EMAIL_PASS", "your_app_password")
+
+mailer = None
+mailer_lock = threading.Lock()
+
+# Helper to check whether real SMTP credentials have been provided
+def smtp_configured():
+    return SMTP_USERNAME != "your_email@gmail.com" and SMTP_PASSWORD != "your_app_password"
+
+# Helper to get the background mailer, started on first use (see mailer.py)
+def get_mailer():
+    global mailer
+    with mailer_lock:
+        if mailer is None:
+            mailer = Mailer(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD)
+        return mailer
+
 # This endpoint is for sending test project reminders.
-# It uses dummy SMTP credentials. REPLACE WITH REAL CREDENTIALS FOR PRODUCTION.
 @app.route('/api/send-test-project-reminder/<int:user_id>', methods=['POST'])
 def send_test_project_reminder(user_id):
     if not is_logged_in():
@@ -761,16 +1175,8 @@ def send_test_project_reminder(user_id):
     if not recipient_email:
         return jsonify({"message": "Notification email not configured for this user."}), 400
 
-    # Dummy SMTP Configuration - REPLACE WITH YOUR ACTUAL SMTP DETAILS
-    # For Gmail, you might need to enable "Less secure app access" or use App Passwords
-    # For other providers, consult their SMTP settings.
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587 # or 465 for SSL
-    smtp_username = "your_email@gmail.com" # REPLACE WITH YOUR GMAIL ADDRESS
-    smtp_password = "your_app_password" # REPLACE WITH YOUR GMAIL APP PASSWORD OR EMAIL PASSWORD
-
     # Check if dummy credentials are still present
-    if smtp_username == "your_email@gmail.com" or smtp_password == "your_app_password":
+    if not smtp_configured():
         print(f"--- SIMULATING EMAIL SENDING ---")
         print(f"TO: {recipient_email}")
         print(f"SUBJECT: Test Project Due Date Reminder from Syntech Software")
@@ -778,8 +1184,8 @@ def send_test_project_reminder(user_id):
         print(f"----------------------------------")
         return jsonify({"message": f"Test project reminder email simulated successfully to {recipient_email}. (SMTP not configured)"}), 200
 
-    # If real credentials are provided, attempt to send the email
-    sender_email = smtp_username
+    # If real credentials are provided, hand the email to the background mailer
+    sender_email = SMTP_USERNAME
     subject = "Test Project Due Date Reminder from Syntech Software"
     body = f"""
 Dear User,
@@ -803,15 +1209,71 @@ The Syntech Software Team
     msg['Subject'] = subject
     msg.attach(MIMEText(body, 'plain'))
 
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls() # Secure the connection
-            server.login(smtp_username, smtp_password)
-            server.send_message(msg)
-        return jsonify({"message": f"Test project reminder email sent to {recipient_email}!"}), 200
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return jsonify({"message": f"Failed to send test reminder email. Error: {str(e)}"}), 500
+    get_mailer().enqueue(msg) # Returns immediately; a worker thread does the SMTP exchange
+    return jsonify({"message": f"Test project reminder email queued for {recipient_email}!"}), 202
+
+# --- Due-date reminders ---
+# Projects, tasks and invoices coming due within REMINDER_LEAD_DAYS days are emailed as a
+# digest to REMINDER_EMAIL (see reminders.py). Set REMINDER_INTERVAL (seconds) to run the
+# scheduler in the background; POST /api/reminders/run runs one tick on demand.
+REMINDER_EMAIL = os.environ.get("REMINDER_EMAIL", "renias0101@gmail.com")
+REMINDER_LEAD_DAYS = int(os.environ.get("REMINDER_LEAD_DAYS", DEFAULT_LEAD_DAYS))
+REMINDER_INTERVAL = os.environ.get("REMINDER_INTERVAL")
+
+# Helper to describe one due item in a reminder email
+def reminder_line(item):
+    record = item["record"]
+    if item["collection"] == "invoices":
+        label = f"Invoice #{record['id']} ({record.get('client_name') or 'unknown client'}, {record.get('total_amount')})"
+    elif item["collection"] == "projects":
+        label = f"Project: {record.get('project_name')}"
+    else:
+        label = f"Task: {record.get('name')}"
+    state = "OVERDUE since" if item["overdue"] else "due"
+    return f"- {label} - {state} {item['due_date']}"
+
+# Helper to send one batch of due items as a single digest email
+def send_reminder_batch(items):
+    subject = f"{len(items)} item(s) coming due - Syntech Software"
+    body = "Dear User,\n\nThe following items are coming due:\n\n" + "\n".join(reminder_line(item) for item in items) + "\n\nBest regards,\nThe Syntech Software Team\n"
+    if not smtp_configured():
+        print(f"--- SIMULATING EMAIL SENDING ---")
+        print(f"TO: {REMINDER_EMAIL}")
+        print(f"SUBJECT: {subject}")
+        print(f"BODY: {body}")
+        print(f"----------------------------------")
+        return
+    msg = MIMEMultipart()
+    msg['From'] = SMTP_USERNAME
+    msg['To'] = REMINDER_EMAIL
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    get_mailer().enqueue(msg)
+
+# Which items were reminded is kept in the SQLite file REMINDER_DB, which every worker
+# process shares: each item is emailed by one worker, and restarts do not send it again.
+# Set REMINDER_DB to an empty string to keep it in this process only.
+REMINDER_DB = os.environ.get("REMINDER_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reminders.db"))
+reminder_sent_store = SqliteSentReminders(REMINDER_DB, db.epoch) if REMINDER_DB else None
+reminders = ReminderScheduler(db, send_reminder_batch, REMINDER_LEAD_DAYS, sent_store=reminder_sent_store)
+if REMINDER_INTERVAL:
+    reminders.start(int(REMINDER_INTERVAL))
+
+@app.route('/api/reminders/run', methods=['POST'])
+def run_reminders():
+    if not is_logged_in():
+        return jsonify({"message": "Unauthorized"}), 401
+    if is_demo_user():
+        return jsonify({"message": "Email sending is disabled in demo mode."}), 403
+    sent = reminders.tick()
+    return jsonify({"message": f"{sent} reminder(s) sent.", "sent": sent, "pending": reminders.pending()}), 200
+
+#--- Metrics ---
+# Prometheus text exposition of this process's metrics. Like most scrape targets it needs
+# no session; it only carries route templates, counts and timings.
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == '__main__':
     app.run(debug=True) # Run in debug mode for development
@@ -0,0 +1,55 @@
+# backend/benchmarks/bench_backends.py
+
+# Throughput of the memory and SQLite storage backends through the real Flask routes.
+# Run from the backend directory: python benchmarks/bench_backends.py [clients]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from sqlite_store import SqliteStore
+from store import Store
+
+
+def build_data(clients):
+    data = {name: list(records) for name, records in app_module.seed_data.items()}
+    data["clients"] = [{"id": i, "name": f"Client {i}", "email": f"c{i}@example.com", "phone": "", "company": f"Co {i}", "notes": ""} for i in range(1, clients + 1)]
+    data["projects"] = [{"id": i, "project_name": f"Project {i}", "client_id": i, "description": "", "start_date": "2024-01-01", "end_date": "2024-06-01", "status": "Planning", "notes": ""} for i in range(1, clients + 1)]
+    data["invoices"] = [{"id": i, "client_id": i, "quote_id": None, "project_id": i, "invoice_date": "2024-01-01", "due_date": "2024-02-01", "status": "Sent", "total_amount": 100.0, "notes": "", "invoice_items": []} for i in range(1, clients + 1)]
+    data["tasks"] = [{"id": i, "project_id": (i % clients) + 1, "name": f"Task {i}", "category": "", "due_date": "2024-01-10", "status": "Pending", "priority": "Medium", "progress": 0} for i in range(1, clients * 3 + 1)]
+    return data
+
+
+def run(label, store, clients):
+    app_module.db = store
+    client = app_module.app.test_client()
+    client.post('/api/login', json={"username": "admin", "password": "password123"})
+    cases = [
+        ("GET client detail", lambda i: client.get(f'/api/clients/{i % clients + 1}'), 2000),
+        ("GET invoices page", lambda i: client.get('/api/invoices?limit=50'), 500),
+        ("GET tasks (full)", lambda i: client.get('/api/tasks'), 5),
+        ("POST client", lambda i: client.post('/api/clients', json={"name": "n", "email": "e"}), 1000),
+    ]
+    print(label)
+    for name, call, count in cases:
+        start = time.perf_counter()
+        for i in range(count):
+            call(i)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<20} {count / elapsed:10.0f} req/s")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    data = build_data(clients)
+    run("memory", Store({name: [dict(r) for r in records] for name, records in data.items()}), clients)
+    with tempfile.TemporaryDirectory() as tmp:
+        run("sqlite", SqliteStore(os.path.join(tmp, "bench.db"), data), clients)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# backend/benchmarks/bench_cascade.py
+
+# Client delete: predicate scans over every dependent collection (the old delete_where
+# cascade) vs Store.delete_cascade through the reverse foreign key indexes.
+# Run from the backend directory: python benchmarks/bench_cascade.py [clients]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import Store
+
+
+def build(clients):
+    # Each client: 2 quotes, 2 projects, 2 invoices; each project: 5 tasks, 2 bugs
+    data = {name: [] for name in ("clients", "quotes", "projects", "invoices", "tasks", "bugs")}
+    for client_id in range(1, clients + 1):
+        data["clients"].append({"id": client_id, "name": f"Client {client_id}"})
+        for n in range(2):
+            child_id = client_id * 2 + n
+            data["quotes"].append({"id": child_id, "client_id": client_id})
+            data["projects"].append({"id": child_id, "client_id": client_id})
+            data["invoices"].append({"id": child_id, "client_id": client_id, "project_id": child_id})
+            data["tasks"].extend({"id": child_id * 5 + t, "project_id": child_id} for t in range(5))
+            data["bugs"].extend({"id": child_id * 2 + b, "project_id": child_id} for b in range(2))
+    return Store(data)
+
+
+def scan_delete(db, client_id):
+    db["clients"].delete(client_id)
+    db["quotes"].delete_where(lambda q: q["client_id"] == client_id)
+    projects = db["projects"].delete_where(lambda p: p["client_id"] == client_id)
+    db["invoices"].delete_where(lambda i: i["client_id"] == client_id)
+    project_ids = {p["id"] for p in projects}
+    db["tasks"].delete_where(lambda t: t["project_id"] in project_ids)
+    db["bugs"].delete_where(lambda b: b["project_id"] in project_ids)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    deletes = 20
+    for label, delete in [("predicate scans", scan_delete), ("delete_cascade", lambda db, i: db.delete_cascade("clients", i))]:
+        db = build(clients)
+        records = sum(len(db[name]) for name in db.names())
+        start = time.perf_counter()
+        for client_id in range(1, deletes + 1):
+            delete(db, client_id)
+        per_call = (time.perf_counter() - start) / deletes
+        print(f"{label:<16} {per_call * 1e3:10.3f} ms per client delete ({records} records, 23 deleted each)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# backend/benchmarks/bench_changes.py
+
+# What a client pays to catch up after a few edits: GET /api/changes?since=<seq> versus
+# refetching every collection it keeps, over synthetic data. Time and response bytes,
+# best of ROUNDS. Each round makes EDITS task updates and one client rename, which also
+# logs that client's quotes, projects and invoices (their rows show its name).
+# Run from the backend directory: python benchmarks/bench_changes.py [clients]
+
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+COLLECTIONS = ("clients", "services", "quotes", "projects", "invoices", "tasks", "bugs")
+ROUNDS = 5
+EDITS = 10
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    import app
+    from synthetic import generate, seed
+    seed(app.db, generate(clients))
+    client = app.app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "password123"})
+    for name in COLLECTIONS:
+        client.get(f"/api/{name}") # Warm the caches, as a client that polls would have
+    start = client.get("/api/changes").get_json()
+    seq, epoch = start["seq"], start["epoch"]
+    tasks = app.db["tasks"].page(None, EDITS * ROUNDS)[0]
+
+    best_full = best_delta = float("inf")
+    full_bytes = delta_bytes = changes = 0
+    for round_number in range(ROUNDS):
+        for task in tasks[round_number * EDITS:(round_number + 1) * EDITS]:
+            edit = client.put(f"/api/tasks/{task['id']}", json={"project_id": task["project_id"], "progress": round_number})
+            assert edit.status_code == 200, edit.get_json()
+        assert client.put("/api/clients/1", json={"name": f"Renamed {round_number}"}).status_code == 200
+
+        began = time.perf_counter()
+        full_bytes = sum(len(client.get(f"/api/{name}").get_data()) for name in COLLECTIONS)
+        best_full = min(best_full, time.perf_counter() - began)
+
+        began = time.perf_counter()
+        response = client.get(f"/api/changes?since={seq}&epoch={epoch}")
+        best_delta = min(best_delta, time.perf_counter() - began)
+        body = response.get_json()
+        delta_bytes, changes, seq = len(response.get_data()), len(body["changes"]), body["seq"]
+
+    print(f"{clients} clients, {EDITS} task edits and a client rename per round, best of {ROUNDS}")
+    print(f"  refetch {len(COLLECTIONS)} collections: {best_full * 1e3:8.1f} ms {full_bytes / 2**20:8.1f} MiB")
+    print(f"  /api/changes ({changes} changes): {best_delta * 1e3:8.2f} ms {delta_bytes / 1024:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
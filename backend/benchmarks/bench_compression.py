@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_compression.py
+
+# Response time and bytes on the wire for the full quote and invoice lists, with
+# compression off, compressed on every request (COMPRESSED_CACHE_MB=0), and compressed
+# with the cache of compressed bodies. Requests send Accept-Encoding: gzip, br, as
+# browsers do. Every configuration runs in a fresh process over the same synthetic data
+# and reports the best of ROUNDS. The first request fills the caches; the timed ones hit
+# them, as repeated polling of an unchanged list would.
+# Run from the backend directory: python benchmarks/bench_compression.py [clients]
+
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ROUTES = ("/api/quotes", "/api/invoices", "/api/quotes?stream=1")
+ROUNDS = 5
+REQUESTS = 5
+CONFIGS = (
+    ("off", {"COMPRESS": "0"}),
+    ("no cache", {"COMPRESSED_CACHE_MB": "0"}),
+    ("cached", {"COMPRESSED_CACHE_MB": "256"}),
+)
+
+
+def serve(clients):
+    # Child process: prints "<ms> <bytes>" for each route
+    import app
+    from synthetic import generate, seed
+    seed(app.db, generate(clients))
+    client = app.app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "password123"})
+    headers = {"Accept-Encoding": "gzip, br"}
+    results = []
+    for route in ROUTES:
+        response = client.get(route, headers=headers) # Warm up (and fill the caches)
+        assert response.status_code == 200, route
+        size = len(response.get_data())
+        best = float("inf")
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for _ in range(REQUESTS):
+                client.get(route, headers=headers).get_data()
+            best = min(best, (time.perf_counter() - start) / REQUESTS)
+        results += [best * 1e3, size]
+    print(*results)
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]))
+        return
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    from compression import ENCODINGS
+    print(f"{clients} clients, encoding {ENCODINGS[0]}, best of {ROUNDS} x {REQUESTS} requests: ms per request / KiB sent")
+    print(f"{'compression':<14}" + "".join(f"{route:>26}" for route in ROUTES))
+    for label, settings in CONFIGS:
+        env = dict(os.environ, SESSION_BACKEND="memory", **settings)
+        output = subprocess.run([sys.executable, __file__, "--serve", str(clients)], env=env, cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        values = [float(value) for value in output.split()]
+        cells = [f"{ms:.1f} / {size / 1024:.0f}" for ms, size in zip(values[::2], values[1::2])]
+        print(f"{label:<14}" + "".join(f"{cell:>26}" for cell in cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# backend/benchmarks/bench_import.py
+
+# Bulk import throughput (rows/s) for CSV and NDJSON, with the app's listeners (summary,
+# search index, reminders) attached as in production.
+# Run from the backend directory: python benchmarks/bench_import.py [rows]
+
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db, price_book
+from bulk import import_rows, iter_rows
+
+
+def payloads(rows):
+    clients = [{"name": f"Client {i}", "email": f"client{i}@example.com", "phone": "555-0100",
+                "company": f"Company {i % 1000}", "notes": "Imported"} for i in range(rows)]
+    tasks = [{"project_id": 1 + i % 2, "name": f"Task {i}", "category": "Backend", "due_date": "2030-01-01",
+              "status": "Pending", "priority": "High", "progress": 0} for i in range(rows)]
+    encoded = {}
+    for name, records in (("clients", clients), ("tasks", tasks)):
+        encoded[name, "ndjson"] = "".join(json.dumps(r) + "\n" for r in records).encode()
+        text = io.StringIO()
+        writer = csv.DictWriter(text, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+        encoded[name, "csv"] = text.getvalue().encode()
+    return encoded
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for (name, file_format), body in payloads(rows).items():
+        start = time.perf_counter()
+        result = import_rows(db, name, iter_rows(io.BytesIO(body), file_format), price_book)
+        elapsed = time.perf_counter() - start
+        assert result["imported"] == rows, result["errors"][:3]
+        print(f"{name:<8} {file_format:<7} {rows / elapsed:10.0f} rows/s  ({len(body) / 1e6:.1f} MB body)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# backend/benchmarks/bench_json.py
+
+# Full-list response time for GET /api/quotes and /api/invoices, for each JSON provider
+# with the encoded-row cache on and off (FRAGMENT_CACHE_MB=0). Every configuration runs in
+# a fresh process over the same synthetic data, and each reports the best of ROUNDS. The
+# first request fills the cache; the timed ones then hit it, as repeated polling of an
+# unchanged list would.
+# Run from the backend directory: python benchmarks/bench_json.py [clients]
+
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ROUTES = ("/api/quotes", "/api/invoices", "/api/quotes?stream=1")
+ROUNDS = 5
+REQUESTS = 5
+
+
+def serve(clients):
+    # Child process: prints the best time per request for each route, in ms
+    import app
+    from synthetic import generate, seed
+    seed(app.db, generate(clients))
+    client = app.app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "password123"})
+    timings = []
+    for route in ROUTES:
+        assert client.get(route).status_code == 200, route # Warm up (and fill the cache)
+        best = float("inf")
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for _ in range(REQUESTS):
+                client.get(route).get_data()
+            best = min(best, (time.perf_counter() - start) / REQUESTS)
+        timings.append(best * 1e3)
+    print(*timings)
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]))
+        return
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    from jsonprovider import PROVIDERS
+    print(f"{clients} clients, best of {ROUNDS} x {REQUESTS} requests, ms per request")
+    print(f"{'provider':<10}{'cache':<8}" + "".join(f"{route:>24}" for route in ROUTES))
+    for provider in PROVIDERS:
+        for cache_mb in ("0", "256"):
+            env = dict(os.environ, JSON_PROVIDER=provider, FRAGMENT_CACHE_MB=cache_mb, SESSION_BACKEND="memory")
+            output = subprocess.run([sys.executable, __file__, "--serve", str(clients)], env=env, cwd=BACKEND_DIR,
+                                    capture_output=True, text=True, check=True).stdout
+            timings = [float(value) for value in output.split()]
+            print(f"{provider:<10}{'on' if cache_mb != '0' else 'off':<8}" + "".join(f"{ms:24.1f}" for ms in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# backend/benchmarks/bench_mailer.py
+
+# Burst throughput of the background mailer against a local SMTP stand-in.
+# Run from the backend directory: python benchmarks/bench_mailer.py [messages] [workers]
+
+import os
+import socketserver
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mailer import Mailer
+
+
+class SmtpStandIn(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: accepts every message and counts it
+    received = 0
+    lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO" or command == b"HELO":
+                self.reply("250 localhost")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with SmtpStandIn.lock:
+                    SmtpStandIn.received += 1
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else: # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SmtpStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    mailer = Mailer("127.0.0.1", server.server_address[1], starttls=False, workers=workers)
+    messages = []
+    for i in range(count):
+        msg = MIMEText(f"Reminder {i}")
+        msg["From"] = "noreply@example.com"
+        msg["To"] = f"user{i}@example.com"
+        msg["Subject"] = "Due date reminder"
+        messages.append(msg)
+
+    start = time.perf_counter()
+    for msg in messages:
+        mailer.enqueue(msg)
+    enqueued = time.perf_counter() - start
+    mailer.flush()
+    elapsed = time.perf_counter() - start
+
+    print(f"enqueue: {count / enqueued:.0f} msg/s ({enqueued / count * 1e6:.1f} us per call)")
+    print(f"delivery: {count} messages in {elapsed:.2f}s = {count / elapsed:.0f} msg/s with {workers} workers")
+    print(f"stand-in received {SmtpStandIn.received}; mailer stats {mailer.stats()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
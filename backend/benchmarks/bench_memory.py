@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_memory.py
+
+# Memory held by the in-memory Store for synthetic data, with and without record
+# compaction (compact.py). Records are stored the way the API and imports store them: each
+# one is parsed from its own JSON text, so no strings or items are shared up front. Each
+# mode runs in a fresh process. "without" restores the old behaviour by making
+# Compactor.record return records untouched. Heap bytes come from tracemalloc, and RSS is
+# measured in a separate run without tracing, since tracemalloc's own bookkeeping would
+# show up in it.
+# Run from the backend directory: python benchmarks/bench_memory.py [clients]
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def rss_kib():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+
+
+def measure(clients, compact, traced):
+    # Child process: prints "<bytes> <records> <line items>", heap bytes or the RSS growth
+    import compact as compact_module
+    from store import Store
+    from synthetic import generate
+    if not compact:
+        compact_module.Compactor.record = lambda self, record: record
+    data = generate(clients)
+    texts = {name: [json.dumps(record) for record in records] for name, records in data.items()}
+    records = sum(len(collection) for collection in data.values())
+    items = sum(len(record["quote_items"]) for record in data["quotes"]) + \
+        sum(len(record["invoice_items"]) for record in data["invoices"])
+    del data
+    gc.collect()
+
+    rss = rss_kib()
+    if traced:
+        tracemalloc.start()
+    db = Store({name: [] for name in texts})
+    for name, lines in texts.items():
+        collection = db[name]
+        for line in lines:
+            collection.put(json.loads(line))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] if traced else (rss_kib() - rss) * 1024
+    print(used, records, items)
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--measure":
+        measure(int(sys.argv[2]), sys.argv[3] == "1", sys.argv[4] == "1")
+        return
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    results = {}
+    for compact in ("0", "1"):
+        for traced in ("1", "0"):
+            output = subprocess.run([sys.executable, __file__, "--measure", str(clients), compact, traced],
+                                    cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+            results[compact, traced] = [int(value) for value in output.split()]
+    _, records, items = results["0", "1"]
+    print(f"{records} records, {items} line items ({clients} clients)")
+    for compact, label in (("0", "without compaction"), ("1", "with compaction   ")):
+        heap, rss = results[compact, "1"][0], results[compact, "0"][0]
+        print(f"  {label} heap {heap / 2**20:7.1f} MiB ({heap / records:5.0f} B/record)  RSS {rss / 2**20:7.1f} MiB")
+    before, after = results["0", "1"][0], results["1", "1"][0]
+    print(f"  heap saved: {(before - after) / 2**20:.1f} MiB ({(1 - after / before) * 100:.0f}%), "
+          f"{(before - after) / items * 1e6 / 2**20:.0f} MiB per 1M line items at this data shape")
+
+
+if __name__ == '__main__':
+    main()
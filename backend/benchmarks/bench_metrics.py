@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_metrics.py
+
+# Cost of the metrics instrumentation. First the primitives (Histogram.observe, Counter.inc,
+# timed()), then whole requests through the Flask test client with the request hooks on
+# and off (METRICS_ENABLED), each in a fresh process so both start from the same state.
+# Run from the backend directory: python benchmarks/bench_metrics.py [requests]
+
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ROUTES = ("/api/clients", "/api/quotes?limit=20", "/api/clients/1", "/api/tasks", "/api/summary")
+ROUNDS = 5
+
+
+def per_call(function, count=200_000):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count
+
+
+def primitives():
+    from metrics import Counter, Histogram, timed
+    histogram = Histogram("bench_seconds", "")
+    counter = Counter("bench_total", "", ("method", "route", "status"))
+    labels = ("GET", "/api/clients")
+
+    def time_block():
+        with timed("bench"):
+            pass
+
+    print("primitives:")
+    print(f"  Histogram.observe {per_call(lambda: histogram.observe(0.003, labels)) * 1e9:8.0f} ns")
+    print(f"  Counter.inc       {per_call(lambda: counter.inc(labels + ('200',))) * 1e9:8.0f} ns")
+    print(f"  timed() block     {per_call(time_block) * 1e9:8.0f} ns")
+
+
+def serve_requests(count):
+    # Child process: best-of-ROUNDS time per request over ROUTES
+    os.environ.setdefault("SESSION_BACKEND", "memory")
+    import app
+    client = app.app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "password123"})
+    for route in ROUTES: # Warm up
+        assert client.get(route).status_code == 200, route
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for n in range(count):
+            client.get(ROUTES[n % len(ROUTES)])
+        best = min(best, (time.perf_counter() - start) / count)
+    print(best)
+
+
+def requests(count):
+    results = {}
+    for enabled in ("0", "1"):
+        env = dict(os.environ, METRICS_ENABLED=enabled, SESSION_BACKEND="memory")
+        output = subprocess.run([sys.executable, __file__, "--serve", str(count)], env=env, cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        results[enabled] = float(output.split()[-1])
+    off, on = results["0"], results["1"]
+    print(f"requests ({count} x {ROUNDS} rounds over {len(ROUTES)} routes, best round):")
+    print(f"  metrics off {off * 1e6:8.1f} us/request")
+    print(f"  metrics on  {on * 1e6:8.1f} us/request  ({(on - off) * 1e6:+.1f} us, {(on / off - 1) * 100:+.1f}%)")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        serve_requests(int(sys.argv[2]))
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    primitives()
+    requests(count)
+
+
+if __name__ == '__main__':
+    main()
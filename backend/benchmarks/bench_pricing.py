@@ -0,0 +1,53 @@
+# backend/benchmarks/bench_pricing.py
+
+# Cost of repricing the drafts that use a service after its price changes: the
+# reverse-indexed batch (PriceBook.reprice_service, one update_many per collection) against
+# scanning every quote and invoice and updating the matching drafts one at a time.
+# Run from the backend directory: python benchmarks/bench_pricing.py [clients]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import DRAFT_STATUS, ITEM_FIELDS, PriceBook, _service_ids
+from store import Store
+from synthetic import generate, seed
+
+SERVICE_ID = 2
+
+
+def per_row(db, price_book, service_id):
+    repriced = {}
+    for name in ITEM_FIELDS:
+        count = 0
+        for record in list(db[name]):
+            if record.get("status") == DRAFT_STATUS and service_id in _service_ids(record, name):
+                db[name].update(record["id"], price_book.price_document(name, record))
+                count += 1
+        repriced[name] = count
+    return repriced
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = generate(clients)
+    db = Store({name: [] for name in data})
+    seed(db, data)
+    price_book = PriceBook(db)
+    price_book.reprice_service(SERVICE_ID) # Bring the drafts in line with the table first
+
+    for label, reprice in (("per row", lambda: per_row(db, price_book, SERVICE_ID)),
+                           ("batch  ", lambda: price_book.reprice_service(SERVICE_ID))):
+        best = float("inf")
+        for price in (51.25, 52.5, 53.75):
+            db["services"].update(SERVICE_ID, {"price": price})
+            start = time.perf_counter()
+            repriced = reprice()
+            best = min(best, time.perf_counter() - start)
+        print(f"{label} {best * 1e3:8.1f} ms  {repriced}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# backend/benchmarks/bench_reports.py
+
+# Report latency over the columnar mirror (analytics.py) on synthetic data. Each report runs
+# with the NumPy kernels (when NumPy is installed) and with the pure-Python fallback. For
+# comparison, revenue by month and client is also computed the old way, by scanning the
+# invoice dicts.
+# Run from the backend directory: python benchmarks/bench_reports.py [clients]
+
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+from analytics import Analytics
+from store import Store
+from synthetic import generate, seed
+
+QUERIES = [
+    ("revenue", {"group": "month,client"}),
+    ("revenue", {"group": "year", "from": "2024-01-01", "to": "2024-12-31"}),
+    ("revenue", {"group": "client", "order": "total", "limit": "10"}),
+    ("services", {"group": "quarter,service"}),
+    ("services", {"group": "service", "source": "quotes"}),
+    ("quote-conversion", {"group": "month"}),
+    ("quote-to-paid", {"group": "year"}),
+]
+ROUNDS = 3
+
+
+def best(function):
+    elapsed = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed * 1e3
+
+
+def scan_revenue(db):
+    totals = defaultdict(float)
+    for invoice in db["invoices"]:
+        if invoice.get("status") in analytics.INVOICED_STATUSES:
+            totals[(invoice["invoice_date"][:7], invoice["client_id"])] += invoice["total_amount"]
+    return totals
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = generate(clients)
+    db = Store({name: [] for name in data})
+    seed(db, data)
+    start = time.perf_counter()
+    reports = Analytics(db)
+    items = sum(len(record["invoice_items"]) for record in data["invoices"]) + sum(len(record["quote_items"]) for record in data["quotes"])
+    print(f"mirror of {len(data['quotes'])} quotes, {len(data['invoices'])} invoices, {items} line items "
+          f"built in {time.perf_counter() - start:.1f}s")
+
+    kernels = [("numpy", analytics.numpy), ("python", None)] if analytics.numpy is not None else [("python", None)]
+    print(f"{'report':<50}" + "".join(f"{label:>12}" for label, _ in kernels))
+    for name, args in QUERIES:
+        timings = []
+        for _, module in kernels:
+            analytics.numpy = module
+            timings.append(best(lambda: reports.report(name, args)))
+        query = "&".join(f"{key}={value}" for key, value in args.items())
+        print(f"{name + '?' + query:<50}" + "".join(f"{ms:10.1f}ms" for ms in timings))
+    print(f"{'scan of invoice dicts, revenue by month,client':<50}{best(lambda: scan_revenue(db)):10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+# backend/benchmarks/bench_routes.py
+
+# Benchmark harness over the API routes: seeds app.db with synthetic.generate() at the
+# requested scale, logs in through Flask's test client and times every case below,
+# reporting requests/s (1 / mean latency) and p50/p99 latency per case.
+#
+# Cases cover, per collection: a list page (random keyset cursor), a filtered list (where
+# the route has filters), the full list (only for collections up to FULL_LIST_MAX
+# records, since the body is the whole collection), detail, create, update and delete,
+# then sorted and range queries, the cascade deletes of clients and projects that own
+# dependents, plus summary, reports, the change feed, search, batch, import/export, auth,
+# settings and /metrics. The two email routes are left out: they would send (or print) mail.
+#
+# Each case runs `--requests` times or for `--budget` seconds, whichever comes first (at
+# least MIN_SAMPLES), after one untimed warm-up request. Every response must have the
+# expected status code, otherwise the run fails. The whole set of cases runs `--rounds`
+# times and the best round of each case is reported.
+#
+# Baselines: --save writes the results to the baseline file; later runs at the same scale
+# compare against it and exit non-zero if any case's p50 got more than --tolerance slower
+# (2x that for p99, which is noisier), ignoring differences under MIN_DELTA_MS. Around
+# every case both runs also time a fixed CPU-bound calibration loop, and the baseline is
+# scaled by the ratio, so a slower or busier machine (or a busy stretch of the run) is
+# not reported as a regression of the code.
+#
+# Run from the backend directory:
+#   python benchmarks/bench_routes.py [--clients N] [--requests N] [--rounds N] [--save]
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from urllib.parse import quote
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic import generate, seed
+
+COLLECTIONS = ("clients", "services", "quotes", "projects", "invoices", "tasks", "bugs")
+# Filters list_collection applies (indexes.py); clients and services have none
+FILTERS = {"quotes": "status=Draft", "projects": "status=Planning", "invoices": "status=Overdue",
+           "tasks": "status=Pending", "bugs": "severity=Critical"}
+# Sorted and range queries, answered from the same indexes
+INDEX_QUERIES = ("invoices?status=Sent&sort=due_date", "invoices?total_amount.gte=4000&sort=-total_amount",
+                 "invoices?status=Sent&due_date.gte=2024-01-01", "tasks?status=In Progress&sort=due_date",
+                 "tasks?project_id=7&sort=-priority", "bugs?reported_date.gte=2023-06-01&sort=-severity")
+FULL_LIST_MAX = 100_000
+CHANGES_BEHIND = 100 # How far back the /api/changes case syncs from
+MIN_SAMPLES = 3
+MIN_DELTA_MS = 0.25
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routes_baseline.json")
+
+
+class Case:
+    def __init__(self, name, method, path, body=None, status=200, client=None):
+        self.name = name
+        self.method = method
+        self.path = path # str, or a function of the rng returning one (None to stop early)
+        self.body = body # None, dict/str, or a function of (rng, path) returning one
+        self.status = status
+        self.client = client # Defaults to the logged-in admin client
+
+
+def percentile(samples, fraction):
+    # Nearest-rank percentile of sorted samples
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+
+def bodies(db, rng, seeded):
+    # Request bodies for the create cases, pointing at random seeded parents (records
+    # created by the run itself get deleted again, so nothing should hang off them)
+    def parent_id(name):
+        while True:
+            record_id = rng.randint(1, seeded[name])
+            if record_id in db[name]:
+                return record_id
+
+    items = [{"service_id": 1, "name": "Website Design", "price": 1500.0, "unit": "fixed", "quantity": 1}]
+    return {
+        "clients": lambda: {"name": "Bench Client", "email": "bench@example.com", "phone": "000",
+                            "company": "Bench Ltd", "notes": "created by bench_routes"},
+        "services": lambda: {"name": "Bench Service", "description": "bench", "price": 10.0, "unit": "fixed"},
+        "quotes": lambda: {"client_id": parent_id("clients"), "quote_date": "2024-01-01", "status": "Draft",
+                           "total_amount": 1500.0, "notes": "bench", "quote_items": items},
+        "projects": lambda: {"project_name": "Bench Project", "client_id": parent_id("clients"),
+                             "description": "bench", "start_date": "2024-01-01", "end_date": "2024-02-01",
+                             "status": "Planning", "notes": "bench"},
+        "invoices": lambda: {"client_id": parent_id("clients"), "project_id": parent_id("projects"), "invoice_date": "2024-01-01",
+                             "due_date": "2024-02-01", "status": "Draft", "total_amount": 1500.0, "notes": "bench",
+                             "invoice_items": items},
+        "tasks": lambda: {"project_id": parent_id("projects"), "name": "Bench task", "category": "QA",
+                          "due_date": "2024-01-15", "status": "Pending", "priority": "Low", "progress": 0},
+        "bugs": lambda: {"project_id": parent_id("projects"), "name": "Bench bug", "severity": "Low", "status": "Open",
+                         "reported_date": "2024-01-10"},
+    }
+
+
+def build_cases(db, change_log, client, anonymous, seeded):
+    rng = random.Random(2)
+    create = bodies(db, rng, seeded)
+
+    def existing(name):
+        # Path to a random live record of a collection
+        def path(rng):
+            collection = db[name]
+            while True:
+                record_id = rng.randint(1, collection.sequence)
+                if record_id in collection:
+                    return f"/api/{name}/{record_id}"
+        return path
+
+    def update_body(name):
+        # The PUT handlers for quotes/invoices/projects need the parent ids, so send the
+        # current record back with new notes
+        def body(rng, path):
+            record = dict(db[name].get(int(path.rsplit("/", 1)[1])))
+            record["notes"] = f"updated {rng.random()}"
+            for field in ("id", "client_name", "client_company", "project_name"):
+                record.pop(field, None)
+            return record
+        return body
+
+    def created(name):
+        # Deletes only touch records created during this run; None once they are all gone
+        pool = None
+
+        def path(rng):
+            nonlocal pool
+            if pool is None:
+                pool = [record_id for record_id in range(seeded[name] + 1, db[name].sequence + 1)
+                        if record_id in db[name]]
+                rng.shuffle(pool)
+            return f"/api/{name}/{pool.pop()}" if pool else None
+        return path
+
+    def cascading(name):
+        # Seeded parents, which own quotes/projects/invoices (clients) or tasks/bugs (projects)
+        def path(rng):
+            collection = db[name]
+            while True:
+                record_id = rng.randint(1, seeded[name])
+                if record_id in collection:
+                    return f"/api/{name}/{record_id}"
+        return path
+
+    def recent_changes(rng):
+        # A client catching up on the latest CHANGES_BEHIND changes (the writes above)
+        _, seq, _, _ = change_log.changes(None)
+        return f"/api/changes?since={max(0, seq - CHANGES_BEHIND)}&epoch={change_log.epoch}"
+
+    cases = []
+    for name in COLLECTIONS:
+        size = len(db[name])
+        cases.append(Case(f"GET /api/{name}?limit=50", "GET",
+                          lambda rng, name=name: f"/api/{name}?limit=50&after={rng.randint(0, db[name].sequence)}"))
+        if name in FILTERS:
+            cases.append(Case(f"GET /api/{name}?{FILTERS[name]}", "GET", f"/api/{name}?{quote(FILTERS[name], '=')}&limit=50"))
+        if size <= FULL_LIST_MAX:
+            cases.append(Case(f"GET /api/{name}", "GET", f"/api/{name}"))
+            cases.append(Case(f"GET /api/{name}?stream=1", "GET", f"/api/{name}?stream=1"))
+        if name != "services":
+            cases.append(Case(f"GET /api/{name}/<id>", "GET", existing(name)))
+        cases.append(Case(f"POST /api/{name}", "POST", f"/api/{name}", lambda rng, path, name=name: create[name](), 201))
+        if name != "services":
+            cases.append(Case(f"PUT /api/{name}/<id>", "PUT", existing(name), update_body(name)))
+    for query in INDEX_QUERIES:
+        cases.append(Case(f"GET /api/{query}", "GET", f"/api/{quote(query, '=&?,')}&limit=50"))
+    # Deletes after every create has run, children before their parents
+    for name in ("tasks", "bugs", "invoices", "quotes", "projects", "services", "clients"):
+        cases.append(Case(f"DELETE /api/{name}/<id>", "DELETE", created(name)))
+    cases.append(Case("DELETE /api/projects/<id> (cascade)", "DELETE", cascading("projects")))
+    cases.append(Case("DELETE /api/clients/<id> (cascade)", "DELETE", cascading("clients")))
+
+    batch = {"queries": [{"collection": "clients", "limit": 20}, {"collection": "invoices", "limit": 20},
+                         {"collection": "tasks", "limit": 20, "filters": {"status": "Pending"}}]}
+    import_body = "".join(json.dumps({"name": f"Imported {n}", "email": f"imported{n}@example.com",
+                                      "company": "Import Ltd"}) + "\n" for n in range(100))
+    cases += [
+        Case("GET /api/summary", "GET", "/api/summary"),
+        Case("GET /api/reports/revenue?group=month", "GET", "/api/reports/revenue?group=month"),
+        Case("GET /api/reports/services?group=quarter,service", "GET", "/api/reports/services?group=quarter,service"),
+        Case("GET /api/reports/quote-conversion?group=year", "GET", "/api/reports/quote-conversion?group=year"),
+        Case("GET /api/reports/quote-to-paid", "GET", "/api/reports/quote-to-paid"),
+        Case("GET /api/changes (start)", "GET", "/api/changes"),
+        Case(f"GET /api/changes?since=<seq-{CHANGES_BEHIND}>", "GET", recent_changes),
+        Case("GET /api/search?q=<word>", "GET", "/api/search?q=website"),
+        Case("GET /api/search?q=<words+prefix>", "GET", "/api/search?q=seo%20campaign%20cont"),
+        Case("POST /api/batch", "POST", "/api/batch", batch),
+        Case("POST /api/import/clients (100 rows)", "POST", "/api/import/clients?format=ndjson", import_body, 201),
+        Case("GET /api/export/services", "GET", "/api/export/services?format=csv"),
+        Case("GET /api/users", "GET", "/api/users"),
+        Case("GET /api/user_settings/<id>", "GET", "/api/user_settings/1"),
+        Case("PUT /api/user_settings/<id>", "PUT", "/api/user_settings/1", {"dark_mode_enabled": True}),
+        Case("POST /api/login", "POST", "/api/login", {"username": "admin", "password": "password123"},
+             client=anonymous),
+        Case("POST /api/demo_login", "POST", "/api/demo_login", {}, client=anonymous),
+        Case("POST /api/logout", "POST", "/api/logout", {}, client=anonymous),
+        Case("GET /metrics", "GET", "/metrics"),
+    ]
+    return cases
+
+
+def run_case(case, client, rng, requests, budget):
+    client = case.client or client
+    calibration = calibrate()
+    samples = []
+    deadline = None
+    for n in range(requests + 1):
+        path = case.path(rng) if callable(case.path) else case.path
+        if path is None: # Nothing left to act on
+            break
+        body = case.body
+        if callable(body):
+            body = body(rng, path)
+        kwargs = {"data": body, "content_type": "application/x-ndjson"} if isinstance(body, str) else {"json": body}
+        start = time.perf_counter()
+        response = client.open(path, method=case.method, **kwargs)
+        response.get_data()
+        response.close()
+        elapsed = time.perf_counter() - start
+        if response.status_code != case.status:
+            raise RuntimeError(f"{case.name}: {case.method} {path} returned {response.status_code}, "
+                               f"expected {case.status}: {response.get_data(as_text=True)[:200]}")
+        if n == 0: # Warm-up (lazy index rebuilds after seeding, first-call imports)
+            deadline = time.perf_counter() + budget
+            continue
+        samples.append(elapsed)
+        if len(samples) >= MIN_SAMPLES and time.perf_counter() > deadline:
+            break
+    samples.sort()
+    calibration = (calibration + calibrate()) / 2
+    return {"n": len(samples), "rps": len(samples) / sum(samples), "calibration": calibration * 1e3,
+            "p50": percentile(samples, 0.50) * 1e3, "p99": percentile(samples, 0.99) * 1e3}
+
+
+def calibrate():
+    # Best-of-3 time of a fixed mix of the work requests do (dicts, strings, JSON)
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for n in range(2000):
+            record = {"id": n, "name": f"client {n}", "tags": [n, n + 1], "total": n * 1.5}
+            json.loads(json.dumps({**record, "extra": str(n)}))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def best_of(previous, result):
+    # Merges one round's result into the best so far: on a shared machine a busy stretch
+    # only slows some rounds down, so the fastest round is the stable number
+    if previous is None:
+        return result
+    return {"n": previous["n"] + result["n"], "rps": max(previous["rps"], result["rps"]),
+            "calibration": min(previous["calibration"], result["calibration"]),
+            "p50": min(previous["p50"], result["p50"]), "p99": min(previous["p99"], result["p99"])}
+
+
+def compare(results, baseline, tolerance):
+    # Returns {case: [problems]} for every regression. Baseline times are scaled by how
+    # much slower the calibration loop ran around this case than around the baseline's.
+    regressions = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        scale = result["calibration"] / base["calibration"]
+        for key, allowed in (("p50", tolerance), ("p99", 2 * tolerance)):
+            expected = base[key] * scale
+            if result[key] > expected * (1 + allowed) and result[key] - expected > MIN_DELTA_MS:
+                regressions.setdefault(name, []).append(f"{key} {expected:.3f} -> {result[key]:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API route over synthetic data")
+    parser.add_argument("--clients", type=int, default=1000, help="synthetic scale (default 1000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per case (default 200)")
+    parser.add_argument("--budget", type=float, default=1.0, help="max seconds per case and round (default 1)")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over all cases, best kept (default 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p50 slowdown (default 0.5)")
+    args = parser.parse_args()
+
+    # The harness seeds the in-memory store directly; sessions stay in this process
+    os.environ.update(STORAGE_BACKEND="memory", SESSION_BACKEND="memory")
+    os.environ.pop("WAL_DIR", None)
+    os.environ.pop("REMINDER_INTERVAL", None)
+    import app
+
+    start = time.perf_counter()
+    data = generate(args.clients, args.seed)
+    seed(app.db, data)
+    seeded = {name: len(records) for name, records in data.items()}
+    del data
+    print(f"seeded {sum(seeded.values())} records ({args.clients} clients) in {time.perf_counter() - start:.1f}s")
+
+    client = app.app.test_client()
+    anonymous = app.app.test_client()
+    client.post("/api/login", json={"username": "admin", "password": "password123"})
+    rng = random.Random(args.seed)
+    results = {}
+    for round_number in range(1, args.rounds + 1):
+        start = time.perf_counter()
+        for case in build_cases(app.db, app.change_log, client, anonymous, seeded):
+            result = run_case(case, client, rng, args.requests, args.budget)
+            results[case.name] = best_of(results.get(case.name), result)
+        print(f"round {round_number}/{args.rounds} took {time.perf_counter() - start:.1f}s", flush=True)
+
+    print(f"{'case':<44} {'n':>6} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        print(f"{name:<44} {result['n']:>6} {result['rps']:>10.0f} {result['p50']:>9.3f} {result['p99']:>9.3f}")
+
+    if args.save:
+        with open(args.baseline, "w") as out:
+            json.dump({"clients": args.clients, "seed": args.seed, "results": results}, out, indent=1)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against (run with --save to record one)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline["clients"], baseline["seed"]) != (args.clients, args.seed):
+        print(f"baseline was recorded at {baseline['clients']} clients / seed {baseline['seed']}; not comparing")
+        return
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for name, problems in regressions.items():
+        print(f"REGRESSION {name}: {', '.join(problems)}")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline allows")
+        sys.exit(1)
+    print(f"no regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
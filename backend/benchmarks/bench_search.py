@@ -0,0 +1,57 @@
+# backend/benchmarks/bench_search.py
+
+# Search latency over a large synthetic store, plus the cost of keeping the index current.
+# Run from the backend directory: python benchmarks/bench_search.py [documents]
+
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex
+from store import Store
+
+FIRST = ["alice", "bob", "charlie", "dana", "erin", "frank", "grace", "heidi", "ivan", "judy"]
+WORDS = ["website", "redesign", "seo", "campaign", "content", "payment", "gateway", "login",
+         "mobile", "report", "export", "audit", "migration", "branding", "hosting", "analytics"]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(1)
+    per = size // 4
+    # A long tail of rare words (like company names) next to a few very common ones
+    word = lambda: rng.choice(WORDS) if rng.random() < 0.7 else f"w{rng.randrange(size // 10)}"
+    data = {
+        "clients": [{"id": i, "name": f"{rng.choice(FIRST)} {word()}", "email": f"c{i}@example.com",
+                     "company": f"{word()} ltd", "notes": f"{word()} {word()}"} for i in range(1, per + 1)],
+        "projects": [{"id": i, "project_name": f"{word()} {word()}", "description": f"{word()} {word()} {word()}"} for i in range(1, per + 1)],
+        "tasks": [{"id": i, "name": f"{word()} {word()}"} for i in range(1, per + 1)],
+        "quotes": [{"id": i, "notes": f"{word()} {word()}", "quote_items": [{"name": word()}]} for i in range(1, per + 1)],
+        "invoices": [],
+        "bugs": [],
+    }
+    store = Store(data)
+
+    start = time.perf_counter()
+    index = SearchIndex(store)
+    print(f"{per * 4} documents indexed in {time.perf_counter() - start:.1f}s, {len(index._postings)} terms")
+
+    queries = ["a", "al", "alice", "web", "website red", "alice seo", f"w{size // 20}", "seo campaign content", "zzz"]
+    for query in queries:
+        per_call = min(timeit.repeat(lambda: index.search(query), number=20, repeat=3)) / 20
+        print(f"  search {query!r:<24} {per_call * 1e3:8.3f} ms  ({len(index.search(query))} hits)")
+
+    clients = store["clients"]
+    ids = [rng.randint(1, per) for _ in range(10_000)]
+    start = time.perf_counter()
+    for record_id in ids:
+        clients.update(record_id, {"notes": f"{word()} {word()}"})
+    print(f"  update + reindex       {(time.perf_counter() - start) / len(ids) * 1e6:8.1f} us/write")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# backend/benchmarks/bench_store.py
+
+# Micro-benchmark: list scans (the old `db` layout) vs the indexed Store.
+# Run from the backend directory: python benchmarks/bench_store.py [records]
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import Collection
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = [{"id": i, "name": f"Client {i}"} for i in range(1, size + 1)]
+    as_list = list(records)
+    collection = Collection("clients", [dict(r) for r in records])
+    probes = [random.randint(1, size) for _ in range(200)]
+
+    def list_lookup():
+        for record_id in probes:
+            next((c for c in as_list if c["id"] == record_id), None)
+
+    def store_lookup():
+        for record_id in probes:
+            collection.get(record_id)
+
+    def list_next_id():
+        return max([item["id"] for item in as_list], default=0) + 1
+
+    print(f"{size} records, {len(probes)} lookups per run")
+    for label, fn, number in [
+        ("list scan lookup", list_lookup, 3),
+        ("store lookup", store_lookup, 1000),
+        ("list max() next id", list_next_id, 10),
+        ("store next_id", collection.next_id, 100_000),
+    ]:
+        per_call = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print(f"  {label:<22} {per_call * 1e6:12.2f} us/call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_workers.py
+
+# Multi-process serving with server-side sessions: pre-forks N worker processes on one
+# listening socket (the way gunicorn's sync workers run), logs in once through whichever
+# worker accepts, then sends authenticated GETs from several client threads. Every
+# response must be a 200 whichever worker serves it; with per-process signed cookies
+# most of them used to be 401s. Reports requests/s per worker count.
+# Run from the backend directory: python benchmarks/bench_workers.py [seconds] [max_workers]
+#
+# Throughput only scales with worker count up to the number of CPUs on the host.
+
+import http.client
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CLIENT_THREADS = 8
+
+
+def serve(sock):
+    # Worker process body: the app is imported after the fork, so nothing (SQLite
+    # connections, threads) is inherited from the parent
+    from werkzeug.serving import make_server
+    import app
+    server = make_server("127.0.0.1", sock.getsockname()[1], app.app, fd=sock.fileno())
+    server.RequestHandlerClass.log_request = lambda *args: None
+    server.serve_forever()
+
+
+def start_workers(count, sock):
+    pids = []
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                serve(sock)
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    return pids
+
+
+def request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    if cookie:
+        headers["Cookie"] = cookie
+    conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+def wait_ready(port):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            request(port, "GET", "/api/users")
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("workers did not start")
+
+
+def run(workers, seconds, session_db):
+    os.environ["SESSION_DB"] = session_db
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(128)
+    port = sock.getsockname()[1]
+    pids = start_workers(workers, sock)
+    try:
+        wait_ready(port)
+        login = request(port, "POST", "/api/login", {"username": "admin", "password": "password123"})
+        cookie = login.getheader("Set-Cookie").split(";", 1)[0]
+
+        stop = threading.Event()
+        statuses = {}
+        lock = threading.Lock()
+
+        def client():
+            mine = {}
+            while not stop.is_set():
+                status = request(port, "GET", "/api/users", cookie=cookie).status
+                mine[status] = mine.get(status, 0) + 1
+            with lock:
+                for status, count in mine.items():
+                    statuses[status] = statuses.get(status, 0) + count
+
+        threads = [threading.Thread(target=client) for _ in range(CLIENT_THREADS)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return sum(statuses.values()) / seconds, statuses
+    finally:
+        for pid in pids:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        sock.close()
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"{os.cpu_count()} CPUs, {CLIENT_THREADS} client threads, GET /api/users with one login cookie")
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        count = 1
+        while count <= max_workers:
+            throughput, statuses = run(count, seconds, os.path.join(directory, f"sessions-{count}.db"))
+            ok = ok and set(statuses) == {200}
+            print(f"  {count:>2} workers {throughput:10.0f} req/s  statuses {dict(sorted(statuses.items()))}")
+            count *= 2
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# backend/benchmarks/stress_store.py
+
+# Concurrency stress test for the in-memory Store: writer threads insert/update/delete
+# and allocate ids while reader threads page, scan and take consistent_read() views,
+# checking invariants the whole time. Then read throughput is measured with 1..N threads
+# running next to a writer.
+# Run from the backend directory: python benchmarks/stress_store.py [seconds] [threads]
+#
+# Invariants checked:
+# - next_id() never hands the same id to two threads
+# - a record is never seen half-updated (every update writes "a" and "b" together)
+# - paging through a view returns exactly view.all() in id order, with no duplicates
+# - a view is frozen: re-reading it after more writes gives the same records
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import Store
+
+INITIAL = 20_000
+
+
+def make_store():
+    return Store({"items": [{"id": i, "a": 0, "b": 0} for i in range(1, INITIAL + 1)], "other": []})
+
+
+def writer(db, stop, allocated, errors):
+    rng = random.Random()
+    items = db["items"]
+    mine = []
+    try:
+        while not stop.is_set():
+            roll = rng.random()
+            if roll < 0.4:
+                record_id = items.next_id()
+                mine.append(record_id)
+                items.insert({"id": record_id, "a": 0, "b": 0})
+            elif roll < 0.8:
+                record_id = rng.randint(1, items.sequence)
+                if record_id in items:
+                    value = rng.random()
+                    try:
+                        items.update(record_id, {"a": value, "b": value})
+                    except KeyError: # Deleted by another writer in between
+                        pass
+            else:
+                items.delete(rng.randint(1, items.sequence))
+    except Exception as e:
+        errors.append(f"writer: {e!r}")
+    allocated.append(mine)
+
+
+def reader(db, stop, errors):
+    items = db["items"]
+    try:
+        while not stop.is_set():
+            for record in items.page(random.randint(0, items.sequence), 200)[0]:
+                if record["a"] != record["b"]:
+                    errors.append(f"torn record {record}")
+            with db.consistent_read("items") as view:
+                expected = view["items"].all()
+                paged, after = [], None
+                while True:
+                    rows, after = view["items"].page(after, 1000)
+                    paged.extend(rows)
+                    if after is None:
+                        break
+                ids = [r["id"] for r in paged]
+                if ids != sorted(set(ids)) or ids != sorted(r["id"] for r in expected):
+                    errors.append("paging a view disagreed with view.all()")
+                time.sleep(0.001) # Let writers run, then check the view did not move
+                if view["items"].all() != expected:
+                    errors.append("view changed after it was taken")
+    except Exception as e:
+        errors.append(f"reader: {e!r}")
+
+
+def stress(seconds, threads):
+    db = make_store()
+    stop = threading.Event()
+    allocated, errors = [], []
+    workers = [threading.Thread(target=writer, args=(db, stop, allocated, errors)) for _ in range(threads)]
+    workers += [threading.Thread(target=reader, args=(db, stop, errors)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    ids = [record_id for mine in allocated for record_id in mine]
+    if len(ids) != len(set(ids)):
+        errors.append(f"{len(ids) - len(set(ids))} duplicate ids from next_id()")
+    items = db["items"]
+    if [r["id"] for r in items.page(None, len(items) + 1)[0]] != sorted(r["id"] for r in items.all()):
+        errors.append("final page() order disagrees with all()")
+    print(f"stress: {threads} writers + {threads} readers for {seconds}s, {len(ids)} ids allocated, "
+          f"{len(items)} records left: {'OK' if not errors else f'{len(errors)} errors'}")
+    for error in errors[:10]:
+        print(f"  {error}")
+    return not errors
+
+
+def read_throughput(seconds, threads):
+    db = make_store()
+    items = db["items"]
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def read(slot):
+        rng = random.Random(slot)
+        while not stop.is_set():
+            items.get(rng.randint(1, INITIAL))
+            items.page(rng.randint(0, INITIAL), 20)
+            counts[slot] += 1
+
+    workers = [threading.Thread(target=read, args=(slot,)) for slot in range(threads)]
+    workers.append(threading.Thread(target=writer, args=(db, stop, [], [])))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    ok = stress(seconds, threads)
+    print("read throughput (get + 20-row page per op, one concurrent writer):")
+    count = 1
+    while count <= threads:
+        print(f"  {count:>2} reader threads {read_throughput(seconds / 2, count):12.0f} ops/s")
+        count *= 2
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# backend/benchmarks/synthetic.py
+
+# Reproducible synthetic data shaped like app.py's seed_data, at any scale from a
+# thousand to a million clients. The same (clients, seed) always gives the same records.
+#
+# Fan-out per client (averages): 1.5 quotes with 1-4 items each, 1 project, 1 invoice per
+# project (pointing at one of the client's quotes when it has any), 4 tasks and 1.5 bugs
+# per project. That is about 10 records per client, so 1M clients is about 10M records.
+# Records carry the same fields, copied names included, as the ones the POST handlers
+# create (see bulk.COLUMNS).
+#
+# Used by bench_routes.py; run on its own it prints the record counts and generation time:
+#   python benchmarks/synthetic.py [clients] [seed]
+
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+FIRST = ["Alice", "Bob", "Charlie", "Dana", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy",
+         "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Victor", "Walter", "Zoe"]
+LAST = ["Smith", "Johnson", "Brown", "Naidoo", "Dlamini", "Williams", "Jones", "Garcia", "Mokoena",
+        "Miller", "Davis", "Botha", "Wilson", "Taylor", "Khumalo", "Moore", "Jackson", "Martin"]
+COMPANY_WORDS = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Soylent", "Hooli",
+                 "Vandelay", "Cyberdyne", "Tyrell", "Wonka", "Gringotts", "Oscorp", "Aperture"]
+COMPANY_SUFFIXES = ["Corp", "Ltd", "Inc.", "Holdings", "Group", "(Pty) Ltd"]
+WORDS = ["website", "redesign", "seo", "campaign", "content", "payment", "gateway", "login", "mobile",
+         "report", "export", "audit", "migration", "branding", "hosting", "analytics", "dashboard",
+         "newsletter", "checkout", "search", "onboarding", "integration", "api", "performance"]
+SERVICES = [
+    ("Website Design", "Full responsive website design", 1500.00, "fixed"),
+    ("Content Writing (per page)", "SEO optimized content writing", 50.00, "per page"),
+    ("Monthly SEO Package", "Ongoing SEO optimization and reporting", 300.00, "per month"),
+    ("Consultation", "Hourly consultation session", 100.00, "per hour"),
+    ("Logo Design", "Logo and brand guidelines", 450.00, "fixed"),
+    ("Hosting", "Managed hosting", 25.00, "per month"),
+    ("E-commerce Setup", "Online store setup and payment integration", 2200.00, "fixed"),
+    ("Maintenance", "Updates, backups and monitoring", 120.00, "per month"),
+    ("Copy Editing", "Proofreading and editing", 35.00, "per page"),
+    ("Analytics Setup", "Tracking plan and dashboards", 600.00, "fixed"),
+]
+CATEGORIES = ["Design", "Backend", "Frontend", "SEO", "Content", "QA", "DevOps"]
+PRIORITIES = ["Low", "Medium", "High"]
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+QUOTE_STATUSES = ["Draft", "Sent", "Accepted", "Rejected"]
+PROJECT_STATUSES = ["Planning", "In Progress", "On Hold", "Completed", "Cancelled"]
+INVOICE_STATUSES = ["Draft", "Sent", "Paid", "Overdue", "Cancelled"]
+TASK_STATUSES = ["Pending", "Planning", "In Progress", "Completed"]
+BUG_STATUSES = ["Open", "In Progress", "Closed"]
+
+START = date(2023, 1, 1)
+DAYS = 4 * 365
+
+# The seed users, so the usual logins keep working
+USERS = [
+    {"id": 1, "username": "admin", "password": "password123", "role": "admin"},
+    {"id": 2, "username": "demo", "password": "demo", "role": "demo"},
+]
+
+
+def generate(clients, seed=1):
+    # Returns {collection: [records]} with ids 1..n per collection
+    rng = random.Random(seed)
+    dates = [(START + timedelta(days=offset)).isoformat() for offset in range(DAYS + 120)]
+    words = lambda count: " ".join(rng.choice(WORDS) for _ in range(count))
+    data = {name: [] for name in ("clients", "quotes", "projects", "invoices", "tasks", "bugs")}
+    data["users"] = [dict(user) for user in USERS]
+    data["services"] = [{"id": i, "name": name, "description": description, "price": price, "unit": unit}
+                        for i, (name, description, price, unit) in enumerate(SERVICES, 1)]
+    quotes, projects, invoices = data["quotes"], data["projects"], data["invoices"]
+    tasks, bugs = data["tasks"], data["bugs"]
+
+    for client_id in range(1, clients + 1):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        data["clients"].append({
+            "id": client_id, "name": name, "email": f"client{client_id}@example.com",
+            "phone": f"0{rng.randint(60, 89)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "company": company, "notes": f"Interested in {words(3)}."})
+
+        client_quotes = []
+        for _ in range(rng.choice((0, 1, 1, 2, 2, 3))):
+            items = []
+            for service in rng.sample(data["services"], rng.randint(1, 4)):
+                items.append({"service_id": service["id"], "name": service["name"], "price": service["price"],
+                              "unit": service["unit"], "quantity": rng.randint(1, 5)})
+            quote = {
+                "id": len(quotes) + 1, "client_id": client_id, "client_name": name, "client_company": company,
+                "quote_date": dates[rng.randrange(DAYS)], "status": rng.choice(QUOTE_STATUSES),
+                "total_amount": round(sum(item["price"] * item["quantity"] for item in items), 2),
+                "notes": f"Quote for {words(2)}.", "quote_items": items}
+            quotes.append(quote)
+            client_quotes.append(quote)
+
+        for _ in range(rng.choice((0, 1, 1, 2))):
+            start = rng.randrange(DAYS)
+            project_name = f"{company} {words(2).title()}"
+            project_id = len(projects) + 1
+            projects.append({
+                "id": project_id, "project_name": project_name, "client_id": client_id, "client_name": name,
+                "client_company": company, "description": f"{words(6).capitalize()}.",
+                "start_date": dates[start], "end_date": dates[start + rng.randint(14, 119)],
+                "status": rng.choice(PROJECT_STATUSES), "notes": f"Next up: {words(2)}."})
+
+            quote = rng.choice(client_quotes) if client_quotes else None
+            items = quote["quote_items"] if quote else []
+            invoice_day = start + rng.randint(14, 119)
+            invoices.append({
+                "id": len(invoices) + 1, "client_id": client_id, "client_name": name, "client_company": company,
+                "quote_id": quote["id"] if quote else None, "project_id": project_id,
+                "project_name": project_name, "invoice_date": dates[invoice_day],
+                "due_date": (START + timedelta(days=invoice_day + 30)).isoformat(),
+                "status": rng.choice(INVOICE_STATUSES),
+                "total_amount": quote["total_amount"] if quote else float(rng.randint(1, 50) * 100),
+                "notes": f"Invoice for {words(2)}.", "invoice_items": items})
+
+            for _ in range(rng.randint(0, 8)):
+                status = rng.choice(TASK_STATUSES)
+                tasks.append({
+                    "id": len(tasks) + 1, "project_id": project_id, "project_name": project_name,
+                    "client_name": name, "name": words(3).capitalize(), "category": rng.choice(CATEGORIES),
+                    "due_date": dates[start + rng.randint(1, 119)], "status": status,
+                    "priority": rng.choice(PRIORITIES),
+                    "progress": 100 if status == "Completed" else rng.choice((0, 10, 20, 50, 70, 90))})
+
+            for _ in range(rng.randint(0, 3)):
+                bugs.append({
+                    "id": len(bugs) + 1, "project_id": project_id, "project_name": project_name,
+                    "client_name": name, "name": f"{words(2).capitalize()} broken",
+                    "severity": rng.choice(SEVERITIES), "status": rng.choice(BUG_STATUSES),
+                    "reported_date": dates[start + rng.randint(1, 119)]})
+    return data
+
+
+def seed(db, data):
+    # Replaces the contents of an in-memory Store (e.g. app.db) with `data`
+    db.restore({name: (len(records), records) for name, records in data.items()})
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    start = time.perf_counter()
+    data = generate(clients, int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+    print(f"generated in {time.perf_counter() - start:.1f}s")
+    for name, records in data.items():
+        print(f"  {name:<9} {len(records):>10} records")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+# backend/bulk.py
+
+# Streaming bulk import and export (CSV or NDJSON) behind /api/import/<collection> and
+# /api/export/<collection>.
+#
+# Import reads the request body incrementally and works in batches of IMPORT_BATCH_SIZE
+# rows. For each batch the referenced clients/quotes/projects are fetched with one
+# get_many() per parent collection, valid rows get a block of ids from reserve_ids() and
+# the batch goes in with insert_many() (one lock / transaction and one WAL fsync).
+# Records are shaped exactly like the ones the POST handlers in app.py create,
+# including the copied client/project names. Quotes and invoices are priced by the
+# PriceBook (see pricing.py) as on POST: the total_amount in the file is ignored, and a
+# row whose lines cannot be priced is an error. Ids in the file are ignored; new ids are
+# allocated in file order and reported back as ranges. Rows that fail validation are
+# skipped and reported with their line number; the rest are imported.
+#
+# Export walks the collection in keyset pages, like the ?stream=1 GETs. Nested item
+# lists (quote_items / invoice_items) are JSON text in CSV columns, both ways.
+
+import csv
+import io
+import json
+import math
+
+from pricing import ITEM_FIELDS, PricingError
+from streaming import STREAM_PAGE_SIZE
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ("csv", "ndjson")
+
+# Field order of each collection's records, as created by the POST handlers
+COLUMNS = {
+    "clients": ("id", "name", "email", "phone", "company", "notes"),
+    "services": ("id", "name", "description", "price", "unit"),
+    "quotes": ("id", "client_id", "client_name", "client_company", "quote_date", "status",
+               "total_amount", "notes", "quote_items"),
+    "projects": ("id", "project_name", "client_id", "client_name", "client_company", "description",
+                 "start_date", "end_date", "status", "notes"),
+    "invoices": ("id", "client_id", "client_name", "client_company", "quote_id", "project_id",
+                 "project_name", "invoice_date", "due_date", "status", "total_amount", "notes",
+                 "invoice_items"),
+    "tasks": ("id", "project_id", "project_name", "client_name", "name", "category", "due_date",
+              "status", "priority", "progress"),
+    "bugs": ("id", "project_id", "project_name", "client_name", "name", "severity", "status",
+             "reported_date"),
+}
+
+# foreign key field -> collection it points into
+REFERENCES = {"client_id": "clients", "quote_id": "quotes", "project_id": "projects"}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+# --- Field conversion (CSV cells arrive as strings, NDJSON values as JSON types) ---
+
+def _int(row, field, default=None):
+    value = row.get(field)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        raise ImportRowError(f"'{field}' must be an integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError): # OverflowError: NDJSON Infinity
+        raise ImportRowError(f"'{field}' must be an integer")
+
+
+def _float(row, field):
+    # NaN and infinities ("nan", "inf" in CSV; NaN, Infinity in NDJSON) are not numbers here
+    try:
+        value = float(row.get(field))
+    except (TypeError, ValueError):
+        raise ImportRowError(f"'{field}' must be a number")
+    if not math.isfinite(value):
+        raise ImportRowError(f"'{field}' must be a number")
+    return value
+
+
+def _items(row, field):
+    value = row.get(field)
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ImportRowError(f"'{field}' must be a JSON list")
+    if not isinstance(value, list):
+        raise ImportRowError(f"'{field}' must be a JSON list")
+    return value
+
+
+def _parent(parents, row, field, required, label):
+    record = parents[REFERENCES[field]].get(_int(row, field))
+    if record is None and required:
+        raise ImportRowError(f"{label} not found")
+    return record
+
+
+# --- Record builders, mirroring the POST handlers ---
+
+def _client(row, parents):
+    return {"name": row.get("name"), "email": row.get("email"), "phone": row.get("phone"),
+            "company": row.get("company"), "notes": row.get("notes")}
+
+
+def _service(row, parents):
+    return {"name": row.get("name"), "description": row.get("description"),
+            "price": _float(row, "price"), "unit": row.get("unit")}
+
+
+def _quote(row, parents):
+    client = _parent(parents, row, "client_id", True, "Client")
+    return {"client_id": client["id"], "client_name": client["name"], "client_company": client.get("company"),
+            "quote_date": row.get("quote_date"), "status": row.get("status"),
+            "total_amount": None, "notes": row.get("notes"), # Priced in _import_batch
+            "quote_items": _items(row, "quote_items")}
+
+
+def _project(row, parents):
+    client = _parent(parents, row, "client_id", False, "Client")
+    return {"project_name": row.get("project_name"), "client_id": _int(row, "client_id"),
+            "client_name": client["name"] if client else None,
+            "client_company": client.get("company") if client else None,
+            "description": row.get("description"), "start_date": row.get("start_date"),
+            "end_date": row.get("end_date"), "status": row.get("status"), "notes": row.get("notes")}
+
+
+def _invoice(row, parents):
+    client = _parent(parents, row, "client_id", True, "Client")
+    project = _parent(parents, row, "project_id", False, "Project")
+    return {"client_id": client["id"], "client_name": client["name"], "client_company": client.get("company"),
+            "quote_id": _int(row, "quote_id"), "project_id": _int(row, "project_id"),
+            "project_name": project["project_name"] if project else None,
+            "invoice_date": row.get("invoice_date"), "due_date": row.get("due_date"),
+            "status": row.get("status"), "total_amount": None, # Priced in _import_batch
+            "notes": row.get("notes"), "invoice_items": _items(row, "invoice_items")}
+
+
+def _task(row, parents):
+    project = _parent(parents, row, "project_id", True, "Project")
+    return {"project_id": project["id"], "project_name": project["project_name"],
+            "client_name": project.get("client_name"), "name": row.get("name"),
+            "category": row.get("category"), "due_date": row.get("due_date"), "status": row.get("status"),
+            "priority": row.get("priority"), "progress": _int(row, "progress", 0)}
+
+
+def _bug(row, parents):
+    project = _parent(parents, row, "project_id", True, "Project")
+    return {"project_id": project["id"], "project_name": project["project_name"],
+            "client_name": project.get("client_name"), "name": row.get("name"),
+            "severity": row.get("severity"), "status": row.get("status"),
+            "reported_date": row.get("reported_date")}
+
+
+BUILDERS = {"clients": _client, "services": _service, "quotes": _quote, "projects": _project,
+            "invoices": _invoice, "tasks": _task, "bugs": _bug}
+
+
+# --- Parsing ---
+
+def _ndjson_rows(text):
+    # Yields (line_number, row); a malformed line yields an ImportRowError as its row
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, ImportRowError("Invalid JSON")
+            continue
+        yield line_number, row if isinstance(row, dict) else ImportRowError("Each line must be a JSON object")
+
+
+def _csv_rows(text):
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Empty cells mean "not given", like a missing key in a JSON body
+        yield reader.line_num, {field: value if value != "" else None for field, value in row.items() if field}
+
+
+def iter_rows(stream, file_format):
+    # Decodes the byte stream incrementally; nothing beyond the current line is buffered
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="" if file_format == "csv" else None)
+    return _csv_rows(text) if file_format == "csv" else _ndjson_rows(text)
+
+
+# --- Import ---
+
+def _import_batch(db, name, batch, price_book, result):
+    parents = {}
+    for field, parent_name in REFERENCES.items():
+        ids = set()
+        for _, row in batch:
+            if isinstance(row, dict) and row.get(field) is not None:
+                try:
+                    ids.add(_int(row, field))
+                except ImportRowError:
+                    pass
+        parents[parent_name] = db[parent_name].get_many(ids) if ids else {}
+
+    records = []
+    for line_number, row in batch:
+        try:
+            if isinstance(row, ImportRowError):
+                raise row
+            record = BUILDERS[name](row, parents)
+            if name in ITEM_FIELDS:
+                record.update(price_book.price_document(name, record))
+            records.append(record)
+        except (ImportRowError, PricingError) as e:
+            result["skipped"] += 1
+            if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                result["errors"].append({"line": line_number, "message": str(e)})
+    if not records:
+        return
+    first_id = db[name].reserve_ids(len(records))
+    records = [{"id": first_id + offset, **record} for offset, record in enumerate(records)]
+    db[name].insert_many(records)
+    result["imported"] += len(records)
+    result["ids"].append([first_id, first_id + len(records) - 1])
+
+
+def import_rows(db, name, rows, price_book, batch_size=IMPORT_BATCH_SIZE):
+    # `rows` yields (line_number, row) pairs, e.g. from iter_rows(); `price_book` is the
+    # app's PriceBook over the same db
+    result = {"imported": 0, "skipped": 0, "ids": [], "errors": []}
+    batch = []
+    for line_row in rows:
+        batch.append(line_row)
+        if len(batch) >= batch_size:
+            _import_batch(db, name, batch, price_book, result)
+            batch = []
+    if batch:
+        _import_batch(db, name, batch, price_book, result)
+    return result
+
+
+# --- Export ---
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def iter_export(db, name, file_format, dumps):
+    # Yields the collection as CSV (header first) or NDJSON, one keyset page per chunk
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    columns = COLUMNS[name]
+    if file_format == "csv":
+        writer.writerow(columns)
+        yield buffer.getvalue()
+    after = None
+    while True:
+        rows, after = db[name].page(after, STREAM_PAGE_SIZE)
+        if file_format == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_cell(row.get(column)) for column in columns] for row in rows)
+            yield buffer.getvalue()
+        else:
+            yield "".join(dumps(row) + "\n" for row in rows)
+        if after is None:
+            break
@@ -0,0 +1,212 @@
+# backend/changes.py
+
+# Change feed behind /api/changes, for clients that keep a local copy of the collections
+# and sync it in O(changes) instead of refetching whole lists after every edit.
+#
+# Every insert, update and delete gets the next number of one global sequence. The
+# store listener runs under the write lock, so the numbers follow commit order. The log
+# keeps, per record, the number of its latest change and whether that change was a
+# delete (a tombstone). GET /api/changes?since=<seq> returns the records changed after
+# `seq`, oldest change first, each as its list row would look now. The reply's `seq` is
+# what the client sends next time.
+#
+# - Compaction: only a record's latest change is kept, so a record edited a hundred times
+#   is one entry, and the log holds at most `window` entries. Dropping the oldest raises
+#   the floor. A client whose `since` is below the floor has missed changes and is told
+#   to reset.
+# - Joined fields: list rows carry fields of their parent record (JOINS in
+#   enrichment.py). A change to those fields of a parent also logs the records joined to
+#   it, found through the reverse foreign key indexes: a renamed client's quotes,
+#   projects and invoices, a renamed project's tasks, bugs and invoices.
+# - With the memory backend (ChangeLog), sequence numbers restart with the process, so
+#   replies carry the log's own epoch, and a client sending another epoch is told to
+#   reset. The log also restarts when a collection's version moved without us seeing
+#   the change (a snapshot restore), as aggregates.py rebuilds.
+# - With the SQLite backend (SqliteChangeLog), the log is a table of the database,
+#   written inside each write's transaction by whichever worker process makes it. The
+#   workers share one sequence and the database file's epoch, so a client may poll any
+#   of them, and restarts keep the log.
+#
+# On "reset": true the client sets `seq` aside, refetches the collections it keeps, and
+# then syncs from that `seq`. Changes landing during the refetch come again, and
+# applying a change twice is harmless.
+
+import threading
+import uuid
+from collections import OrderedDict
+
+from enrichment import JOINS
+from query import QueryError
+from store import catch_up
+
+FEED_COLLECTIONS = ("clients", "services", "quotes", "projects", "invoices", "tasks", "bugs")
+CHANGE_LOG_WINDOW = 50_000
+DEFAULT_CHANGES_LIMIT = 1000
+MAX_CHANGES_LIMIT = 10_000
+
+
+def _dependents_by_parent(joins):
+    # parent collection -> [(child collection, foreign key, parent fields the child shows)]
+    dependents = {}
+    for child_name, child_joins in joins.items():
+        for foreign_key, parent_name, fields in child_joins:
+            dependents.setdefault(parent_name, []).append((child_name, foreign_key, tuple(field for _, field in fields)))
+    return dependents
+
+
+DEPENDENTS = _dependents_by_parent(JOINS)
+COMPACT_EVERY = 1000 # SqliteChangeLog trims the table after this many logged changes
+
+
+def _dependents(db, name, old, new):
+    # The records whose list rows show fields of this one that changed
+    found = []
+    record = new if new is not None else old
+    for child_name, foreign_key, fields in DEPENDENTS.get(name, ()):
+        if old is not None and new is not None and all(old.get(field) == new.get(field) for field in fields):
+            continue
+        for child in db[child_name].referencing(foreign_key, record["id"]):
+            found.append((child_name, child["id"]))
+    return found
+
+
+def parse_changes(args):
+    # Returns (since, epoch, limit, collections); since is None when not given
+    values = {}
+    for name in ("since", "limit"):
+        value = args.get(name)
+        if value is None or value == "":
+            values[name] = None
+            continue
+        try:
+            values[name] = int(value)
+        except ValueError:
+            raise QueryError(f"'{name}' must be an integer")
+    if values["since"] is not None and values["since"] < 0:
+        raise QueryError("'since' must not be negative")
+    limit = DEFAULT_CHANGES_LIMIT if values["limit"] is None else values["limit"]
+    if limit < 1:
+        raise QueryError("'limit' must be a positive integer")
+    collections = args.get("collections")
+    if collections:
+        collections = [name.strip() for name in collections.split(",") if name.strip()]
+        unknown = [name for name in collections if name not in FEED_COLLECTIONS]
+        if unknown:
+            raise QueryError(f"Unknown collection '{unknown[0]}'")
+    return values["since"], args.get("epoch") or None, min(limit, MAX_CHANGES_LIMIT), collections or None
+
+
+class ChangeLog:
+    def __init__(self, db, window=CHANGE_LOG_WINDOW):
+        self._db = db
+        self._window = window
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # (collection, id) -> (seq, deleted), in seq order
+        self._seq = 0
+        self._floor = 0 # Changes up to here may have been dropped
+        self._seen = {name: db.version(name) for name in FEED_COLLECTIONS if name in db}
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        record = new if new is not None else old
+        dependents = _dependents(self._db, collection_name, old, new)
+        with self._lock:
+            self._log(collection_name, record["id"], new is None)
+            for child_name, child_id in dependents:
+                self._log(child_name, child_id, False)
+            self._seen[collection_name] += 1
+
+    def _log(self, name, record_id, deleted):
+        # Caller holds the lock
+        self._seq += 1
+        key = (name, record_id)
+        self._entries.pop(key, None)
+        self._entries[key] = (self._seq, deleted)
+        while len(self._entries) > self._window:
+            _, (seq, _) = self._entries.popitem(last=False)
+            self._floor = seq
+
+    def _restart(self, name):
+        # Called by catch_up, under the write lock and ours, when changes happened that
+        # the log missed
+        self._seq += 1
+        self._floor = self._seq
+        self._entries.clear()
+        self._seen = {name: self._db.version(name) for name in self._seen}
+
+    def changes(self, since, epoch=None, limit=DEFAULT_CHANGES_LIMIT, collections=None):
+        # Returns (changes, seq, reset, has_more). `changes` lists (seq, collection, id,
+        # deleted), oldest first. On reset it is empty and `seq` is where to sync from.
+        catch_up(self._db, self._lock, self._seen, self._restart)
+        with self._lock:
+            if since is None or since < self._floor or since > self._seq or epoch not in (None, self.epoch):
+                return [], self._seq, True, False
+            newer = []
+            for (name, record_id), (seq, deleted) in reversed(self._entries.items()):
+                if seq <= since:
+                    break
+                if collections is None or name in collections:
+                    newer.append((seq, name, record_id, deleted))
+            current = self._seq
+        newer.reverse()
+        if len(newer) > limit:
+            return newer[:limit], newer[limit - 1][0], False, True
+        return newer, current, False, False
+
+
+class SqliteChangeLog:
+    # The same log as ChangeLog, kept in the SQLite database: seq is the changes table's
+    # AUTOINCREMENT key, and a record's latest change replaces its previous row. The
+    # floor lives in the meta table.
+    def __init__(self, db, window=CHANGE_LOG_WINDOW):
+        self._db = db
+        self._window = window
+        self.epoch = db.epoch
+        self._logged = 0 # Changes this process logged since it last trimmed the table
+        conn = db.connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, "
+            "record_id INTEGER NOT NULL, deleted INTEGER NOT NULL, UNIQUE (collection, record_id))")
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('changes_floor', '0')")
+        db.on_write(self.on_write)
+
+    def on_write(self, conn, collection_name, op, old, new):
+        # Runs inside the write's transaction, under the store's write lock
+        if collection_name not in FEED_COLLECTIONS:
+            return
+        record = new if new is not None else old
+        rows = [(collection_name, record["id"], new is None)]
+        rows.extend((child_name, child_id, False) for child_name, child_id in _dependents(self._db, collection_name, old, new))
+        conn.executemany("INSERT OR REPLACE INTO changes (collection, record_id, deleted) VALUES (?, ?, ?)", rows)
+        self._logged += len(rows)
+        if self._logged >= COMPACT_EVERY:
+            self._logged = 0
+            self._compact(conn)
+
+    def _compact(self, conn):
+        # Keeps the newest `window` entries; the table may run up to COMPACT_EVERY over
+        # between trims
+        row = conn.execute("SELECT seq FROM changes ORDER BY seq DESC LIMIT 1 OFFSET ?", (self._window,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM changes WHERE seq <= ?", row)
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'changes_floor'", (str(row[0]),))
+
+    def changes(self, since, epoch=None, limit=DEFAULT_CHANGES_LIMIT, collections=None):
+        # Same contract as ChangeLog.changes, read from one snapshot of the database
+        with self._db.consistent_read():
+            conn = self._db.connection()
+            floor = int(conn.execute("SELECT value FROM meta WHERE key = 'changes_floor'").fetchone()[0])
+            current = max(conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0], floor)
+            if since is None or since < floor or since > current or epoch not in (None, self.epoch):
+                return [], current, True, False
+            sql = "SELECT seq, collection, record_id, deleted FROM changes WHERE seq > ?"
+            if collections is not None:
+                sql += f" AND collection IN ({', '.join('?' for _ in collections)})"
+            rows = conn.execute(sql + " ORDER BY seq LIMIT ?", (since, *(collections or ()), limit + 1)).fetchall()
+        newer = [(seq, name, record_id, bool(deleted)) for seq, name, record_id, deleted in rows]
+        if len(newer) > limit:
+            return newer[:limit], newer[limit - 1][0], False, True
+        return newer, current, False, False
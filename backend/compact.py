@@ -0,0 +1,72 @@
+# backend/compact.py
+
+# Memory compaction for records held by the in-memory Store. Stored records are never
+# modified (see store.py), so records that are equal can share one object:
+#
+# - Line items (any list of dicts, i.e. quote_items / invoice_items) are hash-consed:
+#   equal items become the same dict. An item repeats the name, unit and price of its
+#   service, and most documents use a handful of services at a few quantities, so a
+#   million line items come down to a few thousand distinct dicts plus one list slot each.
+#   The first copy of an item that is kept also gets its short strings interned.
+# - Short strings elsewhere in a record (statuses, dates, the client and project names
+#   copied into dependent records) are interned, so each distinct value is stored once.
+#
+# Values are replaced by equal ones in place. The record's keys, key order and JSON
+# output are unchanged, so nothing that reads records can tell the difference. Items
+# only match when every value has the same type as well (1 is not 1.0 or True). A
+# negative zero never matches a positive one. Items holding unhashable values are kept as
+# they are. The table of shared items is cleared when it reaches MAX_SHARED_ITEMS, which
+# only costs sharing for items stored after that point.
+
+import sys
+
+MAX_SHARED_ITEMS = 1 << 16
+MAX_INTERNED_LENGTH = 48 # Longer strings (notes, descriptions) are rarely repeated
+
+
+def _token(value):
+    # An item value as it appears in the sharing key
+    if type(value) is float and value == 0:
+        return repr(value) # 0.0 == -0.0, but they serialize differently
+    return value
+
+
+def _intern_strings(record):
+    for key, value in record.items():
+        if type(value) is str and len(value) <= MAX_INTERNED_LENGTH:
+            record[key] = sys.intern(value)
+
+
+class Compactor:
+    # Not thread-safe by itself: the Store calls it under its write lock
+    def __init__(self):
+        self._items = {} # (keys, values, value types) -> the shared item dict
+
+    def record(self, record):
+        # Compacts `record` in place and returns it
+        for key, value in record.items():
+            if type(value) is str:
+                if len(value) <= MAX_INTERNED_LENGTH:
+                    record[key] = sys.intern(value)
+            elif type(value) is list and value and type(value[0]) is dict:
+                shared = [self._item(item) if type(item) is dict else item for item in value]
+                if any(new is not old for new, old in zip(shared, value)):
+                    record[key] = shared
+        return record
+
+    def _item(self, item):
+        values = tuple(item.values())
+        types = tuple(map(type, values))
+        if 0 in values: # 0.0 == -0.0, but they serialize differently
+            values = tuple(map(_token, values))
+        try:
+            key = (tuple(item), values, types)
+            shared = self._items.get(key)
+        except TypeError: # Unhashable value (a nested list or dict)
+            return item
+        if shared is None:
+            if len(self._items) >= MAX_SHARED_ITEMS:
+                self._items.clear()
+            _intern_strings(item)
+            shared = self._items[key] = item
+        return shared
@@ -0,0 +1,147 @@
+# backend/compression.py
+
+# Negotiated compression for the API's JSON, NDJSON and CSV responses. Brotli is used
+# when the client accepts it and the brotli package is installed; gzip otherwise.
+#
+# - A buffered body is compressed when it is at least min_bytes long. Below that, the
+#   headers outweigh the saving.
+# - A streamed body (?stream=1, exports) is compressed as it goes out. The compressor is
+#   flushed after every chunk, so the client can decode each page of rows as it arrives
+#   rather than waiting for the end. Streams use a faster gzip level than buffered bodies,
+#   whose compression the cache below pays once per data version.
+# - Compressed bodies of conditional GETs (see conditional_get in app.py) are cached
+#   under their ETag, which is built from the data versions the response reads. While
+#   nothing changes, repeated reads of a full collection are answered from the cache
+#   without rebuilding or compressing the body again. A write moves the versions, so the
+#   next read misses and its body replaces the old entry for that URL.
+#
+# Every compressible response carries Vary: Accept-Encoding, compressed or not. The
+# ETag stays weak and shared across encodings, which weak comparison allows.
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from metrics import REGISTRY
+
+try:
+    import brotli
+except ImportError: # Optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+COMPRESSED_CACHE_BYTES = 32 * 2**20
+GZIP_LEVEL = 6
+STREAM_GZIP_LEVEL = 3 # Streams are compressed on every request: about twice as fast as 6, 30% larger
+BROTLI_QUALITY = 5 # Beyond this, brotli gets much slower for little gain on JSON
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv")
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",) # Preferred first
+
+COMPRESSED_BODIES = REGISTRY.counter(
+    "app_compressed_body_cache_total", "Compressed bodies served from the cache (hit) or compressed (miss).", ("result",))
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def iter_compressed(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(STREAM_GZIP_LEVEL, zlib.DEFLATED, 31) # 31: gzip container
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        if chunk:
+            yield process(chunk.encode() if type(chunk) is str else chunk) + flush()
+    yield finish()
+
+
+class CompressedBodyCache:
+    def __init__(self, max_bytes=COMPRESSED_CACHE_BYTES):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict() # (url, encoding) -> (etag, body, headers), least recent first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, encoding, etag):
+        # (body, headers) when the cached body for this URL was built from the same data
+        with self._lock:
+            entry = self._entries.get((url, encoding))
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end((url, encoding))
+        return entry[1], entry[2]
+
+    def put(self, url, encoding, etag, body, headers):
+        if len(body) > self._max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((url, encoding), None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[url, encoding] = (etag, body, headers)
+            self._size += len(body)
+            while self._size > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[1])
+
+
+class Compressor:
+    def __init__(self, min_bytes=COMPRESS_MIN_BYTES, cache=None):
+        self.min_bytes = min_bytes
+        self.cache = cache
+
+    def negotiate(self):
+        # The encoding to send for the current request, or None. Honours q-values; ties
+        # go to brotli.
+        return request.accept_encodings.best_match(ENCODINGS)
+
+    def cached(self, etag):
+        # The cached compressed response for the current request at this data version
+        # (body, status, headers), or None
+        encoding = self.cache is not None and self.negotiate()
+        if not encoding:
+            return None
+        hit = self.cache.get(request.full_path, encoding, etag)
+        if hit is None:
+            return None
+        COMPRESSED_BODIES.inc(("hit",))
+        body, headers = hit
+        return body, 200, {**headers, "Content-Encoding": encoding}
+
+    def after_request(self, response):
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if "Content-Encoding" in response.headers: # Already compressed (a cache hit)
+            return response
+        if response.status_code != 200 or request.method == "HEAD":
+            return response
+        encoding = self.negotiate()
+        if not encoding:
+            return response
+        if response.is_streamed:
+            response.response = iter_compressed(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_bytes:
+                return response
+            compressed = compress(body, encoding)
+            etag, _ = response.get_etag()
+            if self.cache is not None and etag:
+                COMPRESSED_BODIES.inc(("miss",))
+                headers = {name: value for name, value in response.headers.items()
+                           if name in ("Content-Type", "X-Next-Cursor")}
+                self.cache.put(request.full_path, encoding, etag, compressed, headers)
+            response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,209 @@
+# backend/durability.py
+
+# Write-ahead log + snapshots for the in-memory Store, enabled with WAL_DIR=<directory>.
+#
+# Every insert/update/delete is appended to the current log as a small binary frame
+# (length, crc32, pickled payload) while the store's write lock is held, so frames are in
+# commit order. The fsync happens in the store's commit hook, after the lock is released,
+# with group commit: concurrent writers queue behind a single fsync, and everyone whose
+# frame it covered returns together.
+# Log entries are idempotent "put record" / "delete id" operations, so replaying a
+# frame that a snapshot already contains is harmless.
+#
+# A background thread periodically writes a compact pickle snapshot of all collections.
+# Checkpointing first rotates to a new log generation, then writes snapshot-<gen>,
+# which covers everything in older logs; only after the snapshot is renamed into place
+# are the older logs and snapshots removed. On startup the latest snapshot is mmapped
+# and unpickled, the remaining log tail is replayed, and a torn final frame (from a
+# crash mid-append) is truncated away.
+
+import mmap
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+
+FRAME_HEADER = struct.Struct("<II") # payload length, crc32 of payload
+SNAPSHOT_INTERVAL = 300 # seconds between checkpoints when there were writes
+
+_LOG_NAME = re.compile(r"^wal-(\d+)\.log$")
+_SNAPSHOT_NAME = re.compile(r"^snapshot-(\d+)\.bin$")
+
+
+def _generations(directory, pattern):
+    found = []
+    for filename in os.listdir(directory):
+        match = pattern.match(filename)
+        if match:
+            found.append(int(match.group(1)))
+    return sorted(found)
+
+
+def _replay(store, path):
+    # Applies every intact frame of one log file and returns the length of that prefix;
+    # anything after it is a torn or corrupt frame from a crash mid-append.
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(data):
+        length, crc = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        op, collection_name, body = pickle.loads(payload)
+        if collection_name in store:
+            if op == "put":
+                store[collection_name].put(body)
+            else:
+                store[collection_name].discard(body)
+        offset = start + length
+    return offset
+
+
+class Durability:
+    def __init__(self, directory, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+        self._store = None
+        self._generation = 0
+        self._file = None
+        self._write_lock = threading.Lock() # guards appends and log rotation
+        self._sync_lock = threading.Lock() # one fsync at a time; waiters piggyback on it
+        self._written = 0 # frames appended
+        self._synced = 0 # frames known to be on disk
+        self._dirty = False
+        self._pending = threading.local() # last frame written by this thread, not yet synced
+        self._checkpoint_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _path(self, kind, generation):
+        suffix = "log" if kind == "wal" else "bin"
+        return os.path.join(self.directory, f"{kind}-{generation}.{suffix}")
+
+    # --- Startup ---
+
+    def recover(self, store):
+        # Loads the latest snapshot into `store`, replays newer logs, then starts logging
+        self._store = store
+        snapshots = _generations(self.directory, _SNAPSHOT_NAME)
+        logs = _generations(self.directory, _LOG_NAME)
+        base = snapshots[-1] if snapshots else 0
+        if snapshots:
+            with open(self._path("snapshot", base), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    store.restore(pickle.loads(view))
+
+        tail = [generation for generation in logs if generation >= base]
+        good_length = 0
+        for generation in tail:
+            good_length = _replay(store, self._path("wal", generation))
+
+        self._generation = tail[-1] if tail else base
+        path = self._path("wal", self._generation)
+        if tail and os.path.getsize(path) != good_length:
+            with open(path, "r+b") as f:
+                f.truncate(good_length)
+        self._file = open(path, "ab")
+        store.subscribe(self.record)
+        store.on_commit(self.commit)
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="snapshotter", daemon=True)
+        self._thread.start()
+        return self
+
+    # --- Logging ---
+
+    def record(self, collection_name, op, old, new):
+        # Store listener: one frame per mutation, synced by commit() before the write returns
+        if op == "delete":
+            entry = ("delete", collection_name, old["id"])
+        else:
+            entry = ("put", collection_name, new)
+        self._pending.lsn = self._write(entry)
+
+    def commit(self):
+        # Store commit hook
+        lsn = getattr(self._pending, "lsn", 0)
+        if lsn:
+            self._pending.lsn = 0
+            self._sync(lsn)
+
+    def append(self, entry):
+        self._sync(self._write(entry))
+
+    def _write(self, entry):
+        payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._write_lock:
+            self._file.write(frame)
+            self._written += 1
+            self._dirty = True
+            return self._written
+
+    def _sync(self, lsn):
+        # Group commit: whoever holds the sync lock flushes everything written so far,
+        # so writers that queued behind it usually find their frame already synced.
+        with self._sync_lock:
+            if self._synced >= lsn:
+                return
+            with self._write_lock:
+                self._file.flush()
+                target = self._written
+                fileno = self._file.fileno()
+            os.fsync(fileno)
+            self._synced = max(self._synced, target)
+
+    # --- Checkpoints ---
+
+    def checkpoint(self):
+        with self._checkpoint_lock:
+            with self._sync_lock, self._write_lock:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._generation += 1
+                generation = self._generation
+                self._file = open(self._path("wal", generation), "ab")
+                self._synced = self._written
+                self._dirty = False
+
+            # Everything in logs older than `generation` is already in memory, so a dump
+            # taken now covers them (and possibly a few frames of the new log).
+            state = self._store.dump()
+            final = self._path("snapshot", generation)
+            temporary = final + ".tmp"
+            with open(temporary, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, final)
+
+            for old in _generations(self.directory, _LOG_NAME):
+                if old < generation:
+                    os.remove(self._path("wal", old))
+            for old in _generations(self.directory, _SNAPSHOT_NAME):
+                if old < generation:
+                    os.remove(self._path("snapshot", old))
+
+    def _run(self):
+        while not self._stop.wait(self.snapshot_interval):
+            if self._dirty:
+                try:
+                    self.checkpoint()
+                except OSError as e:
+                    print(f"Snapshot failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        with self._sync_lock, self._write_lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
@@ -0,0 +1,79 @@
+# backend/enrichment.py
+
+# Shared enrichment stage for the list endpoints. Instead of scanning the parent
+# collection once per row (O(N x M)), each join collects the foreign keys it needs,
+# fetches the parents in one batch through the store's primary index, and then every
+# row is joined in a single pass.
+
+from metrics import timed
+
+# collection -> [(foreign key on the row, parent collection, ((output field, parent field), ...))]
+JOINS = {
+    "quotes": [
+        ("client_id", "clients", (("client_company", "company"),)),
+    ],
+    "projects": [
+        ("client_id", "clients", (("client_name", "name"), ("client_company", "company"))),
+    ],
+    "invoices": [
+        ("client_id", "clients", (("client_name", "name"), ("client_company", "company"))),
+        ("project_id", "projects", (("project_name", "project_name"),)),
+    ],
+    "tasks": [
+        ("project_id", "projects", (("project_name", "project_name"), ("client_name", "client_name"))),
+    ],
+    "bugs": [
+        ("project_id", "projects", (("project_name", "project_name"), ("client_name", "client_name"))),
+    ],
+}
+
+
+def _key(value):
+    # Unhashable foreign keys (e.g. a list from a bad payload) never match
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return value
+
+
+def build_lookups(db, collection_name, rows, cache=None):
+    # `cache` ({parent collection: {id: record}}) lets several reads in one request, such
+    # as the sub-queries of /api/batch, share parent fetches
+    lookups = []
+    for foreign_key, parent_name, fields in JOINS.get(collection_name, ()):
+        wanted = {_key(row.get(foreign_key)) for row in rows}
+        if cache is None:
+            parents = db[parent_name].get_many(wanted)
+        else:
+            parents = cache.setdefault(parent_name, {})
+            parents.update(db[parent_name].get_many(wanted - parents.keys()))
+        lookups.append((foreign_key, parents, fields))
+    return lookups
+
+
+def joined_fields(db, collection_name, rows, cache=None):
+    # [(row, extra)]: each row with the parent fields to join onto it ({} when none)
+    if collection_name not in JOINS:
+        return [(row, {}) for row in rows]
+
+    with timed(f"enrich.{collection_name}"):
+        lookups = build_lookups(db, collection_name, rows, cache)
+        joined = []
+        for row in rows:
+            extra = {}
+            for foreign_key, parents, fields in lookups:
+                parent = parents.get(_key(row.get(foreign_key)))
+                if parent is not None:
+                    for out_field, parent_field in fields:
+                        extra[out_field] = parent.get(parent_field)
+            joined.append((row, extra))
+    return joined
+
+
+def enrich(db, collection_name, rows=None, cache=None):
+    # Rows without any matching parent are returned as-is, matching the old handlers
+    rows = db[collection_name].all() if rows is None else list(rows)
+    if collection_name not in JOINS:
+        return rows
+    return [{**row, **extra} if extra else row for row, extra in joined_fields(db, collection_name, rows, cache)]
@@ -0,0 +1,87 @@
+# backend/fragments.py
+
+# Cache of encoded rows for the collection list responses. A list body is built by
+# joining each row's cached JSON bytes instead of encoding every dict again. Between two
+# calls almost every record is unchanged, so most rows are a dict lookup and an
+# identity check.
+#
+# - An entry holds (record, joined parent fields, bytes), keyed by (collection, id). It
+#   is valid while the store still holds that same record object, which it does until
+#   the next update (records are never modified in place; see store.py), and while the
+#   enrichment join gives the same parent fields. That covers a renamed client showing up
+#   in its quotes' rows.
+# - Updates and deletes drop the record's entry through the store listener, so a PUT
+#   frees the stale bytes right away rather than waiting for eviction.
+# - The cache holds at most max_bytes of encoded rows. Entries are evicted oldest first.
+#
+# Rows read from the SQLite backend are new dicts on every read and would never hit, so
+# app.py only enables the cache for the in-memory store.
+
+import threading
+from collections import OrderedDict
+
+from enrichment import joined_fields
+from metrics import REGISTRY
+
+FRAGMENT_CACHE_BYTES = 64 * 2**20
+JOIN_CHUNK = 500
+
+FRAGMENT_ROWS = REGISTRY.counter(
+    "app_fragment_cache_rows_total", "Rows served from the encoded-row cache (hit) or encoded (miss).", ("result",))
+
+
+class FragmentCache:
+    def __init__(self, db, encode, max_bytes=FRAGMENT_CACHE_BYTES):
+        self._encode = encode # row -> compact JSON bytes
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict() # (collection, id) -> (record, extra, bytes), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if old is not None:
+            with self._lock:
+                self._drop((collection_name, old["id"]))
+
+    def _drop(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[2])
+
+    def encode(self, db, collection_name, rows):
+        # The compact JSON of each stored row after enrichment, in order. Lookups take no
+        # lock; new entries are added a chunk at a time.
+        entries = self._entries
+        encoded = []
+        misses = 0
+        # In chunks, so the join's temporaries are freed as we go instead of piling up
+        # across the whole list (which sets off full garbage collections on a big heap)
+        for start in range(0, len(rows), JOIN_CHUNK):
+            fresh = []
+            for row, extra in joined_fields(db, collection_name, rows[start:start + JOIN_CHUNK]):
+                key = (collection_name, row["id"])
+                entry = entries.get(key)
+                if entry is not None and entry[0] is row and entry[1] == extra:
+                    encoded.append(entry[2])
+                    continue
+                data = self._encode({**row, **extra} if extra else row)
+                encoded.append(data)
+                fresh.append((key, (row, extra, data)))
+            if fresh:
+                self._add(fresh)
+                misses += len(fresh)
+        FRAGMENT_ROWS.inc(("hit",), len(encoded) - misses)
+        FRAGMENT_ROWS.inc(("miss",), misses)
+        return encoded
+
+    def _add(self, fresh):
+        with self._lock:
+            for key, entry in fresh:
+                self._drop(key)
+                self._entries[key] = entry
+                self._size += len(entry[2])
+            while self._size > self._max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[2])
@@ -0,0 +1,437 @@
+# backend/indexes.py
+
+# Secondary indexes behind the filter and sort parameters of the collection GETs:
+#   ?status=Sent  ?status=Sent,Overdue  ?project_id=3   equality, any of the listed values
+#   ?due_date.lt=2024-06-01  ?total_amount.gte=1000     ranges: .gt .gte .lt .lte
+#   ?sort=due_date  ?sort=-priority                     order, ties by id; "-" for descending
+# They combine with each other and with ?after=&limit= and ?fields=.
+#
+# - Equality fields (EQUALITY_FIELDS) get a hash index, value -> set of ids, kept exact
+#   on every write.
+# - Range fields (RANGE_FIELDS), plus priority and severity (sorted by RANKS rather than
+#   alphabetically), get a sorted list of (key, id). New entries go into a short sorted
+#   pending list that is merged in once it grows, as search.py does with its vocabulary,
+#   so a write never shifts the whole list. Entries of updated or deleted records are
+#   left in place and skipped when read. Every candidate is checked against the stored
+#   record anyway, and the collection is reindexed once stale entries outnumber the live
+#   ones. Records without a usable value are kept in a set and sort last.
+#
+# A query starts from the condition with the fewest candidates (the size of a hash set,
+# or the width of a range found by bisect) and checks the other conditions on the
+# records it fetches. A sorted query walks the sort field's index in order, stopping once
+# the page is full, when that field is the one constrained or the candidates are too
+# many to sort. Otherwise it sorts the candidates. With sort=, ?after=<id> keeps its
+# meaning: the page starts after that record's place in the order. Only the candidates
+# are taken under the lock; the records are fetched and checked after it is released.
+# The sorted lists are replaced rather than changed in place, so a walk started under
+# the lock stays valid after it.
+#
+# Kept in sync through the store listener. As in aggregates.py, a collection that changed
+# without us seeing it is reindexed on the next query (a per-process cache under several
+# SQLite workers).
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from heapq import merge
+from math import isfinite
+
+from query import QueryError
+from store import catch_up
+
+EQUALITY_FIELDS = {
+    "quotes": ("status", "client_id"),
+    "projects": ("status", "client_id"),
+    "invoices": ("status", "client_id", "project_id", "quote_id"),
+    "tasks": ("status", "priority", "project_id"),
+    "bugs": ("status", "severity", "project_id"),
+}
+# collection -> {field: "date" | "number"}
+RANGE_FIELDS = {
+    "quotes": {"quote_date": "date", "total_amount": "number"},
+    "projects": {"start_date": "date", "end_date": "date"},
+    "invoices": {"invoice_date": "date", "due_date": "date", "total_amount": "number"},
+    "tasks": {"due_date": "date", "progress": "number"},
+    "bugs": {"reported_date": "date"},
+}
+# Fields sorted by rank, lowest first; other values of them do not sort
+RANKS = {
+    "priority": ("Low", "Medium", "High"),
+    "severity": ("Low", "Medium", "High", "Critical"),
+}
+ID_FIELDS = ("client_id", "project_id", "quote_id")
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+PENDING_MERGE_MIN = 1024
+STALE_REINDEX_MIN = 1024
+SORT_WALK_SHARE = 8 # Walk the sort index once candidates are over 1/8 of the collection
+
+_AFTER_ALL = float("inf") # Sorts after every id: (key, _AFTER_ALL) follows each (key, id)
+
+# collection -> {field: "date" | "number" | "rank"}, the fields with a sorted index
+SORT_FIELDS = {
+    name: {**RANGE_FIELDS.get(name, {}), **{field: "rank" for field in fields if field in RANKS}}
+    for name, fields in EQUALITY_FIELDS.items()
+}
+
+
+def _term(value):
+    # A value as the hash indexes hold it, or None for values that never match
+    return value if type(value) in (str, int) else None
+
+
+def _key(kind, field, value):
+    # A value's place in a sorted index, or None when it has none
+    if kind == "date":
+        return value if type(value) is str and value else None
+    if kind == "number":
+        return value if type(value) in (int, float) and isfinite(value) else None
+    ranks = RANKS[field]
+    return ranks.index(value) if type(value) is str and value in ranks else None
+
+
+class IndexQuery:
+    def __init__(self, equal, ranges, sort):
+        self.equal = equal # field -> frozenset of values
+        self.ranges = ranges # field -> (low, high) bounds on (key, id), either may be None
+        self.sort = sort # (field, descending) or None
+
+
+def _bound(kind, name, value):
+    if kind == "date":
+        try:
+            date.fromisoformat(value[:10])
+        except ValueError:
+            raise QueryError(f"'{name}' must be a date (YYYY-MM-DD)")
+        return value
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+    if number is None or not isfinite(number):
+        raise QueryError(f"'{name}' must be a number")
+    return number
+
+
+def parse_index_query(collection_name, args):
+    # The filter and sort parameters of `args` (request.args) as an IndexQuery, or None
+    # when there are none. Other parameters are left alone.
+    if collection_name not in EQUALITY_FIELDS:
+        return None
+    equal = {}
+    for field in EQUALITY_FIELDS[collection_name]:
+        value = args.get(field)
+        if value is None or value == "":
+            continue
+        values = [part.strip() for part in value.split(",") if part.strip()]
+        if field in ID_FIELDS:
+            try:
+                values = [int(part) for part in values]
+            except ValueError:
+                raise QueryError(f"'{field}' must be an integer or a comma-separated list of them")
+        equal[field] = frozenset(values)
+    ranges = {}
+    for field, kind in RANGE_FIELDS[collection_name].items():
+        lows, highs = [], []
+        for operator in RANGE_OPERATORS:
+            name = f"{field}.{operator}"
+            value = args.get(name)
+            if value is None or value == "":
+                continue
+            bound = _bound(kind, name, value)
+            # As bounds on (key, id): (bound,) sorts before every entry with that key and
+            # (bound, _AFTER_ALL) after them. Lows are inclusive, highs exclusive.
+            edge = (bound, _AFTER_ALL) if operator in ("gt", "lte") else (bound,)
+            (lows if operator in ("gt", "gte") else highs).append(edge)
+        if lows or highs:
+            ranges[field] = (max(lows) if lows else None, min(highs) if highs else None)
+    sort = None
+    value = args.get("sort")
+    if value:
+        field = value[1:] if value.startswith("-") else value
+        if field not in SORT_FIELDS[collection_name]:
+            allowed = ", ".join(SORT_FIELDS[collection_name])
+            raise QueryError(f"Cannot sort {collection_name} by '{field}' (one of: {allowed})")
+        sort = (field, value.startswith("-"))
+    if not equal and not ranges and sort is None:
+        return None
+    return IndexQuery(equal, ranges, sort)
+
+
+def _run(entries, start, end, descending):
+    # entries[start:end] in order, without copying the range
+    for position in (reversed(range(start, end)) if descending else range(start, end)):
+        yield entries[position]
+
+
+class SortedIndex:
+    # One field's sorted (key, id) entries. Changes are made under the QueryIndex lock
+    # and replace `entries` and `pending` rather than shift them in place, as the store
+    # does with its id list, so a walk taken under the lock can go on after it is released.
+    def __init__(self, pairs=()):
+        self.entries = sorted(pairs)
+        self.pending = [] # sorted recent entries, not merged into `entries` yet
+        self.unkeyed = set() # ids of records without a key
+        self.stale = 0
+
+    def add(self, key, record_id):
+        if key is None:
+            self.unkeyed.add(record_id)
+            return
+        position = bisect_right(self.pending, (key, record_id))
+        self.pending = self.pending[:position] + [(key, record_id)] + self.pending[position:]
+        if len(self.pending) >= max(PENDING_MERGE_MIN, len(self.entries) // 16):
+            merged = self.entries + self.pending
+            merged.sort() # Two sorted runs: Timsort does a single merge
+            self.entries = merged
+            self.pending = []
+
+    def remove(self, key, record_id):
+        if key is None:
+            self.unkeyed.discard(record_id)
+        else:
+            self.stale += 1 # Left in place; see the notes at the top
+
+    def _span(self, entries, low, high):
+        return (0 if low is None else bisect_left(entries, low),
+                len(entries) if high is None else bisect_left(entries, high))
+
+    def width(self, low, high):
+        # Entries between the bounds, stale ones included
+        return sum(end - start for start, end in (self._span(self.entries, low, high), self._span(self.pending, low, high)))
+
+    def walk(self, low, high, descending=False):
+        # (key, id) between the bounds, in order, read lazily
+        runs = []
+        for entries in (self.entries, self.pending):
+            start, end = self._span(entries, low, high)
+            runs.append(_run(entries, start, end, descending))
+        return merge(*runs, reverse=descending)
+
+
+class QueryIndex:
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self._hashes = {} # collection -> field -> {value: set of ids}
+        self._sorted = {} # collection -> field -> SortedIndex
+        self._seen = {}
+        self._dirty = set() # collections to reindex before their next query
+        with self._lock:
+            for name in EQUALITY_FIELDS:
+                if name in db:
+                    self._rebuild(name)
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        with self._lock:
+            self._apply(collection_name, old, new)
+            self._seen[collection_name] += 1
+
+    def _apply(self, name, old, new):
+        # Caller holds the lock. Fields whose value did not change are not touched.
+        record_id = (new if new is not None else old)["id"]
+        for field, ids in self._hashes[name].items():
+            before = _term(old.get(field)) if old is not None else None
+            after = _term(new.get(field)) if new is not None else None
+            if old is not None and new is not None and before == after:
+                continue
+            if old is not None and before is not None:
+                members = ids.get(before)
+                if members is not None:
+                    members.discard(record_id)
+                    if not members:
+                        del ids[before]
+            if new is not None and after is not None:
+                ids.setdefault(after, set()).add(record_id)
+        for field, kind in SORT_FIELDS[name].items():
+            index = self._sorted[name][field]
+            before = _key(kind, field, old.get(field)) if old is not None else None
+            after = _key(kind, field, new.get(field)) if new is not None else None
+            if old is not None and new is not None and before == after:
+                continue
+            if old is not None:
+                index.remove(before, record_id)
+            if new is not None:
+                index.add(after, record_id)
+            if index.stale > STALE_REINDEX_MIN and index.stale > len(index.entries) // 2:
+                self._dirty.add(name)
+
+    def _rebuild(self, name):
+        # Caller holds the lock
+        version = self._db.version(name)
+        hashes = {field: {} for field in EQUALITY_FIELDS[name]}
+        pairs = {field: [] for field in SORT_FIELDS[name]}
+        unkeyed = {field: set() for field in SORT_FIELDS[name]}
+        for record in self._db[name]:
+            record_id = record["id"]
+            for field, ids in hashes.items():
+                value = _term(record.get(field))
+                if value is not None:
+                    ids.setdefault(value, set()).add(record_id)
+            for field, kind in SORT_FIELDS[name].items():
+                key = _key(kind, field, record.get(field))
+                if key is None:
+                    unkeyed[field].add(record_id)
+                else:
+                    pairs[field].append((key, record_id))
+        self._hashes[name] = hashes
+        self._sorted[name] = {}
+        for field in SORT_FIELDS[name]:
+            index = self._sorted[name][field] = SortedIndex(pairs[field])
+            index.unkeyed = unkeyed[field]
+        self._dirty.discard(name)
+        self._seen[name] = version
+
+    def _matches(self, name, record, query):
+        for field, values in query.equal.items():
+            if _term(record.get(field)) not in values:
+                return False
+        for field, (low, high) in query.ranges.items():
+            key = _key(RANGE_FIELDS[name][field], field, record.get(field))
+            if key is None:
+                return False
+            entry = (key, record["id"])
+            if (low is not None and entry < low) or (high is not None and entry >= high):
+                return False
+        return True
+
+    def select(self, collection_name, query, after=None, limit=None):
+        # The records matching `query`, in its order, as (records, next_cursor) with the
+        # same paging contract as Collection.page
+        name = collection_name
+        if name in self._dirty:
+            # Reindexed under the write lock too, so no listener applies a write twice
+            with self._db.write_lock(), self._lock:
+                if name in self._dirty:
+                    self._rebuild(name)
+        catch_up(self._db, self._lock, self._seen, self._rebuild, (name,))
+        walk = None
+        with self._lock:
+            collection = self._db[name]
+            # The cheapest starting point, as (count, ids, range field): a hash set of ids,
+            # or a range of a sorted index
+            best = None
+            for field, values in query.equal.items():
+                ids = self._hashes[name][field]
+                found = set().union(*(ids.get(value, ()) for value in values))
+                if best is None or len(found) < best[0]:
+                    best = (len(found), found, None)
+            for field, (low, high) in query.ranges.items():
+                width = self._sorted[name][field].width(low, high)
+                if best is None or width < best[0]:
+                    best = (width, None, field)
+
+            if query.sort is not None:
+                field = query.sort[0]
+                if best is None or best[2] == field or \
+                        (limit is not None and best[0] * SORT_WALK_SHARE > len(collection)):
+                    walk = self._walk_runs(collection, query, after)
+            if walk is None:
+                candidates = best[1]
+                if candidates is None:
+                    low, high = query.ranges[best[2]]
+                    candidates = {record_id for _, record_id in self._sorted[name][best[2]].walk(low, high)}
+        # Records are fetched and checked after the lock is released, so writers'
+        # listeners never wait on that
+        if walk is not None:
+            return self._walk(collection, query, walk, limit)
+        if query.sort is None:
+            return self._by_id(collection, query, sorted(candidates), after, limit)
+        return self._sorted_candidates(collection, query, candidates, after, limit)
+
+    def _by_id(self, collection, query, ids, after, limit):
+        position = 0 if after is None else bisect_right(ids, after)
+        records = []
+        for record_id in ids[position:]:
+            record = collection.get(record_id)
+            if record is None or not self._matches(collection.name, record, query):
+                continue
+            if limit is not None and len(records) == limit:
+                return records, records[-1]["id"]
+            records.append(record)
+        return records, None
+
+    def _cursor(self, collection, query, after):
+        # (key, id) of the `after` record in the sort order; key is None if it has none
+        record = collection.get(after)
+        if record is None:
+            raise QueryError("'after' must be the id of a record in the results; start again without it")
+        field, _ = query.sort
+        return _key(SORT_FIELDS[collection.name][field], field, record.get(field)), after
+
+    def _walk_runs(self, collection, query, after):
+        # Caller holds the lock. The sort field's index from the page start on, in order,
+        # as (key, id) pairs with the records without a key last (key None).
+        field, descending = query.sort
+        index = self._sorted[collection.name][field]
+        low, high = query.ranges.get(field, (None, None))
+        cursor = None if after is None else self._cursor(collection, query, after)
+        if cursor is not None and cursor[0] is not None:
+            if descending:
+                high = cursor if high is None else min(high, cursor)
+            else:
+                bound = (cursor[0], cursor[1] + 0.5) # Just past the cursor
+                low = bound if low is None else max(low, bound)
+        entries = () if cursor is not None and cursor[0] is None else index.walk(low, high, descending)
+        unkeyed = ()
+        if field not in query.ranges:
+            start = after if cursor is not None and cursor[0] is None else None
+            unkeyed = [record_id for record_id in sorted(index.unkeyed) if start is None or record_id > start]
+        return _chain_keyed(entries, unkeyed)
+
+    def _walk(self, collection, query, walk, limit):
+        # Reads the records of a _walk_runs() walk until the page is full
+        field, _ = query.sort
+        kind = SORT_FIELDS[collection.name][field]
+        records = []
+        seen = set()
+        for key, record_id in walk:
+            if record_id in seen:
+                continue # An entry left behind by an update back to the same value
+            record = collection.get(record_id)
+            if record is None or _key(kind, field, record.get(field)) != key:
+                continue # Stale
+            if not self._matches(collection.name, record, query):
+                continue
+            seen.add(record_id)
+            if limit is not None and len(records) == limit:
+                return records, records[-1]["id"]
+            records.append(record)
+        return records, None
+
+    def _sorted_candidates(self, collection, query, candidates, after, limit):
+        field, descending = query.sort
+        kind = SORT_FIELDS[collection.name][field]
+        found = collection.get_many(candidates)
+        keyed, unkeyed = [], []
+        for record_id, record in found.items():
+            if not self._matches(collection.name, record, query):
+                continue
+            key = _key(kind, field, record.get(field))
+            if key is None:
+                unkeyed.append((record_id, record))
+            else:
+                keyed.append(((key, record_id), record))
+        keyed.sort(key=lambda pair: pair[0], reverse=descending)
+        unkeyed.sort(key=lambda pair: pair[0])
+        if after is not None:
+            cursor = self._cursor(collection, query, after)
+            if cursor[0] is None:
+                keyed = []
+                unkeyed = [pair for pair in unkeyed if pair[0] > after]
+            elif descending:
+                keyed = [pair for pair in keyed if pair[0] < cursor]
+            else:
+                keyed = [pair for pair in keyed if pair[0] > cursor]
+        records = [record for _, record in keyed] + [record for _, record in unkeyed]
+        if limit is not None and len(records) > limit:
+            return records[:limit], records[limit - 1]["id"]
+        return records, None
+
+
+def _chain_keyed(entries, unkeyed):
+    yield from entries
+    for record_id in unkeyed:
+        yield None, record_id
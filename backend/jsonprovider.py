@@ -0,0 +1,83 @@
+# backend/jsonprovider.py
+
+# JSON providers for the Flask app, chosen with JSON_PROVIDER=orjson|stdlib. The default
+# is orjson when it is installed and the standard library otherwise.
+#
+# Both providers add dumpb(obj): the compact encoding (what jsonify sends outside debug
+# mode) as bytes. The fragment cache (fragments.py) stores those bytes.
+#
+# OrjsonProvider encodes and decodes with orjson, which is several times faster than the
+# json module for the record lists the API sends. It keeps the output jsonify gives:
+# sorted keys, compact separators, and indent=2 in debug mode. Dates, datetimes and
+# dataclasses go through Flask's default() as before. Two things differ:
+# - non-ASCII text is sent as UTF-8 rather than \u escapes
+# - NaN and infinities become null rather than invalid JSON
+# A few inputs are handed back to the stdlib provider instead:
+# - values orjson cannot encode, such as ints beyond 64 bits
+# - text it refuses to decode, such as NaN literals and huge ints
+# - calls with json.dumps options it has no equivalent for
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError: # Optional: the stdlib provider is used instead
+    orjson = None
+
+COMPACT = (",", ":")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    # Flask's default provider, plus dumpb()
+    def dumpb(self, obj, indent=False):
+        if indent:
+            return self.dumps(obj, indent=2).encode()
+        return self.dumps(obj, separators=COMPACT).encode()
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    def _option(self, indent):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumpb(self, obj, indent=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._option(indent))
+        except orjson.JSONEncodeError:
+            return super().dumpb(obj, indent)
+
+    def dumps(self, obj, **kwargs):
+        # Only the two layouts jsonify uses map onto orjson; anything else (including the
+        # json module's default ", " separators) keeps the stdlib's exact output
+        indent = kwargs.pop("indent", None)
+        separators = kwargs.pop("separators", None)
+        if not kwargs and (indent, separators) in ((None, COMPACT), (2, None)):
+            return self.dumpb(obj, indent=indent is not None).decode()
+        if indent is not None:
+            kwargs["indent"] = indent
+        if separators is not None:
+            kwargs["separators"] = separators
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass # Let the stdlib decide, so what it accepted before is still accepted
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumpb(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+PROVIDERS = {"stdlib": StdlibJSONProvider}
+if orjson is not None:
+    PROVIDERS["orjson"] = OrjsonProvider
+DEFAULT_PROVIDER = "orjson" if orjson is not None else "stdlib"
@@ -0,0 +1,182 @@
+# backend/mailer.py
+
+# Outbound mail subsystem. Request handlers call `enqueue(message)`, which only puts the
+# message on an in-process queue and returns. A small pool of worker threads drains it:
+#
+# - each worker keeps one SMTP connection open (STARTTLS + login happen once per
+#   connection, not once per message) and closes it after IDLE_TIMEOUT without work
+# - workers take up to `batch_size` queued messages at a time and send them back to back
+#   over that connection
+# - a dropped connection is reopened and the message resent straight away; other
+#   transient failures (4xx replies, network errors) are retried with exponential
+#   backoff up to `max_retries`; permanent 5xx rejections are dropped and counted
+
+import heapq
+import itertools
+import queue
+import smtplib
+import threading
+import time
+
+from metrics import timed
+
+IDLE_TIMEOUT = 60 # seconds an unused SMTP connection is kept open
+CONNECT_TIMEOUT = 30
+
+
+def _close(server, polite=False):
+    try:
+        if polite:
+            server.quit()
+        else:
+            server.close()
+    except OSError: # smtplib.SMTPException is an OSError
+        pass
+
+
+class Mailer:
+    def __init__(self, host, port, username=None, password=None, starttls=True,
+                 workers=2, batch_size=50, max_retries=5, base_backoff=0.5):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self._queue = queue.Queue()
+        self._retries = [] # heap of (due_time, tiebreak, attempt, message)
+        self._retry_lock = threading.Lock()
+        self._tiebreak = itertools.count()
+        self._unfinished = 0 # queued + waiting for retry + in flight
+        self._idle = threading.Condition()
+        self._stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "connections": 0}
+        self._stats_lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._run, name=f"mailer-{i}", daemon=True) for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    # --- Public API ---
+
+    def enqueue(self, message):
+        # Non-blocking: the message is sent by a worker thread
+        with self._idle:
+            self._unfinished += 1
+        self._count("queued")
+        self._queue.put((0, message))
+
+    def flush(self, timeout=None):
+        # Blocks until every queued message has been sent or given up on
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._unfinished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, pending=self._unfinished)
+
+    # --- Workers ---
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _done(self, count=1):
+        with self._idle:
+            self._unfinished -= count
+            if not self._unfinished:
+                self._idle.notify_all()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=CONNECT_TIMEOUT)
+        if self.starttls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._count("connections")
+        return server
+
+    def _release_due_retries(self):
+        # Moves retries whose backoff has expired back onto the queue; returns the wait
+        # until the next one is due (or None)
+        now = time.monotonic()
+        with self._retry_lock:
+            while self._retries and self._retries[0][0] <= now:
+                _, _, attempt, message = heapq.heappop(self._retries)
+                self._queue.put((attempt, message))
+            return self._retries[0][0] - now if self._retries else None
+
+    def _next_batch(self):
+        wait = self._release_due_retries()
+        try:
+            first = self._queue.get(timeout=min(wait, IDLE_TIMEOUT) if wait is not None else IDLE_TIMEOUT)
+        except queue.Empty:
+            return []
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        server = None
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if server is not None: # Idle: give the connection back to the SMTP server
+                    _close(server, polite=True)
+                    server = None
+                continue
+            for attempt, message in batch:
+                server = self._deliver(server, attempt, message)
+
+    def _deliver(self, server, attempt, message):
+        for reconnect in (False, True):
+            try:
+                if server is None:
+                    server = self._connect()
+                with timed("smtp.send"):
+                    server.send_message(message)
+                self._count("sent")
+                self._done()
+                return server
+            except smtplib.SMTPServerDisconnected:
+                server = None # Stale pooled connection; reconnect and resend once
+                if reconnect:
+                    break
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    return self._give_up(server, message, e)
+                break
+            except smtplib.SMTPRecipientsRefused as e:
+                return self._give_up(server, message, e)
+            except OSError: # Includes the remaining smtplib.SMTPException types
+                if server is not None:
+                    _close(server)
+                server = None
+                break
+        self._retry(attempt, message)
+        return server
+
+    def _retry(self, attempt, message):
+        if attempt + 1 > self.max_retries:
+            self._give_up(None, message, "retries exhausted")
+            return
+        due = time.monotonic() + self.base_backoff * (2 ** attempt)
+        with self._retry_lock:
+            heapq.heappush(self._retries, (due, next(self._tiebreak), attempt + 1, message))
+        self._count("retried")
+
+    def _give_up(self, server, message, reason):
+        print(f"Dropping email to {message.get('To')}: {reason}")
+        self._count("failed")
+        self._done()
+        return server
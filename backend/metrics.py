@@ -0,0 +1,197 @@
+# backend/metrics.py
+
+# In-process metrics in the Prometheus text format, served at /metrics.
+#
+# - Counter and Histogram keep one series per tuple of label values. A histogram series is
+#   a list of per-bucket counts plus a sum; observing a value is one bisect over the
+#   bucket bounds and a couple of additions under the metric's lock, so it is cheap
+#   enough to leave on for every request. Buckets are only made cumulative when /metrics
+#   is rendered.
+# - instrument(app) adds before/after request hooks recording, per route template (never
+#   the raw path, which would give unbounded label values): latency, request and
+#   response body sizes, and status codes. Requests slower than the threshold are logged.
+# - timed(operation) is a context manager timing a block into app_operation_seconds; it
+#   wraps the enrichment joins, collection scans and SMTP sends.
+#
+# Metrics are per process: with several workers, each one's /metrics covers the requests
+# it served.
+
+import threading
+import time
+from bisect import bisect_left
+
+from flask import request
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+SLOW_REQUEST_SECONDS = 0.5
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {} # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {} # label values -> [count per bucket..., count above the last, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        # bisect_left: a value equal to a bound belongs to that bound's bucket (le = <=)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[position] += 1
+            series[-1] += value
+
+    def count(self, labels=()):
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_list = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in series_list:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                extra = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, extra)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time spent handling a request, by route.", ("method", "route"))
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Requests handled, by route and status code.", ("method", "route", "status"))
+REQUEST_BYTES = REGISTRY.histogram(
+    "http_request_size_bytes", "Request body sizes, by route.", ("method", "route"), SIZE_BUCKETS)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "http_response_size_bytes", "Response body sizes, by route (streamed bodies are not counted).",
+    ("method", "route"), SIZE_BUCKETS)
+SLOW_REQUESTS = REGISTRY.counter(
+    "http_slow_requests_total", "Requests slower than the slow-request threshold, by route.", ("method", "route"))
+OPERATION_SECONDS = REGISTRY.histogram(
+    "app_operation_seconds", "Time spent in instrumented operations (enrichment, scans, SMTP sends).",
+    ("operation",))
+
+
+class timed:
+    # with timed("enrich.quotes"): ... records the block's duration, exceptions included
+    __slots__ = ("operation", "start")
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        OPERATION_SECONDS.observe(time.perf_counter() - self.start, (self.operation,))
+        return False
+
+
+def instrument(app, slow_request_seconds=SLOW_REQUEST_SECONDS):
+    # Each access through the `request` proxy costs about a microsecond, so the hooks
+    # resolve it once and keep their state in the WSGI environ rather than in `g`
+    def start_timer():
+        request.environ["metrics.start"] = time.perf_counter()
+
+    def record(response):
+        req = request._get_current_object()
+        start = req.environ.pop("metrics.start", None)
+        if start is None:
+            return response
+        rule = req.url_rule
+        labels = (req.method, rule.rule if rule is not None else "<unmatched>")
+        REQUEST_BYTES.observe(req.content_length or 0, labels)
+        size = response.content_length
+        if size is None:
+            # Streamed body, produced while it is sent: stop the clock once it has gone out
+            response.call_on_close(lambda: finish(start, req, labels, response.status_code, None))
+        else:
+            finish(start, req, labels, response.status_code, size)
+        return response
+
+    def finish(start, req, labels, status, size):
+        elapsed = time.perf_counter() - start
+        REQUEST_SECONDS.observe(elapsed, labels)
+        REQUESTS.inc(labels + (str(status),))
+        if size is not None:
+            RESPONSE_BYTES.observe(size, labels)
+        if elapsed >= slow_request_seconds:
+            SLOW_REQUESTS.inc(labels)
+            app.logger.warning("Slow request: %s %s -> %s in %.1f ms", req.method, req.full_path.rstrip("?"),
+                               status, elapsed * 1e3)
+
+    app.before_request(start_timer)
+    app.after_request(record)
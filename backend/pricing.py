@@ -0,0 +1,182 @@
+# backend/pricing.py
+
+# Server-side pricing of quotes and invoices. Totals are computed here from the line
+# items, in integer cents, instead of trusting the total_amount the browser sends.
+#
+# - Draft documents are priced from the services collection: each line's unit price is
+#   the service's current price. Issued documents (any other status) keep the unit prices
+#   stored on their lines, so editing a sent or paid invoice never changes what was billed.
+#   Lines whose service no longer exists keep their own price either way.
+# - PriceBook keeps a cached price table (service id -> cents) and, for draft quotes and
+#   invoices, a reverse index service id -> document ids. Both are maintained from the
+#   store's mutation feed and rebuilt when a collection's version moves without us seeing
+#   the change (another worker on the SQLite backend, a snapshot restore).
+# - When a service's price changes, reprice_service() finds the drafts that use it through
+#   the reverse index and rewrites them with one update_many() per collection: one lock
+#   acquisition or transaction and one commit for the whole batch, with each new total
+#   computed from the record as it is at that moment.
+
+import threading
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from store import catch_up
+
+ITEM_FIELDS = {"quotes": "quote_items", "invoices": "invoice_items"}
+DRAFT_STATUS = "Draft"
+ONE = Decimal(1)
+MAX_CENTS = 10 ** 15 # Past 2**53 cents a float amount loses cents, and quantize() its precision
+
+
+class PricingError(ValueError):
+    pass
+
+
+def to_cents(amount, label="price"):
+    # Half-up rounding to whole cents; str() keeps floats such as 0.29 exact
+    if isinstance(amount, bool) or not isinstance(amount, (int, float, str)):
+        raise PricingError(f"Invalid {label}")
+    try:
+        value = Decimal(str(amount).strip())
+    except InvalidOperation:
+        raise PricingError(f"Invalid {label}")
+    if not value.is_finite() or abs(value) > Decimal(MAX_CENTS) / 100:
+        raise PricingError(f"Invalid {label}")
+    return int((value * 100).quantize(ONE, ROUND_HALF_UP))
+
+
+def _quantity(item):
+    quantity = item.get("quantity", 1)
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity < 0 or quantity != quantity:
+        raise PricingError("Item quantity must be a non-negative number")
+    return quantity
+
+
+def _service_ids(record, name):
+    items = record.get(ITEM_FIELDS[name])
+    if not isinstance(items, list):
+        return set()
+    return {item.get("service_id") for item in items
+            if isinstance(item, dict) and isinstance(item.get("service_id"), int)}
+
+
+class PriceBook:
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self._prices = {} # service id -> unit price in cents
+        self._drafts = {name: {} for name in ITEM_FIELDS} # collection -> {service id: set of draft ids}
+        self._seen = {}
+        with self._lock:
+            for name in ("services",) + tuple(ITEM_FIELDS):
+                self._rebuild(name)
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        with self._lock:
+            if collection_name == "services":
+                if old is not None:
+                    self._prices.pop(old["id"], None)
+                if new is not None:
+                    self._set_price(new)
+            else:
+                if old is not None:
+                    self._index(collection_name, old, False)
+                if new is not None:
+                    self._index(collection_name, new, True)
+            self._seen[collection_name] += 1
+
+    def _set_price(self, service):
+        try:
+            self._prices[service["id"]] = to_cents(service.get("price"))
+        except PricingError:
+            self._prices.pop(service["id"], None)
+
+    def _index(self, name, record, add):
+        # Caller holds the lock; only drafts are repriced, so only drafts are indexed
+        if record.get("status") != DRAFT_STATUS:
+            return
+        index = self._drafts[name]
+        for service_id in _service_ids(record, name):
+            if add:
+                index.setdefault(service_id, set()).add(record["id"])
+            else:
+                ids = index.get(service_id)
+                if ids is not None:
+                    ids.discard(record["id"])
+                    if not ids:
+                        del index[service_id]
+
+    def _rebuild(self, name):
+        # Caller holds the lock
+        version = self._db.version(name)
+        if name == "services":
+            self._prices = {}
+            for service in self._db[name]:
+                self._set_price(service)
+        else:
+            self._drafts[name] = {}
+            for record in self._db[name]:
+                self._index(name, record, True)
+        self._seen[name] = version
+
+    def price_items(self, items, status):
+        # Returns (items, total in cents). Draft lines get the current service price, and
+        # every line's price is normalized to the unit price charged; a line is only copied
+        # when that changes it.
+        if not isinstance(items, list):
+            raise PricingError("Items must be a list")
+        catch_up(self._db, self._lock, self._seen, self._rebuild)
+        with self._lock:
+            prices = self._prices if status == DRAFT_STATUS else {}
+            priced = []
+            total = 0
+            for item in items:
+                if not isinstance(item, dict):
+                    raise PricingError("Each item must be an object")
+                quantity = _quantity(item)
+                unit = prices.get(item.get("service_id"))
+                if unit is None:
+                    unit = to_cents(item.get("price"), "item price")
+                if item.get("price") != unit / 100:
+                    item = {**item, "price": unit / 100}
+                if isinstance(quantity, int):
+                    line = unit * quantity
+                else:
+                    line = unit * Decimal(str(quantity))
+                if abs(line) > MAX_CENTS:
+                    raise PricingError("Item amount is too large")
+                total += line if isinstance(line, int) else int(line.quantize(ONE, ROUND_HALF_UP))
+                priced.append(item)
+        if abs(total) > MAX_CENTS:
+            raise PricingError("Total amount is too large")
+        return priced, total
+
+    def price_document(self, collection_name, record):
+        # The changes that make a quote/invoice record's lines and total consistent
+        items, total = self.price_items(record.get(ITEM_FIELDS[collection_name], []), record.get("status"))
+        return {ITEM_FIELDS[collection_name]: items, "total_amount": total / 100}
+
+    def reprice_service(self, service_id):
+        # Reprices every draft quote and invoice with a line for this service. Returns the
+        # number of documents whose lines or total changed, per collection.
+        catch_up(self._db, self._lock, self._seen, self._rebuild)
+        with self._lock:
+            targets = {name: sorted(index.get(service_id, ())) for name, index in self._drafts.items()}
+
+        repriced = {}
+        for name, record_ids in targets.items():
+            def change(record, name=name):
+                if record.get("status") != DRAFT_STATUS:
+                    return None
+                try:
+                    changes = self.price_document(name, record)
+                except PricingError: # Malformed lines (e.g. imported data) are left as they are
+                    return None
+                items_field = ITEM_FIELDS[name]
+                if changes[items_field] == record.get(items_field) and changes["total_amount"] == record.get("total_amount"):
+                    return None
+                return changes
+            repriced[name] = len(self._db[name].update_many(record_ids, change)) if record_ids else 0
+        return repriced
@@ -0,0 +1,78 @@
+# backend/query.py
+
+# Query-string handling shared by the collection GET endpoints.
+#   ?after=<id>&limit=<n>  keyset pagination; the next cursor comes back in X-Next-Cursor
+#   ?fields=id,name        projection, applied after enrichment
+# Without `after`/`limit` the whole collection is returned, as before.
+# /api/batch sub-queries use the same helpers plus equality `filters`.
+
+from bisect import bisect_right
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise QueryError(f"'{name}' must be an integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"'{name}' must be an integer")
+
+
+def parse_page(args):
+    # Returns (after, limit), or (None, None) when the request is not paginated.
+    # `args` is request.args or a batch sub-query dict.
+    after = _int_arg(args, "after")
+    limit = _int_arg(args, "limit")
+    if after is None and limit is None:
+        return None, None
+    if limit is None:
+        limit = DEFAULT_PAGE_LIMIT
+    if limit < 1:
+        raise QueryError("'limit' must be a positive integer")
+    return after, min(limit, MAX_PAGE_LIMIT)
+
+
+def parse_fields(args):
+    fields = args.get("fields")
+    if not fields:
+        return None
+    if isinstance(fields, list):
+        return [str(field) for field in fields]
+    return [field.strip() for field in str(fields).split(",") if field.strip()]
+
+
+def parse_filters(value):
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise QueryError("'filters' must be an object of field: value pairs")
+    return value or None
+
+
+def filter_rows(rows, filters):
+    return [row for row in rows if all(row.get(field) == value for field, value in filters.items())]
+
+
+def page_rows(rows, after, limit):
+    # Keyset pagination over an id-ordered list; same contract as Collection.page
+    position = 0 if after is None else bisect_right([row["id"] for row in rows], after)
+    page = rows[position:position + limit]
+    if position + limit < len(rows):
+        return page, page[-1]["id"]
+    return page, None
+
+
+def project(rows, fields):
+    if fields is None:
+        return rows
+    return [{field: row[field] for field in fields if field in row} for row in rows]
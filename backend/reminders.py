@@ -0,0 +1,212 @@
+# backend/reminders.py
+
+# Due-date reminders for projects (end_date), tasks (due_date) and invoices (due_date).
+#
+# The scheduler subscribes to the store and keeps every open item in a min-heap keyed by
+# its due date, so nothing is rescanned on a tick: the tick pops entries while the heap
+# top falls inside the reminder window (today + lead_days), which costs O(k log N) for k
+# items due. Updates and deletes do not search the heap; the current due date of each
+# item lives in `_due` and heap entries that no longer match it are skipped when popped
+# (and dropped wholesale once they outnumber the live ones).
+#
+# Each item is reminded once per due date: moving the date re-arms it, closing it
+# (or deleting it) cancels it. Due items are handed to `deliver(batch)` in lists of at
+# most `batch_size`.
+#
+# As in aggregates.py, per-collection versions are tracked and an index is rebuilt from
+# a scan if a collection changed without us seeing it (e.g. another SQLite writer).
+#
+# With several worker processes, each runs its own scheduler. Given a `sent_store`
+# (SqliteSentReminders), which due date each item was reminded for is kept in a SQLite
+# file they share, and a tick delivers only the items it claims there first. So each
+# item is emailed by one process, and a restart does not send it again. Entries are
+# keyed by the store's epoch too: an in-memory store gets a new epoch with every process
+# and may hand out the same ids again, so its items are reminded once more after a
+# restart rather than matched against another store's records (a SQLite store keeps its
+# epoch, and its ids, in the database file).
+
+import heapq
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from store import catch_up
+
+DUE_FIELDS = {"projects": "end_date", "tasks": "due_date", "invoices": "due_date"}
+CLOSED_STATUSES = {
+    "projects": ("Completed", "Cancelled"),
+    "tasks": ("Completed",),
+    "invoices": ("Paid", "Cancelled"),
+}
+DEFAULT_LEAD_DAYS = 3
+DEFAULT_BATCH_SIZE = 100
+HEAP_COMPACT_MIN = 1024
+
+
+def _open_due_date(name, record):
+    # Returns the record's due date if it should get a reminder, else None
+    if record.get("status") in CLOSED_STATUSES[name]:
+        return None
+    due_date = record.get(DUE_FIELDS[name])
+    return due_date if isinstance(due_date, str) and due_date else None
+
+
+class SqliteSentReminders:
+    # (collection, id) -> the due date last reminded, for the store with this `epoch`, in
+    # a table of the SQLite file at `path`. Rows of deleted records stay behind; a store
+    # never reuses the ids of its own epoch.
+    def __init__(self, path, epoch):
+        self.path = path
+        self.epoch = epoch
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sent_reminders (epoch TEXT NOT NULL, collection TEXT NOT NULL, "
+            "record_id INTEGER NOT NULL, due_date TEXT NOT NULL, PRIMARY KEY (epoch, collection, record_id))")
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork, as in sessions.py
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self):
+        rows = self._connection().execute(
+            "SELECT collection, record_id, due_date FROM sent_reminders WHERE epoch = ?", (self.epoch,))
+        return {(name, record_id): due_date for name, record_id, due_date in rows}
+
+    def claim(self, due):
+        # Marks the (collection, id, due_date) items as reminded and returns those that
+        # were not already, all in one transaction: of several processes ticking at
+        # once, only one gets each item
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            claimed = [item for item in due if conn.execute(
+                "INSERT INTO sent_reminders (epoch, collection, record_id, due_date) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (epoch, collection, record_id) DO UPDATE SET due_date = excluded.due_date "
+                "WHERE due_date != excluded.due_date", (self.epoch, *item)).rowcount]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return claimed
+
+
+class ReminderScheduler:
+    def __init__(self, db, deliver, lead_days=DEFAULT_LEAD_DAYS, batch_size=DEFAULT_BATCH_SIZE, sent_store=None):
+        self._db = db
+        self._deliver = deliver
+        self.lead_days = lead_days
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._heap = [] # (due_date, collection_name, id), possibly stale
+        self._due = {} # (collection_name, id) -> due date still to be reminded
+        self._sent_store = sent_store
+        # (collection_name, id) -> due date already reminded
+        self._sent = sent_store.load() if sent_store is not None else {}
+        self._seen = {}
+        self._stop = threading.Event()
+        self._thread = None
+        with self._lock:
+            for name in DUE_FIELDS:
+                self._rebuild(name)
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        with self._lock:
+            record = new if new is not None else old
+            self._index(collection_name, record["id"], new)
+            self._seen[collection_name] += 1
+
+    def _index(self, name, record_id, record):
+        # Caller holds the lock; `record` is None when it was deleted
+        key = (name, record_id)
+        due_date = None if record is None else _open_due_date(name, record)
+        if due_date is None:
+            self._due.pop(key, None)
+            if record is None:
+                self._sent.pop(key, None)
+            return
+        if self._due.get(key) == due_date or self._sent.get(key) == due_date:
+            return
+        self._due[key] = due_date
+        heapq.heappush(self._heap, (due_date, name, record_id))
+        if len(self._heap) > 2 * len(self._due) + HEAP_COMPACT_MIN:
+            self._heap = [(d, n, i) for (n, i), d in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def _rebuild(self, name):
+        # Caller holds the lock
+        version = self._db.version(name)
+        for key in [key for key in self._due if key[0] == name]:
+            del self._due[key]
+        live = set()
+        for record in self._db[name]:
+            live.add(record["id"])
+            self._index(name, record["id"], record)
+        for key in [key for key in self._sent if key[0] == name and key[1] not in live]:
+            del self._sent[key]
+        self._seen[name] = version
+
+    def pending(self):
+        with self._lock:
+            return len(self._due)
+
+    def tick(self, today=None):
+        # Pops every open item due on or before today + lead_days and delivers them in
+        # batches; returns the number of items handed off
+        today = today or date.today()
+        horizon = (today + timedelta(days=self.lead_days)).isoformat()
+        due = []
+        catch_up(self._db, self._lock, self._seen, self._rebuild)
+        with self._lock:
+            while self._heap and self._heap[0][0] <= horizon:
+                due_date, name, record_id = heapq.heappop(self._heap)
+                key = (name, record_id)
+                if self._due.get(key) != due_date:
+                    continue # Stale: the item was moved, closed or deleted since
+                del self._due[key]
+                self._sent[key] = due_date
+                due.append((name, record_id, due_date))
+        if due and self._sent_store is not None:
+            due = self._sent_store.claim(due) # Another process may have reminded some already
+        if not due:
+            return 0
+        items = []
+        for name, record_id, due_date in due:
+            record = self._db[name].get(record_id)
+            if record is not None:
+                items.append({"collection": name, "record": record, "due_date": due_date,
+                              "overdue": due_date < today.isoformat()})
+        for start in range(0, len(items), self.batch_size):
+            self._deliver(items[start:start + self.batch_size])
+        return len(items)
+
+    # --- Background thread ---
+
+    def start(self, interval):
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="reminders", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.tick()
+            except Exception as e: # Keep the scheduler alive; the next tick retries
+                print(f"Reminder tick failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,199 @@
+# backend/search.py
+
+# Inverted index behind /api/search. Each indexed record is tokenized (lowercase
+# alphanumeric words) over the fields in SEARCH_FIELDS; `_postings` maps a term to the set
+# of documents containing it and `_terms` maps each document back to its terms, so an
+# update or delete only touches the postings of that one record. A document is a single
+# int, id * len(SEARCH_FIELDS) + collection position, which keeps the sets compact.
+#
+# Queries match every word; the last word is a prefix (typeahead). Exact words are
+# intersected lazily: the smallest posting is walked and probed against the others, and
+# each candidate's own terms are checked for the prefix. A prefix on its own is answered
+# from `_vocabulary`, a sorted list of terms: a bisect finds the first term starting with
+# it and only the postings of those terms are read (new terms wait in a shorter sorted
+# `_pending` list that is merged in once it grows, and is searched the same way).
+# Documents outside the requested collections are skipped before any probing. Hits come
+# back ordered by (collection, id): the matches go through a heap that keeps the first
+# `limit`, so the order never depends on set iteration, and an incrementally maintained
+# index answers exactly like a rebuilt one.
+#
+# Kept in sync through the store listener; as in aggregates.py, a collection that changed
+# without us seeing it is reindexed on the next query.
+
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from store import catch_up
+
+SEARCH_FIELDS = {
+    "clients": ("name", "email", "company", "notes"),
+    "quotes": ("notes", "quote_items"),
+    "invoices": ("notes", "invoice_items"),
+    "projects": ("project_name", "description"),
+    "tasks": ("name", "description"),
+    "bugs": ("name", "description"),
+}
+COLLECTIONS = tuple(SEARCH_FIELDS)
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+VOCABULARY_COMPACT_MIN = 1024
+VOCABULARY_MERGE_MIN = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _WORD.findall(text.lower())
+
+
+def _record_terms(name, record):
+    texts = []
+    for field in SEARCH_FIELDS[name]:
+        value = record.get(field)
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, list): # quote_items / invoice_items: index the item names
+            texts.extend(item["name"] for item in value if isinstance(item, dict) and isinstance(item.get("name"), str))
+    return frozenset(tokenize(" ".join(texts)))
+
+
+def _contains(terms, term):
+    position = bisect_left(terms, term)
+    return position < len(terms) and terms[position] == term
+
+
+def _first(documents, limit):
+    # The `limit` distinct documents that come first by (collection, id), in that order.
+    # A max-heap of the ones kept so far; a document dropped from it never comes back in.
+    heap = []
+    kept = set()
+    for document in documents:
+        if document in kept:
+            continue
+        key = (-(document % len(COLLECTIONS)), -(document // len(COLLECTIONS)))
+        if len(heap) < limit:
+            heapq.heappush(heap, (key, document))
+            kept.add(document)
+        elif key > heap[0][0]:
+            kept.discard(heapq.heapreplace(heap, (key, document))[1])
+            kept.add(document)
+    return [document for _, document in sorted(heap, reverse=True)]
+
+
+def _starting_with(terms, prefix):
+    position = bisect_left(terms, prefix)
+    while position < len(terms) and terms[position].startswith(prefix):
+        yield terms[position]
+        position += 1
+
+
+class SearchIndex:
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self._postings = {} # term -> set of documents
+        self._terms = {} # document -> frozenset of terms
+        self._vocabulary = [] # sorted terms; may hold terms whose postings emptied
+        self._pending = [] # sorted new terms, not merged into _vocabulary yet
+        self._dead_terms = 0
+        self._seen = {}
+        with self._lock:
+            for name in COLLECTIONS:
+                self._rebuild(name)
+        db.subscribe(self.on_change)
+
+    def on_change(self, collection_name, op, old, new):
+        if collection_name not in self._seen:
+            return
+        with self._lock:
+            record = new if new is not None else old
+            self._index(collection_name, record["id"], new)
+            self._seen[collection_name] += 1
+
+    def _document(self, name, record_id):
+        return record_id * len(COLLECTIONS) + COLLECTIONS.index(name)
+
+    def _index(self, name, record_id, record):
+        # Caller holds the lock; `record` is None when it was deleted
+        if not isinstance(record_id, int):
+            return
+        document = self._document(name, record_id)
+        old_terms = self._terms.get(document, frozenset())
+        new_terms = frozenset() if record is None else _record_terms(name, record)
+        for term in old_terms - new_terms:
+            posting = self._postings[term]
+            posting.discard(document)
+            if not posting:
+                del self._postings[term] # Left in _vocabulary until the next compaction
+                self._dead_terms += 1
+        for term in new_terms - old_terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                self._postings[term] = {document}
+                if _contains(self._vocabulary, term) or _contains(self._pending, term):
+                    self._dead_terms -= 1 # Revived
+                else:
+                    # New terms go into the short pending list; it is merged into the
+                    # vocabulary once it reaches a fixed fraction of it, so each term
+                    # costs O(1) copies amortized instead of O(vocabulary)
+                    insort(self._pending, term)
+                    if len(self._pending) >= max(VOCABULARY_MERGE_MIN, len(self._vocabulary) // 16):
+                        self._merge_pending()
+            else:
+                posting.add(document)
+        if new_terms:
+            self._terms[document] = new_terms
+        else:
+            self._terms.pop(document, None)
+        if self._dead_terms > VOCABULARY_COMPACT_MIN and self._dead_terms * 2 > len(self._vocabulary):
+            self._vocabulary = sorted(self._postings)
+            self._pending = []
+            self._dead_terms = 0
+
+    def _merge_pending(self):
+        self._vocabulary += self._pending
+        self._vocabulary.sort() # Two sorted runs: Timsort does a single merge
+        self._pending = []
+
+    def _rebuild(self, name):
+        # Caller holds the lock
+        version = self._db.version(name)
+        position = COLLECTIONS.index(name)
+        live = set()
+        for record in self._db[name]:
+            if isinstance(record.get("id"), int):
+                live.add(record["id"])
+                self._index(name, record["id"], record)
+        stale = [document for document in self._terms if document % len(COLLECTIONS) == position and document // len(COLLECTIONS) not in live]
+        for document in stale:
+            self._index(name, document // len(COLLECTIONS), None)
+        self._seen[name] = version
+
+    def _prefix_terms(self, prefix):
+        for term in heapq.merge(_starting_with(self._vocabulary, prefix), _starting_with(self._pending, prefix)):
+            if term in self._postings:
+                yield term
+
+    def search(self, text, collections=None, limit=DEFAULT_SEARCH_LIMIT):
+        # Returns up to `limit` (collection_name, id) pairs matching every word of `text`,
+        # the last word as a prefix, ordered by collection (as in COLLECTIONS) then id
+        words = tokenize(text)
+        if not words or limit < 1:
+            return []
+        allowed = {COLLECTIONS.index(name) for name in (collections or COLLECTIONS)}
+        exact, prefix = set(words[:-1]), words[-1]
+        catch_up(self._db, self._lock, self._seen, self._rebuild)
+        with self._lock:
+            if exact:
+                postings = sorted((self._postings.get(word, ()) for word in exact), key=len)
+                matches = (document for document in postings[0]
+                           if document % len(COLLECTIONS) in allowed
+                           and all(document in posting for posting in postings[1:])
+                           and (prefix in self._terms[document] or any(term.startswith(prefix) for term in self._terms[document])))
+            else:
+                matches = (document for term in self._prefix_terms(prefix) for document in self._postings[term]
+                           if document % len(COLLECTIONS) in allowed)
+            hits = _first(matches, limit)
+        return [(COLLECTIONS[document % len(COLLECTIONS)], document // len(COLLECTIONS)) for document in hits]
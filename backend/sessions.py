@@ -0,0 +1,186 @@
+# backend/sessions.py
+
+# Server-side sessions, so several worker processes can serve the same users. Flask's
+# default session is a cookie signed with app.secret_key, and that key is random per
+# process, so a login made by one worker is rejected by the next. Here the cookie only
+# holds a random session id; the session data lives in a backend that every process
+# shares and that survives restarts.
+#
+# - SqliteSessionBackend: sessions table in its own SQLite file (WAL mode, one connection
+#   per thread), usable from any number of processes on the host.
+# - MemorySessionBackend: a dict in this process, for single-process development.
+#
+# In front of the backend each process keeps a small LRU cache of recently used
+# sessions, so a request normally costs no database read. A cached entry is trusted for
+# at most SESSION_CACHE_TTL seconds: a logout handled by another worker is seen here
+# within that window. Sessions are written back only when a request changes them.
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+SESSION_CACHE_SIZE = 10_000
+SESSION_CACHE_TTL = 5 # seconds
+PURGE_INTERVAL = 600 # seconds between sweeps of expired sessions
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None):
+        def on_update(session):
+            session.modified = True
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.modified = False
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        # Returns the session data, or None if it does not exist or has expired
+        with self._lock:
+            entry = self._sessions.get(sid)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    def save(self, sid, data, expires):
+        with self._lock:
+            self._sessions[sid] = (data, expires)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, (_, expires) in self._sessions.items() if expires < now]:
+                del self._sessions[sid]
+
+
+class SqliteSessionBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)")
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork (gunicorn --preload), since a
+        # SQLite connection must not be shared between processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND expires >= ?", (sid, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, sid, data, expires):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)", (sid, json.dumps(data), expires))
+
+    def delete(self, sid):
+        self._connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge(self):
+        self._connection().execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+
+
+class LRUCache:
+    def __init__(self, capacity=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict() # sid -> (data, cached_at); data None caches a miss
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        # Returns (hit, data)
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return False, None
+            if entry[1] + self.ttl < time.monotonic():
+                del self._entries[sid]
+                return False, None
+            self._entries.move_to_end(sid)
+            return True, entry[0]
+
+    def put(self, sid, data):
+        with self._lock:
+            self._entries[sid] = (data, time.monotonic())
+            self._entries.move_to_end(sid)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def discard(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache if cache is not None else LRUCache()
+        self._next_purge = 0
+
+    def _load(self, sid):
+        hit, data = self.cache.get(sid)
+        if not hit:
+            data = self.backend.load(sid)
+            self.cache.put(sid, data)
+        return data
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        data = self._load(sid) if sid else None
+        if data is None:
+            return ServerSideSession() # Gets an id once something is stored in it
+        return ServerSideSession(dict(data), sid)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and session.sid:
+                # Emptied (logout): drop it everywhere
+                self.backend.delete(session.sid)
+                self.cache.discard(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        expires = self.get_expiration_time(app, session)
+        expires_at = expires.timestamp() if expires else time.time() + app.permanent_session_lifetime.total_seconds()
+        data = dict(session)
+        self.backend.save(session.sid, data, expires_at)
+        self.cache.put(session.sid, data)
+        response.set_cookie(
+            name, session.sid, expires=expires, httponly=self.get_cookie_httponly(app), domain=domain,
+            path=path, secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+        if time.time() >= self._next_purge:
+            self._next_purge = time.time() + PURGE_INTERVAL
+            self.backend.purge()
@@ -0,0 +1,363 @@
+# backend/sqlite_store.py
+
+# SQLite-backed storage engine with the same interface as store.Store, selected with
+# STORAGE_BACKEND=sqlite (see app.py). Each collection is a table holding the record as
+# JSON plus its foreign keys as real, indexed columns (client_id, project_id, quote_id).
+#
+# - The database runs in WAL mode so readers never block the single writer.
+# - Every thread gets its own connection; sqlite3's per-connection statement cache keeps
+#   the (constant) SQL below prepared.
+# - get_many() resolves a whole batch of ids with one set-based query, so the enrichment
+#   joins cost one round trip per parent collection instead of one per row.
+#
+# - Writes of this process and their listeners are serialized by a process-local lock.
+#   Other worker processes' writes reach this process only through the version counters,
+#   so the derived indexes rebuild after them (see write_lock).
+#
+# This is a separate file from data.db, which belongs to the Node server's schema.
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+from store import FOREIGN_KEYS, CASCADES
+
+# collection -> foreign key columns kept outside the JSON blob (and indexed)
+SCHEMA = {name: FOREIGN_KEYS.get(name, ()) for name in
+          ("users", "clients", "services", "quotes", "projects", "invoices", "tasks", "bugs")}
+
+STATEMENT_CACHE_SIZE = 256
+
+
+def _column_value(value):
+    # Only integer keys can ever match a primary key; anything else is stored as NULL
+    return value if isinstance(value, int) else None
+
+
+class SqliteCollection:
+    def __init__(self, store, name, foreign_keys):
+        self.name = name
+        self._store = store
+        self._listeners = store._listeners
+        self._foreign_keys = foreign_keys
+        columns = ("id",) + foreign_keys + ("data",)
+        self._sql_count = f"SELECT COUNT(*) FROM {name}"
+        self._sql_all = f"SELECT data FROM {name} ORDER BY id"
+        self._sql_get = f"SELECT data FROM {name} WHERE id = ?"
+        self._sql_get_many = (
+            f"SELECT {name}.id, {name}.data FROM {name} "
+            f"JOIN json_each(?) AS wanted ON {name}.id = wanted.value"
+        )
+        self._sql_page = f"SELECT data FROM {name} WHERE id > ? ORDER BY id LIMIT ?"
+        self._sql_write = (
+            f"INSERT OR REPLACE INTO {name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        self._sql_delete = f"DELETE FROM {name} WHERE id = ?"
+        self._sql_referencing = {key: f"SELECT data FROM {name} WHERE {key} = ? ORDER BY id" for key in foreign_keys}
+        self._sql_next_id = "UPDATE sequences SET value = value + 1 WHERE name = ? RETURNING value"
+        self._sql_reserve_ids = "UPDATE sequences SET value = value + ? WHERE name = ? RETURNING value"
+        self._sql_bump_seq = "UPDATE sequences SET value = MAX(value, ?) WHERE name = ?"
+        self._sql_version = "SELECT value FROM versions WHERE name = ?"
+        self._sql_bump_version = "UPDATE versions SET value = value + ? WHERE name = ?"
+
+    def _params(self, record):
+        return (
+            record["id"],
+            *(_column_value(record.get(key)) for key in self._foreign_keys),
+            json.dumps(record),
+        )
+
+    def _query(self, sql, params=()):
+        return self._store.connection().execute(sql, params)
+
+    def __len__(self):
+        return self._query(self._sql_count).fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __contains__(self, record_id):
+        return self.get(record_id) is not None
+
+    def all(self):
+        return [json.loads(data) for (data,) in self._query(self._sql_all)]
+
+    def get(self, record_id):
+        if not isinstance(record_id, int):
+            return None
+        row = self._query(self._sql_get, (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, record_ids):
+        wanted = [record_id for record_id in record_ids if isinstance(record_id, int)]
+        if not wanted:
+            return {}
+        rows = self._query(self._sql_get_many, (json.dumps(wanted),))
+        return {record_id: json.loads(data) for record_id, data in rows}
+
+    def referencing(self, key, value):
+        # Served by the foreign key column's index
+        if not isinstance(value, int):
+            return []
+        return [json.loads(data) for (data,) in self._query(self._sql_referencing[key], (value,))]
+
+    def find(self, predicate):
+        return next((r for r in self.all() if predicate(r)), None)
+
+    @property
+    def sequence(self):
+        return self._query("SELECT value FROM sequences WHERE name = ?", (self.name,)).fetchone()[0]
+
+    @property
+    def version(self):
+        # Kept in the database so every worker process sees the same value
+        return self._query(self._sql_version, (self.name,)).fetchone()[0]
+
+    def _journal(self, conn, op, old, new):
+        # Inside the write's transaction (see SqliteStore.on_write)
+        for hook in self._store._write_hooks:
+            hook(conn, self.name, op, old, new)
+
+    def _notify(self, op, old, new):
+        for listener in self._listeners:
+            listener(self.name, op, old, new)
+        for hook in self._store._commit_hooks:
+            hook()
+
+    def next_id(self):
+        # A single UPDATE ... RETURNING is atomic across threads and processes
+        return self._query(self._sql_next_id, (self.name,)).fetchall()[0][0]
+
+    def reserve_ids(self, count):
+        last = self._query(self._sql_reserve_ids, (count, self.name)).fetchall()[0][0]
+        return last - count + 1
+
+    def insert(self, record):
+        with self._store._lock:
+            with self._store.transaction() as conn:
+                conn.execute(self._sql_write, self._params(record))
+                conn.execute(self._sql_bump_seq, (record["id"], self.name))
+                conn.execute(self._sql_bump_version, (1, self.name))
+                self._journal(conn, "insert", None, record)
+            self._notify("insert", None, record)
+            return record
+
+    def insert_many(self, records):
+        with self._store._lock:
+            if not records:
+                return records
+            with self._store.transaction() as conn:
+                conn.executemany(self._sql_write, [self._params(record) for record in records])
+                conn.execute(self._sql_bump_seq, (max(record["id"] for record in records), self.name))
+                conn.execute(self._sql_bump_version, (len(records), self.name))
+                for record in records:
+                    self._journal(conn, "insert", None, record)
+            for record in records:
+                self._notify("insert", None, record)
+            return records
+
+    def update(self, record_id, changes):
+        with self._store._lock:
+            with self._store.transaction() as conn:
+                old = json.loads(conn.execute(self._sql_get, (record_id,)).fetchone()[0])
+                record = {**old, **changes}
+                conn.execute(self._sql_write, self._params(record))
+                conn.execute(self._sql_bump_version, (1, self.name))
+                self._journal(conn, "update", old, record)
+            self._notify("update", old, record)
+            return record
+
+    def update_many(self, record_ids, change):
+        # Same contract as store.Collection.update_many, in one transaction
+        with self._store._lock:
+            updated = []
+            with self._store.transaction() as conn:
+                for record_id in record_ids:
+                    row = conn.execute(self._sql_get, (record_id,)).fetchone()
+                    old = json.loads(row[0]) if row else None
+                    changes = change(old) if old is not None else None
+                    if changes:
+                        updated.append((old, {**old, **changes}))
+                if updated:
+                    conn.executemany(self._sql_write, [self._params(record) for _, record in updated])
+                    conn.execute(self._sql_bump_version, (len(updated), self.name))
+                for old, record in updated:
+                    self._journal(conn, "update", old, record)
+            for old, record in updated:
+                self._notify("update", old, record)
+            return [record for _, record in updated]
+
+    def delete(self, record_id):
+        with self._store._lock:
+            with self._store.transaction() as conn:
+                row = conn.execute(self._sql_get, (record_id,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute(self._sql_delete, (record_id,))
+                conn.execute(self._sql_bump_version, (1, self.name))
+                record = json.loads(row[0])
+                self._journal(conn, "delete", record, None)
+            self._notify("delete", record, None)
+            return record
+
+    def delete_where(self, predicate):
+        with self._store._lock:
+            with self._store.transaction() as conn:
+                doomed = [r for r in (json.loads(data) for (data,) in conn.execute(self._sql_all)) if predicate(r)]
+                conn.executemany(self._sql_delete, [(r["id"],) for r in doomed])
+                # One bump per deleted record, matching the memory store (one per notification)
+                conn.execute(self._sql_bump_version, (len(doomed), self.name))
+                for record in doomed:
+                    self._journal(conn, "delete", record, None)
+            for record in doomed:
+                self._notify("delete", record, None)
+            return doomed
+
+    def page(self, after=None, limit=50):
+        after = after if after is not None else -(2 ** 63)
+        records = [json.loads(data) for (data,) in self._query(self._sql_page, (after, limit + 1))]
+        if len(records) > limit:
+            return records[:limit], records[limit - 1]["id"]
+        return records, None
+
+
+class SqliteStore:
+    def __init__(self, path, seed_data=None):
+        self.path = path
+        self._local = threading.local()
+        self._listeners = []
+        self._commit_hooks = []
+        self._write_hooks = []
+        # Serializes this process's writes with their listeners, as the memory store's lock
+        # does. Listeners run after the commit, under it (see write_lock).
+        self._lock = threading.RLock()
+        self._create_schema()
+        self.epoch = self.connection().execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+        self._collections = {name: SqliteCollection(self, name, keys) for name, keys in SCHEMA.items()}
+        if seed_data:
+            self._seed(seed_data)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid(): # Never reuse a connection across fork()
+            conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; fsyncs at checkpoints
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _create_schema(self):
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL") # Persistent on the database file
+        conn.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # A fresh database file gets a new epoch, so ETags from a previous file never match
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:8],))
+        for name, foreign_keys in SCHEMA.items():
+            columns = "".join(f", {key} INTEGER" for key in foreign_keys)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (id INTEGER PRIMARY KEY{columns}, data TEXT NOT NULL)")
+            for key in foreign_keys:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{key} ON {name} ({key})")
+            conn.execute("INSERT OR IGNORE INTO sequences (name, value) VALUES (?, 0)", (name,))
+            conn.execute("INSERT OR IGNORE INTO versions (name, value) VALUES (?, 0)", (name,))
+
+    def _seed(self, seed_data):
+        # Only collections that are still empty get seeded, so restarts keep existing data
+        for name, records in seed_data.items():
+            collection = self._collections.get(name)
+            if collection is None or len(collection):
+                continue
+            with self.transaction() as conn:
+                conn.executemany(collection._sql_write, [collection._params(r) for r in records])
+                conn.execute(collection._sql_bump_seq, (max((r["id"] for r in records), default=0), name))
+
+    def subscribe(self, listener):
+        # Same contract as store.Store.subscribe
+        self._listeners.append(listener)
+
+    def on_commit(self, hook):
+        self._commit_hooks.append(hook)
+
+    def on_write(self, hook):
+        # hook(conn, collection_name, op, old, new) runs inside every write's transaction,
+        # in every process, so what it writes through `conn` commits or rolls back with the
+        # write (the shared change log in changes.py)
+        self._write_hooks.append(hook)
+
+    def write_lock(self):
+        # Same contract as store.Store.write_lock. The version in the database moves at
+        # the commit, just before the listeners run, so catch_up's second check under this
+        # lock is what keeps a write of this process from looking like a missed one. Writes
+        # by other processes are never seen by our listeners: every index derived from the
+        # store (aggregates.py, search.py, ...) is a per-process cache that rebuilds in full
+        # on its next read after one.
+        return self._lock
+
+    @contextmanager
+    def consistent_read(self, *names):
+        # One read transaction: in WAL mode it sees a single snapshot of the database, so
+        # the store itself serves as the view (for every collection, whatever `names` is)
+        conn = self.connection()
+        conn.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            conn.execute("COMMIT")
+
+    def delete_cascade(self, name, record_id):
+        # Same contract as store.Store.delete_cascade, in one transaction; dependents are
+        # found through the indexed foreign key columns
+        with self._lock:
+            parent_collection = self._collections[name]
+            with self.transaction() as conn:
+                row = conn.execute(parent_collection._sql_get, (record_id,)).fetchone()
+                if row is None:
+                    return None
+                doomed = [(name, json.loads(row[0]))]
+                position = 0
+                while position < len(doomed):
+                    parent_name, parent = doomed[position]
+                    position += 1
+                    for child_name, key in CASCADES.get(parent_name, ()):
+                        sql = self._collections[child_name]._sql_referencing[key]
+                        doomed.extend((child_name, json.loads(data)) for (data,) in conn.execute(sql, (parent["id"],)))
+                deleted = {}
+                for doomed_name, doomed_record in doomed:
+                    conn.execute(self._collections[doomed_name]._sql_delete, (doomed_record["id"],))
+                    deleted[doomed_name] = deleted.get(doomed_name, 0) + 1
+                for doomed_name, count in deleted.items():
+                    conn.execute(parent_collection._sql_bump_version, (count, doomed_name))
+                for doomed_name, doomed_record in doomed:
+                    self._collections[doomed_name]._journal(conn, "delete", doomed_record, None)
+            for doomed_name, doomed_record in doomed:
+                self._collections[doomed_name]._notify("delete", doomed_record, None)
+            return doomed[0][1]
+
+    def __getitem__(self, name):
+        return self._collections[name]
+
+    def __contains__(self, name):
+        return name in self._collections
+
+    def names(self):
+        return list(self._collections)
+
+    def version(self, name):
+        return self._collections[name].version
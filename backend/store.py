@@ -0,0 +1,465 @@
+# backend/store.py
+
+# Indexed in-memory store that sits behind the module-level `db` in app.py.
+# Every collection keeps its records in an id-keyed dict (the primary index) plus a
+# monotonic sequence counter, so lookups, inserts and deletes are O(1) instead of
+# walking a Python list. Because ids only ever grow, dict insertion order is also
+# id order, which keeps list responses in the same order as before.
+#
+# A sorted list of ids backs keyset pagination (`page`). Deleted ids are skipped lazily
+# and the list is compacted once they outnumber the live records.
+#
+# Concurrency model (threaded server):
+# - Writes, including id allocation, are serialized by a store-wide lock and run their
+#   listeners under it, so listeners see mutations in commit order. A collection's
+#   version moves after its listeners have run. Commit hooks run after the lock is
+#   released (the WAL fsyncs there).
+# - Stored records are never modified in place: an update stores a new dict. A record a
+#   reader holds therefore never changes under it, and `old` for listeners is free.
+# - Reads take no lock. Each read is a single dict/list operation, which CPython's GIL
+#   makes atomic, and the id list is only ever appended to or replaced, never shifted.
+# - `consistent_read()` gives multi-collection reads a point-in-time view: it marks the
+#   collections shared and hands out their current dict and id list. The first write to
+#   a collection while such a view is alive copies them (copy-on-write), so the view
+#   stays frozen without blocking writers. Views are released when the `with` block
+#   exits, so writes after that copy nothing.
+#
+# Records are compacted as they are stored (see compact.py): equal line items share one
+# dict and short strings are interned. The stored values are equal to the written ones.
+#
+# Foreign key fields (FOREIGN_KEYS) get reverse indexes, value -> set of ids, so
+# `referencing()` and the cascading deletes in `Store.delete_cascade` only touch the
+# dependent records instead of scanning whole collections.
+
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from compact import Compactor
+
+# Compaction of the id order list only kicks in past this many deleted ids
+ORDER_COMPACT_MIN = 1024
+
+# collection -> fields holding the id of a record in another collection
+FOREIGN_KEYS = {
+    "quotes": ("client_id",),
+    "projects": ("client_id",),
+    "invoices": ("client_id", "quote_id", "project_id"),
+    "tasks": ("project_id",),
+    "bugs": ("project_id",),
+}
+
+# parent collection -> (child collection, foreign key) pairs deleted along with it
+CASCADES = {
+    "clients": (("quotes", "client_id"), ("projects", "client_id"), ("invoices", "client_id")),
+    "projects": (("tasks", "project_id"), ("bugs", "project_id")),
+}
+
+
+def catch_up(db, lock, seen, rebuild, names=None):
+    # For the indexes kept up to date by a store listener (aggregates.py, search.py and
+    # the like), which count the changes they have seen per collection in `seen`. Calls
+    # rebuild(name), under `lock`, for each collection whose version moved without the
+    # listener seeing the change: a snapshot restore, or another process writing to the
+    # SQLite backend. The versions are checked again under the store's write lock, taken
+    # before `lock` as the listeners do, so a write whose listener has yet to run is never
+    # taken for a missed one and no write lands halfway through a rebuild. The caller
+    # must not hold `lock`.
+    names = list(seen) if names is None else names
+    if all(db.version(name) == seen[name] for name in names):
+        return
+    with db.write_lock(), lock:
+        for name in names:
+            if db.version(name) != seen[name]:
+                rebuild(name)
+
+
+class CollectionView:
+    # Read side of a collection. A Collection is the live view; the views inside
+    # consistent_read() are frozen ones over a shared (copy-on-write) dict and id list.
+    def __init__(self, name, rows, order, sequence, version):
+        self.name = name
+        self._rows = rows
+        self._order = order
+        self._seq = sequence
+        self.version = version
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __contains__(self, record_id):
+        return self.get(record_id) is not None
+
+    @property
+    def sequence(self):
+        return self._seq
+
+    def all(self):
+        return list(self._rows.values())
+
+    def get(self, record_id):
+        try:
+            return self._rows.get(record_id)
+        except TypeError: # Unhashable ids (e.g. a list from a bad payload) never match
+            return None
+
+    def get_many(self, record_ids):
+        # Batch lookup used by the enrichment joins: {id: record} for the ids that exist
+        found = {}
+        for record_id in record_ids:
+            record = self.get(record_id)
+            if record is not None:
+                found[record_id] = record
+        return found
+
+    def find(self, predicate):
+        # Linear scan, only meant for tiny collections such as users
+        return next((r for r in self.all() if predicate(r)), None)
+
+    def page(self, after=None, limit=50):
+        # Keyset pagination: up to `limit` records with id > `after`, in id order.
+        # Returns (records, next_cursor); next_cursor is None on the last page.
+        rows = self._rows
+        order = self._order
+        position = 0 if after is None else bisect_right(order, after)
+        records = []
+        while position < len(order):
+            record = rows.get(order[position])
+            position += 1
+            if record is None:
+                continue
+            if len(records) == limit:
+                return records, records[-1]["id"]
+            records.append(record)
+        return records, None
+
+
+class Collection(CollectionView):
+    def __init__(self, name, records=(), store=None):
+        super().__init__(name, {}, [], 0, 0) # version: bumped by every mutation; feeds the HTTP ETags
+        self._dead = 0
+        # Live consistent_read() views of the current _rows/_order, in a cell of its own:
+        # a copy starts a new cell, and views of the old one release into the old one
+        self._readers = [0]
+        self._foreign_keys = FOREIGN_KEYS.get(name, ())
+        # foreign key -> {value: id}, or {value: set of ids} once several records share a value
+        self._refs = {key: {} for key in self._foreign_keys}
+        # Shared with the owning Store; listeners are called as listener(collection, op, old, new)
+        self._listeners = store._listeners if store else []
+        self._commit_hooks = store._commit_hooks if store else []
+        self._lock = store._lock if store else threading.RLock()
+        self._compact = (store._compactor if store else Compactor()).record
+        for record in records:
+            self.put(record)
+
+    def referencing(self, key, value):
+        # Records whose foreign key `key` equals `value`, in id order, from the reverse index
+        ids = self._refs[key].get(value) if isinstance(value, int) else None
+        if ids is None:
+            return []
+        ids = (ids,) if type(ids) is int else sorted(ids)
+        rows = self._rows
+        return [rows[record_id] for record_id in ids if record_id in rows]
+
+    def next_id(self):
+        # Ids are never reused, even after the highest record is deleted. Allocation is
+        # under the write lock, so concurrent requests never get the same id.
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def reserve_ids(self, count):
+        # Allocates a block of `count` consecutive ids and returns the first (bulk import)
+        with self._lock:
+            first = self._seq + 1
+            self._seq += count
+        return first
+
+    def _notify(self, op, old, new):
+        # The version moves once the listeners have seen the change, so a reader never
+        # finds a version ahead of what the derived indexes hold (see catch_up)
+        for listener in self._listeners:
+            listener(self.name, op, old, new)
+        self.version += 1
+
+    def _committed(self):
+        for hook in self._commit_hooks:
+            hook()
+
+    def _unshare(self):
+        # Copy-on-write: the first write while a consistent_read() view is alive gets its
+        # own dict and id list, leaving the view's untouched
+        if self._readers[0]:
+            self._rows = dict(self._rows)
+            self._order = list(self._order)
+            self._readers = [0]
+
+    def view(self):
+        # Caller holds the lock, and hands the view to release() once done with it
+        self._readers[0] += 1
+        view = CollectionView(self.name, self._rows, self._order, self._seq, self.version)
+        view._readers = self._readers
+        return view
+
+    def release(self, view):
+        # Caller holds the lock
+        view._readers[0] -= 1
+
+    def _link(self, record, add):
+        # Adds/removes the record in the reverse foreign key indexes. Only integer values
+        # can reference a record, so anything else is left out. A value referenced by one
+        # record maps to its id; a set (over 200 bytes) is only made for several.
+        record_id = record["id"]
+        for key in self._foreign_keys:
+            value = record.get(key)
+            if not isinstance(value, int):
+                continue
+            refs = self._refs[key]
+            ids = refs.get(value)
+            if add:
+                if ids is None:
+                    refs[value] = record_id
+                elif type(ids) is not int:
+                    ids.add(record_id)
+                elif ids != record_id:
+                    refs[value] = {ids, record_id}
+            elif ids is not None:
+                if type(ids) is int:
+                    if ids == record_id:
+                        del refs[value]
+                else:
+                    ids.discard(record_id)
+                    if len(ids) == 1: # Back to a plain id
+                        refs[value] = next(iter(ids))
+
+    def put(self, record):
+        # Raw upsert without notifying listeners (seeding, recovery)
+        record = self._compact(record)
+        record_id = record["id"]
+        self._unshare()
+        previous = self._rows.get(record_id)
+        if previous is not None:
+            self._link(previous, False)
+        elif not self._order or record_id > self._order[-1]:
+            self._order.append(record_id)
+        else:
+            position = bisect_left(self._order, record_id)
+            if position < len(self._order) and self._order[position] == record_id:
+                self._dead -= 1 # Re-inserting a deleted id revives its slot
+            else:
+                # Rebuilt rather than shifted in place, so lock-free page() calls never
+                # see an id twice
+                self._order = self._order[:position] + [record_id] + self._order[position:]
+        self._rows[record_id] = record
+        self._link(record, True)
+        self._seq = max(self._seq, record_id)
+        return record
+
+    def discard(self, record_id):
+        # Raw delete without notifying listeners (recovery)
+        self._unshare()
+        record = self._rows.pop(record_id, None)
+        if record is not None:
+            self._link(record, False)
+            self._forget(1)
+        return record
+
+    def load(self, records, sequence=0):
+        # Replaces the whole collection, e.g. from a snapshot
+        self._rows = {}
+        self._order = []
+        self._readers = [0]
+        self._dead = 0
+        self._refs = {key: {} for key in self._foreign_keys}
+        self._seq = sequence
+        self.version += 1
+        for record in records:
+            self.put(record)
+
+    def insert(self, record):
+        with self._lock:
+            self.put(record)
+            self._notify("insert", None, record)
+        self._committed()
+        return record
+
+    def insert_many(self, records):
+        # One lock acquisition and one commit (a single WAL fsync) for the whole batch
+        with self._lock:
+            for record in records:
+                self.put(record)
+                self._notify("insert", None, record)
+        self._committed()
+        return records
+
+    def update(self, record_id, changes):
+        # Stores a new dict; the old one is left intact for readers that still hold it
+        with self._lock:
+            old = self._rows[record_id]
+            record = {**old, **self._compact(dict(changes))} # Unchanged values are compact already
+            self._unshare()
+            self._rows[record_id] = record
+            if not changes.keys().isdisjoint(self._foreign_keys):
+                self._link(old, False)
+                self._link(record, True)
+            self._notify("update", old, record)
+        self._committed()
+        return record
+
+    def update_many(self, record_ids, change):
+        # Batch update under one lock acquisition and one commit. `change(record)` gets the
+        # current record and returns the changes to apply, or None to leave it alone, so
+        # nothing written in between is lost. Returns the updated records.
+        updated = []
+        with self._lock:
+            for record_id in record_ids:
+                old = self._rows.get(record_id)
+                changes = change(old) if old is not None else None
+                if not changes:
+                    continue
+                record = {**old, **self._compact(dict(changes))}
+                self._unshare()
+                self._rows[record_id] = record
+                if not changes.keys().isdisjoint(self._foreign_keys):
+                    self._link(old, False)
+                    self._link(record, True)
+                self._notify("update", old, record)
+                updated.append(record)
+        if updated:
+            self._committed()
+        return updated
+
+    def delete(self, record_id):
+        with self._lock:
+            record = self.discard(record_id)
+            if record is not None:
+                self._notify("delete", record, None)
+        self._committed()
+        return record
+
+    def delete_where(self, predicate):
+        # Removes every matching record and returns them
+        with self._lock:
+            doomed = [r for r in self._rows.values() if predicate(r)]
+            self._unshare()
+            for record in doomed:
+                del self._rows[record["id"]]
+                self._link(record, False)
+            self._forget(len(doomed))
+            for record in doomed:
+                self._notify("delete", record, None)
+        self._committed()
+        return doomed
+
+    def _forget(self, count):
+        self._dead += count
+        if self._dead > ORDER_COMPACT_MIN and self._dead > len(self._rows):
+            self._order = [record_id for record_id in self._order if record_id in self._rows]
+            self._dead = 0
+
+
+class Store:
+    def __init__(self, data):
+        # Versions restart with the process, so ETags also carry a per-process epoch
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._commit_hooks = []
+        self._compactor = Compactor() # Shared, so equal items in quotes and invoices are one object
+        self._collections = {name: Collection(name, records, self) for name, records in data.items()}
+
+    def subscribe(self, listener):
+        # listener(collection_name, op, old, new) runs inside every insert/update/delete,
+        # with op one of "insert", "update", "delete"
+        self._listeners.append(listener)
+
+    def write_lock(self):
+        # The lock writes and their listeners run under (see catch_up)
+        return self._lock
+
+    def on_commit(self, hook):
+        # hook() runs in the writing thread once the mutation's lock is released
+        self._commit_hooks.append(hook)
+
+    @contextmanager
+    def consistent_read(self, *names):
+        # Yields a read-only view of the named collections (default: all) as of one point
+        # in time. The lock is only held to take the views; see the notes at the top.
+        with self._lock:
+            views = {name: self._collections[name].view() for name in names or self._collections}
+        try:
+            yield StoreView(self.epoch, views)
+        finally:
+            with self._lock:
+                for name, view in views.items():
+                    self._collections[name].release(view)
+
+    def __getitem__(self, name):
+        return self._collections[name]
+
+    def __contains__(self, name):
+        return name in self._collections
+
+    def names(self):
+        return list(self._collections)
+
+    def version(self, name):
+        return self._collections[name].version
+
+    def delete_cascade(self, name, record_id):
+        # Deletes the record and, following CASCADES, everything that depends on it (a
+        # client's quotes, projects and invoices, and those projects' tasks and bugs), as
+        # one atomic write. Dependents come from the reverse indexes, so the cost is
+        # proportional to what gets deleted. Returns the deleted record, or None.
+        with self._lock:
+            record = self._collections[name].discard(record_id)
+            if record is None:
+                return None
+            doomed = [(name, record)]
+            position = 0
+            while position < len(doomed):
+                parent_name, parent = doomed[position]
+                position += 1
+                for child_name, key in CASCADES.get(parent_name, ()):
+                    child = self._collections[child_name]
+                    for dependent in child.referencing(key, parent["id"]):
+                        child.discard(dependent["id"])
+                        doomed.append((child_name, dependent))
+            for doomed_name, doomed_record in doomed:
+                self._collections[doomed_name]._notify("delete", doomed_record, None)
+        self._collections[name]._committed()
+        return record
+
+    def dump(self):
+        # Point-in-time copy of every collection: {name: (sequence, [records])}. Records
+        # are immutable once stored, so they are shared rather than copied.
+        with self.consistent_read() as view:
+            return {name: (view[name].sequence, view[name].all()) for name in view.names()}
+
+    def restore(self, state):
+        for name, (sequence, records) in state.items():
+            if name in self._collections:
+                self._collections[name].load(records, sequence)
+
+
+class StoreView:
+    # What consistent_read() yields: the read side of Store over frozen collection views
+    def __init__(self, epoch, views):
+        self.epoch = epoch
+        self._collections = views
+
+    def __getitem__(self, name):
+        return self._collections[name]
+
+    def __contains__(self, name):
+        return name in self._collections
+
+    def names(self):
+        return list(self._collections)
+
+    def version(self, name):
+        return self._collections[name].version
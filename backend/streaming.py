@@ -0,0 +1,36 @@
+# backend/streaming.py
+
+# Streaming mode for the collection GETs (?stream=1). Instead of building the whole
+# enriched list and then the whole JSON string, the collection is walked with keyset
+# pages, each page is enriched and encoded, and the JSON array goes out chunk by chunk
+# (chunked transfer encoding, since there is no Content-Length). Peak memory per
+# request is one page, and the first byte leaves before the last row is read.
+#
+# Pages are read one at a time without holding the store lock, so a long export sees
+# writes that land while it runs, like a cursor over a live table. A stream is always the
+# whole collection: its headers are sent before the end is known, so it could not carry
+# the X-Next-Cursor of a page, and ?after=/?limit= are refused with it.
+#
+# The caller supplies the encoding of a page, so the fragment cache (fragments.py) serves
+# streamed rows as well.
+
+STREAM_PAGE_SIZE = 500
+
+
+def iter_json_array(db, collection_name, encode):
+    # Yields the same bytes jsonify() produces for the list outside debug mode (compact,
+    # trailing newline), so clients cannot tell the two modes apart. `encode(rows)` turns
+    # a page of stored rows into their encoded (enriched, projected) JSON, as bytes.
+    yield b"["
+    first = True
+    after = None
+    while True:
+        rows, next_cursor = db[collection_name].page(after, STREAM_PAGE_SIZE)
+        if rows:
+            encoded = b",".join(encode(rows))
+            yield encoded if first else b"," + encoded
+            first = False
+        if next_cursor is None:
+            break
+        after = next_cursor
+    yield b"]\n"
@@ -0,0 +1,27 @@
+# backend/tests/conftest.py
+
+# Shared setup for the backend tests, which run against the in-memory backends.
+# Run from the backend directory: python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("REMINDER_DB", "")
+
+
+def login(client):
+    response = client.post("/api/login", json={"username": "admin", "password": "password123"})
+    assert response.status_code == 200
+    return client
+
+
+@pytest.fixture
+def client():
+    import app
+    return login(app.app.test_client())
@@ -0,0 +1,117 @@
+# backend/tests/test_analytics.py
+
+import random
+
+import pytest
+
+import analytics
+from analytics import Analytics
+from store import Store
+
+
+def sample_data():
+    return {
+        "clients": [{"id": 1, "name": "Acme"}, {"id": 2, "name": "Bolt"}],
+        "services": [{"id": 1, "name": "Hosting", "price": 10.0}, {"id": 2, "name": "Design", "price": 100.0}],
+        "quotes": [
+            {"id": 1, "client_id": 1, "quote_date": "2024-01-10", "status": "Accepted", "total_amount": 30.0,
+             "quote_items": [{"service_id": 1, "price": 10.0, "quantity": 3}]},
+            {"id": 2, "client_id": 2, "quote_date": "2024-02-05", "status": "Draft", "total_amount": 100.0,
+             "quote_items": [{"service_id": 2, "price": 100.0, "quantity": 1}]},
+            {"id": 3, "client_id": 1, "quote_date": "2024-02-20", "status": "Rejected", "total_amount": 200.0,
+             "quote_items": [{"service_id": 2, "price": 100.0, "quantity": 2}]},
+        ],
+        "invoices": [
+            {"id": 1, "client_id": 1, "quote_id": 1, "invoice_date": "2024-01-20", "status": "Paid", "total_amount": 30.0,
+             "invoice_items": [{"service_id": 1, "price": 10.0, "quantity": 3}]},
+            {"id": 2, "client_id": 2, "quote_id": None, "invoice_date": "2024-02-15", "status": "Sent", "total_amount": 300.5,
+             "invoice_items": [{"service_id": 2, "price": 100.0, "quantity": 2}, {"service_id": 1, "price": 50.25, "quantity": 2}]},
+            {"id": 3, "client_id": 1, "quote_id": None, "invoice_date": "2024-03-01", "status": "Draft", "total_amount": 999.0,
+             "invoice_items": []},
+            {"id": 4, "client_id": 2, "quote_id": None, "invoice_date": "2025-01-05", "status": "Overdue", "total_amount": 40.0,
+             "invoice_items": [{"service_id": 1, "price": 10.0, "quantity": 4}]},
+        ],
+    }
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    monkeypatch.setattr(analytics, "numpy", None)
+
+
+def test_revenue(pure_python):
+    reports = Analytics(Store(sample_data()))
+    result = reports.report("revenue", {"group": "month,client"})
+    assert result["rows"] == [
+        {"month": "2024-01", "client_id": 1, "client_name": "Acme", "count": 1, "total": 30.0},
+        {"month": "2024-02", "client_id": 2, "client_name": "Bolt", "count": 1, "total": 300.5},
+        {"month": "2025-01", "client_id": 2, "client_name": "Bolt", "count": 1, "total": 40.0},
+    ]
+    assert result["totals"] == {"count": 3, "total": 370.5}
+    assert reports.report("revenue", {"group": "year", "from": "2024-01-01", "to": "2024-12-31"})["rows"] == [
+        {"year": 2024, "count": 2, "total": 330.5}]
+    assert reports.report("revenue", {"group": "client", "order": "total", "limit": "1"})["rows"] == [
+        {"client_id": 2, "client_name": "Bolt", "count": 2, "total": 340.5}]
+
+
+def test_services(pure_python):
+    rows = Analytics(Store(sample_data())).report("services", {"group": "service"})["rows"]
+    assert rows == [
+        {"service_id": 1, "service_name": "Hosting", "count": 3, "quantity": 9.0, "total": 170.5},
+        {"service_id": 2, "service_name": "Design", "count": 1, "quantity": 2.0, "total": 200.0},
+    ]
+
+
+def test_quote_conversion_and_quote_to_paid(pure_python):
+    reports = Analytics(Store(sample_data()))
+    assert reports.report("quote-conversion", {"group": "month"})["rows"] == [
+        {"month": "2024-01", "count": 1, "total": 30.0, "by_status": {"Accepted": 1}, "conversion_rate": 1.0},
+        {"month": "2024-02", "count": 2, "total": 300.0, "by_status": {"Draft": 1, "Rejected": 1}, "conversion_rate": 0.0},
+    ]
+    assert reports.report("quote-to-paid", {})["rows"] == [{"count": 1, "average_days": 10.0}]
+
+
+def test_reports_follow_writes(pure_python):
+    db = Store(sample_data())
+    reports = Analytics(db)
+    db["invoices"].update(3, {"status": "Sent", "total_amount": 12.5})
+    db["invoices"].delete(4)
+    assert reports.report("revenue", {"group": "year"})["rows"] == [{"year": 2024, "count": 3, "total": 343.0}]
+
+
+def random_data(rng, count=300):
+    statuses = ["Draft", "Sent", "Paid", "Overdue", "Accepted", "Rejected", None]
+    dates = [f"202{rng.randint(2, 5)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" for _ in range(40)] + [None, "not a date"]
+
+    def items(field):
+        return {field: [{"service_id": rng.choice([1, 2, 3, None]), "price": rng.choice([10, 99.99, 0.25, "x"]),
+                         "quantity": rng.choice([1, 2, 0.5, 1.5])} for _ in range(rng.randint(0, 4))]}
+
+    data = sample_data()
+    data["quotes"] = [{"id": i, "client_id": rng.choice([1, 2, None]), "quote_date": rng.choice(dates),
+                       "status": rng.choice(statuses), "total_amount": rng.choice([0, 12.34, 1000]), **items("quote_items")}
+                      for i in range(1, count + 1)]
+    data["invoices"] = [{"id": i, "client_id": rng.choice([1, 2, None]), "quote_id": rng.choice([None, rng.randint(1, count + 10)]),
+                         "invoice_date": rng.choice(dates), "status": rng.choice(statuses),
+                         "total_amount": rng.choice([0, 12.34, 1000, "bad"]), **items("invoice_items")}
+                        for i in range(1, count + 1)]
+    return data
+
+
+def test_numpy_and_pure_python_agree(monkeypatch):
+    numpy = pytest.importorskip("numpy")
+    reports = Analytics(Store(random_data(random.Random(3))))
+    queries = [
+        ("revenue", {"group": "month,client"}),
+        ("revenue", {"group": "quarter,status", "from": "2023-01-01", "to": "2024-06-30"}),
+        ("revenue", {"group": "client", "order": "total", "limit": "2"}),
+        ("services", {"group": "year,service"}),
+        ("services", {"group": "service", "source": "quotes", "status": "Draft,Accepted"}),
+        ("quote-conversion", {"group": "month,client"}),
+        ("quote-to-paid", {"group": "year"}),
+    ]
+    for name, args in queries:
+        monkeypatch.setattr(analytics, "numpy", numpy)
+        vectorized = reports.report(name, args)
+        monkeypatch.setattr(analytics, "numpy", None)
+        assert reports.report(name, args) == vectorized, (name, args)
@@ -0,0 +1,56 @@
+# backend/tests/test_bulk.py
+
+import io
+
+from bulk import import_rows, iter_rows
+from pricing import PriceBook
+from store import Store
+
+
+def import_text(db, name, text, file_format):
+    return import_rows(db, name, iter_rows(io.BytesIO(text.encode()), file_format), PriceBook(db))
+
+
+def test_non_finite_numbers_are_row_errors():
+    db = Store({"clients": [], "quotes": [], "projects": [], "services": [], "invoices": []})
+    csv = "name,price,unit\nA,10,fixed\nB,nan,fixed\nC,inf,fixed\nD,-Infinity,hour\n"
+    result = import_text(db, "services", csv, "csv")
+    assert result["imported"] == 1 and result["skipped"] == 3
+    assert [error["line"] for error in result["errors"]] == [3, 4, 5]
+    assert all(error["message"] == "'price' must be a number" for error in result["errors"])
+
+    ndjson = '{"name": "E", "price": NaN}\n{"name": "F", "price": Infinity}\n{"name": "G", "price": 2.5}\n'
+    result = import_text(db, "services", ndjson, "ndjson")
+    assert result["imported"] == 1 and [error["line"] for error in result["errors"]] == [1, 2]
+    assert sorted(service["price"] for service in db["services"]) == [2.5, 10.0]
+
+
+def test_infinite_ids_are_row_errors():
+    db = Store({"clients": [{"id": 1, "name": "Acme"}], "quotes": [], "projects": [], "services": [], "invoices": []})
+    ndjson = '{"client_id": Infinity, "total_amount": 1}\n{"client_id": 1, "total_amount": 1}\n'
+    result = import_text(db, "quotes", ndjson, "ndjson")
+    assert result["imported"] == 1
+    assert result["errors"] == [{"line": 1, "message": "'client_id' must be an integer"}]
+
+
+def test_imported_documents_are_priced():
+    db = Store({"clients": [{"id": 1, "name": "Acme"}], "quotes": [], "projects": [], "invoices": [],
+                "services": [{"id": 1, "name": "Hosting", "price": 19.99}]})
+    ndjson = (
+        # Draft: priced from the service, whatever the line and total say
+        '{"client_id": 1, "status": "Draft", "total_amount": 1, "quote_items": [{"service_id": 1, "price": 5, "quantity": 3}]}\n'
+        # Issued: keeps its line prices, the total is recomputed from them
+        '{"client_id": 1, "status": "Sent", "total_amount": 999, "quote_items": [{"price": 0.1, "quantity": 3}, {"price": 0.2}]}\n'
+        '{"client_id": 1, "status": "Sent", "quote_items": [{"price": "abc"}]}\n'
+    )
+    result = import_text(db, "quotes", ndjson, "ndjson")
+    assert result["imported"] == 2
+    assert result["errors"] == [{"line": 3, "message": "Invalid item price"}]
+    draft, sent = db["quotes"]
+    assert draft["total_amount"] == 59.97 and draft["quote_items"][0]["price"] == 19.99
+    assert sent["total_amount"] == 0.5
+
+    csv = 'client_id,status,total_amount,invoice_items\n1,Paid,1000000,"[{""price"": 12.5, ""quantity"": 2}]"\n'
+    result = import_text(db, "invoices", csv, "csv")
+    assert result["imported"] == 1
+    assert next(iter(db["invoices"]))["total_amount"] == 25.0
@@ -0,0 +1,77 @@
+# backend/tests/test_cascade.py
+
+import pytest
+
+from aggregates import Summary
+from durability import Durability
+from sqlite_store import SqliteStore
+from store import Store
+
+
+def sample_data():
+    return {
+        "users": [],
+        "clients": [{"id": 1, "name": "Acme"}, {"id": 2, "name": "Bolt"}],
+        "services": [],
+        "quotes": [{"id": 1, "client_id": 1, "status": "Draft", "total_amount": 10},
+                   {"id": 2, "client_id": 2, "status": "Draft", "total_amount": 20}],
+        "projects": [{"id": 1, "client_id": 1, "status": "Planning"}, {"id": 2, "client_id": 1, "status": "Planning"},
+                     {"id": 3, "client_id": 2, "status": "Planning"}],
+        "invoices": [{"id": 1, "client_id": 1, "project_id": 1, "status": "Sent", "total_amount": 10}],
+        "tasks": [{"id": 1, "project_id": 1, "status": "Pending"}, {"id": 2, "project_id": 2, "status": "Pending"},
+                  {"id": 3, "project_id": 3, "status": "Pending"}],
+        "bugs": [{"id": 1, "project_id": 2, "status": "Open", "severity": "High"},
+                 {"id": 2, "project_id": 3, "status": "Open", "severity": "Low"}],
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def db(request, tmp_path):
+    if request.param == "memory":
+        return Store(sample_data())
+    return SqliteStore(str(tmp_path / "store.db"), sample_data())
+
+
+def ids(db, name):
+    return sorted(record["id"] for record in db[name].all())
+
+
+def test_deleting_a_client_deletes_everything_it_owns(db):
+    deleted = []
+    db.subscribe(lambda name, op, old, new: deleted.append((name, old["id"])))
+    assert db.delete_cascade("clients", 1)["name"] == "Acme"
+    assert sorted(deleted) == [("bugs", 1), ("clients", 1), ("invoices", 1), ("projects", 1), ("projects", 2),
+                               ("quotes", 1), ("tasks", 1), ("tasks", 2)]
+    assert ids(db, "clients") == [2] and ids(db, "quotes") == [2] and ids(db, "projects") == [3]
+    assert ids(db, "invoices") == [] and ids(db, "tasks") == [3] and ids(db, "bugs") == [2]
+    assert db["projects"].referencing("client_id", 1) == []
+    assert db["tasks"].referencing("project_id", 2) == []
+
+
+def test_deleting_a_project_leaves_its_client_and_invoices(db):
+    assert db.delete_cascade("projects", 1) is not None
+    assert ids(db, "tasks") == [2, 3] and ids(db, "bugs") == [1, 2]
+    assert ids(db, "clients") == [1, 2] and ids(db, "invoices") == [1]
+
+
+def test_missing_record(db):
+    versions = {name: db.version(name) for name in db.names()}
+    assert db.delete_cascade("clients", 99) is None
+    assert {name: db.version(name) for name in db.names()} == versions
+
+
+def test_derived_state_sees_every_cascaded_delete(db):
+    summary = Summary(db)
+    db.delete_cascade("clients", 2)
+    assert summary.snapshot() == Summary(db).snapshot()
+
+
+def test_cascade_is_logged_and_recovered(tmp_path):
+    db = Store(sample_data())
+    durability = Durability(str(tmp_path)).recover(db)
+    db.delete_cascade("clients", 1)
+    durability.close()
+    recovered = Store(sample_data())
+    Durability(str(tmp_path)).recover(recovered).close()
+    for name in ("clients", "quotes", "projects", "invoices", "tasks", "bugs"):
+        assert ids(recovered, name) == ids(db, name)
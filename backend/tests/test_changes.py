@@ -0,0 +1,167 @@
+# backend/tests/test_changes.py
+
+import sys
+import threading
+
+import pytest
+
+import app
+from changes import ChangeLog, SqliteChangeLog
+from conftest import login
+from sqlite_store import SqliteStore
+from store import Store
+
+
+def sample_data():
+    return {
+        "users": [],
+        "clients": [{"id": 1, "name": "Acme", "company": "Acme Ltd"}, {"id": 2, "name": "Bolt", "company": "Bolt Inc"}],
+        "services": [],
+        "quotes": [],
+        "projects": [{"id": 1, "client_id": 1, "project_name": "Site"}],
+        "invoices": [],
+        "tasks": [{"id": 1, "project_id": 1, "name": "Design"}, {"id": 2, "project_id": 1, "name": "Build"}],
+        "bugs": [],
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        db = Store(sample_data())
+        return db, ChangeLog(db, 5)
+    db = SqliteStore(str(tmp_path / "store.db"), sample_data())
+    return db, SqliteChangeLog(db, 5)
+
+
+def changed(log, since, epoch=None, **options):
+    rows, seq, reset, has_more = log.changes(since, epoch or log.epoch, **options)
+    return [(name, record_id, deleted) for _, name, record_id, deleted in rows], seq, reset, has_more
+
+
+def poll(client, seq, epoch):
+    response = client.get(f"/api/changes?since={seq}&epoch={epoch}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_concurrent_writes_never_reset_a_polling_client(client):
+    # Every write is seen by the log's listener, so a client polling while they land
+    # must never be told to reset
+    start = client.get("/api/changes").get_json()
+    seq, epoch = start["seq"], start["epoch"]
+    tasks = app.db["tasks"].all()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6) # Switch threads as often as possible
+
+    def write(writer):
+        session = login(app.app.test_client())
+        for round_number in range(200):
+            for task in tasks[writer::2]:
+                edit = session.put(f"/api/tasks/{task['id']}", json={"project_id": task["project_id"], "progress": round_number})
+                assert edit.status_code == 200
+
+    writers = [threading.Thread(target=write, args=(writer,)) for writer in range(2)]
+    try:
+        for thread in writers:
+            thread.start()
+        latest = {}
+        while True:
+            done = not any(thread.is_alive() for thread in writers)
+            body = poll(client, seq, epoch)
+            assert not body["reset"]
+            for change in body["changes"]:
+                latest[change["id"]] = change["record"]
+            seq = body["seq"]
+            if done and not body["has_more"]:
+                break
+    finally:
+        sys.setswitchinterval(interval)
+        for thread in writers:
+            thread.join()
+    assert {task_id: record["progress"] for task_id, record in latest.items()} == {task["id"]: 199 for task in tasks}
+
+
+def test_changes_since_a_seq_are_the_latest_per_record(store):
+    db, log = store
+    _, start, reset, _ = log.changes(None)
+    assert reset
+    db["tasks"].update(1, {"name": "Sketch"})
+    db["tasks"].update(2, {"name": "Code"})
+    db["tasks"].update(1, {"name": "Draft"})
+    db["tasks"].insert({"id": 3, "project_id": 1, "name": "Test"})
+    db["tasks"].delete(2)
+    rows, seq, reset, has_more = changed(log, start)
+    assert rows == [("tasks", 1, False), ("tasks", 3, False), ("tasks", 2, True)]
+    assert not reset and not has_more
+    assert changed(log, seq) == ([], seq, False, False)
+
+
+def test_parent_changes_log_the_rows_that_show_them(store):
+    db, log = store
+    _, start, _, _ = log.changes(None)
+    db["projects"].update(1, {"project_name": "Shop"})
+    assert changed(log, start)[0] == [("projects", 1, False), ("tasks", 1, False), ("tasks", 2, False)]
+    _, start, _, _ = log.changes(None)
+    db["projects"].update(1, {"status": "Done"}) # Not shown in the task rows
+    assert changed(log, start)[0] == [("projects", 1, False)]
+
+
+def test_limit_and_collections(store):
+    db, log = store
+    _, start, _, _ = log.changes(None)
+    db["clients"].update(2, {"notes": "x"})
+    for task_id in (1, 2):
+        db["tasks"].update(task_id, {"status": "Done"})
+    rows, seq, _, has_more = changed(log, start, limit=2)
+    assert rows == [("clients", 2, False), ("tasks", 1, False)] and has_more
+    assert changed(log, seq, limit=2)[0] == [("tasks", 2, False)]
+    assert changed(log, start, collections=["tasks"])[0] == [("tasks", 1, False), ("tasks", 2, False)]
+
+
+def test_reset_on_unknown_epoch_future_seq_and_compaction(store):
+    db, log = store
+    _, start, _, _ = log.changes(None)
+    assert changed(log, start, "another")[2]
+    assert changed(log, start + 1)[2]
+    for round_number in range(4): # 8 entries through a window of 5
+        for task_id in (1, 2):
+            db["tasks"].update(task_id, {"name": f"Round {round_number}"})
+        db["clients"].update(2, {"notes": str(round_number)})
+        db["tasks"].insert({"id": 10 + round_number, "project_id": 1, "name": "New"})
+    if isinstance(log, SqliteChangeLog):
+        log._compact(db.connection()) # Trimmed every COMPACT_EVERY changes otherwise
+    rows, seq, reset, _ = changed(log, start)
+    assert reset and rows == []
+    assert not changed(log, seq)[2]
+
+
+def test_sqlite_workers_share_one_log(tmp_path):
+    # Two stores on one file stand for two worker processes
+    path = str(tmp_path / "store.db")
+    first = SqliteStore(path, sample_data())
+    second = SqliteStore(path)
+    first_log, second_log = SqliteChangeLog(first), SqliteChangeLog(second)
+    assert first_log.epoch == second_log.epoch
+    _, start, _, _ = first_log.changes(None)
+    first["tasks"].update(1, {"name": "From the first"})
+    second["tasks"].update(2, {"name": "From the second"})
+    for log in (first_log, second_log):
+        assert changed(log, start)[0] == [("tasks", 1, False), ("tasks", 2, False)]
+        assert not changed(log, start)[2]
+    # A restart keeps the log
+    assert changed(SqliteChangeLog(SqliteStore(path)), start)[0] == [("tasks", 1, False), ("tasks", 2, False)]
+
+
+def test_sqlite_log_rolls_back_with_the_write(tmp_path):
+    db = SqliteStore(str(tmp_path / "store.db"), sample_data())
+    log = SqliteChangeLog(db)
+    _, start, _, _ = log.changes(None)
+
+    def fail(conn, collection_name, op, old, new):
+        raise RuntimeError("write failed")
+    db.on_write(fail)
+    with pytest.raises(RuntimeError):
+        db["tasks"].update(1, {"name": "Lost"})
+    assert db["tasks"].get(1)["name"] == "Design"
+    assert changed(log, start)[0] == []
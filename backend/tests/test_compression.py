@@ -0,0 +1,91 @@
+# backend/tests/test_compression.py
+
+import gzip
+import zlib
+
+import pytest
+from flask import Flask, Response
+
+import app
+from compression import CompressedBodyCache, Compressor, compress, iter_compressed
+
+BODY = b'{"rows": [' + b",".join(b'{"id": %d, "name": "Client %d"}' % (i, i) for i in range(200)) + b"]}"
+
+
+def minimal_app(min_bytes=1024, cache=None):
+    flask_app = Flask(__name__)
+    compressor = Compressor(min_bytes, cache)
+    flask_app.after_request(compressor.after_request)
+    flask_app.add_url_rule("/json", "json", lambda: Response(BODY, mimetype="application/json"))
+    flask_app.add_url_rule("/small", "small", lambda: Response(b"[]", mimetype="application/json"))
+    flask_app.add_url_rule("/html", "html", lambda: Response(BODY, mimetype="text/html"))
+    flask_app.add_url_rule("/missing", "missing", lambda: Response(BODY, 404, mimetype="application/json"))
+    flask_app.add_url_rule("/stream", "stream", lambda: Response(iter([b"[1,", b"2,", b"3]"]), mimetype="application/json"))
+    return flask_app.test_client()
+
+
+def test_buffered_bodies_are_gzipped_when_accepted_and_large_enough():
+    client = minimal_app()
+    response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.get_data()) == BODY
+    for path, headers in (("/json", {}), ("/json", {"Accept-Encoding": "gzip;q=0"}), ("/small", {"Accept-Encoding": "gzip"}),
+                          ("/missing", {"Accept-Encoding": "gzip"})):
+        response = client.get(path, headers=headers)
+        assert "Content-Encoding" not in response.headers and "Accept-Encoding" in response.headers["Vary"], path
+    html = client.get("/html", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in html.headers and "Vary" not in html.headers
+
+
+def test_streams_are_flushed_chunk_by_chunk():
+    chunks = list(iter_compressed(iter([b"[1,", "2,", b"", b"3]"]), "gzip"))
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(chunks[0]) == b"[1," # Readable before the rest arrives
+    assert decoder.decompress(b"".join(chunks[1:])) == b"2,3]"
+    response = minimal_app().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip" and "Content-Length" not in response.headers
+    assert gzip.decompress(response.get_data()) == b"[1,2,3]"
+
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip("brotli")
+    response = minimal_app().get("/json", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()) == BODY
+    assert brotli.decompress(compress(BODY, "br")) == BODY
+    assert brotli.decompress(b"".join(iter_compressed(iter([BODY[:10], BODY[10:]]), "br"))) == BODY
+
+
+def test_cache_is_keyed_by_etag_and_bounded_in_bytes():
+    cache = CompressedBodyCache(max_bytes=10)
+    cache.put("/a", "gzip", "v1", b"aaaa", {"Content-Type": "application/json"})
+    assert cache.get("/a", "gzip", "v1") == (b"aaaa", {"Content-Type": "application/json"})
+    assert cache.get("/a", "gzip", "v2") is None and cache.get("/a", "br", "v1") is None
+    cache.put("/b", "gzip", "v1", b"bbbb", {})
+    cache.get("/a", "gzip", "v1") # /b is now the least recently used
+    cache.put("/c", "gzip", "v1", b"cccc", {})
+    assert cache.get("/b", "gzip", "v1") is None
+    assert cache.get("/a", "gzip", "v1") is not None and cache.get("/c", "gzip", "v1") is not None
+    cache.put("/d", "gzip", "v1", b"d" * 11, {}) # Larger than the whole cache: not kept
+    assert cache.get("/d", "gzip", "v1") is None and cache.get("/a", "gzip", "v1") is not None
+
+
+def test_conditional_gets_are_served_from_the_cache(client, monkeypatch):
+    assert app.compressor is not None and app.compressor.cache is not None
+    monkeypatch.setattr(app.compressor, "min_bytes", 0)
+    encoded = []
+    encode_rows = app.encode_rows
+    monkeypatch.setattr(app, "encode_rows", lambda *args: encoded.append(args[0]) or encode_rows(*args))
+
+    path, headers = "/api/clients?limit=1&fields=id,name", {"Accept-Encoding": "gzip"}
+    first = client.get(path, headers=headers)
+    second = client.get(path, headers=headers)
+    assert encoded == ["clients"] # The second body came from the cache
+    assert second.get_data() == first.get_data() and second.headers["Content-Encoding"] == "gzip"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers.get("X-Next-Cursor") == first.headers.get("X-Next-Cursor")
+    assert gzip.decompress(second.get_data()) == client.get(path).get_data()
+
+    app.db["clients"].update(1, {}) # A new data version misses
+    client.get(path, headers=headers)
+    assert encoded == ["clients", "clients", "clients"] # The uncompressed read above, then the miss
@@ -0,0 +1,80 @@
+# backend/tests/test_durability.py
+
+import os
+
+from durability import Durability, _LOG_NAME, _SNAPSHOT_NAME, _generations
+from store import Store
+
+COLLECTIONS = ("clients", "projects", "tasks")
+
+
+def empty_store():
+    return Store({name: [] for name in COLLECTIONS})
+
+
+def state(db):
+    return {name: (db[name].sequence, db[name].all()) for name in COLLECTIONS}
+
+
+def write_some(db, first_id, count):
+    for record_id in range(first_id, first_id + count):
+        db["clients"].insert({"id": record_id, "name": f"Client {record_id}"})
+        db["projects"].insert({"id": record_id, "client_id": record_id, "project_name": f"Project {record_id}"})
+    db["clients"].update(first_id, {"name": "Renamed"})
+    db["projects"].delete(first_id + count - 1)
+
+
+def test_replay_after_a_crash_drops_the_torn_frame(tmp_path):
+    directory = str(tmp_path)
+    db = empty_store()
+    Durability(directory).recover(db) # Never closed: the process "crashes"
+    write_some(db, 1, 20)
+    expected = state(db)
+    log = os.path.join(directory, "wal-0.log")
+    intact = os.path.getsize(log)
+    with open(log, "ab") as f: # A frame cut short by the crash
+        f.write(b"\x40\x00\x00\x00\x12\x34\x56\x78partial")
+
+    recovered = empty_store()
+    durability = Durability(directory).recover(recovered)
+    assert state(recovered) == expected
+    assert os.path.getsize(log) == intact
+    # Logging resumes where the intact prefix ended
+    recovered["tasks"].insert({"id": 1, "project_id": 1, "name": "After recovery"})
+    durability.close()
+    again = empty_store()
+    Durability(directory).recover(again).close()
+    assert state(again) == state(recovered)
+
+
+def test_checkpoint_keeps_only_the_latest_generation(tmp_path):
+    directory = str(tmp_path)
+    db = empty_store()
+    durability = Durability(directory).recover(db)
+    write_some(db, 1, 10)
+    durability.checkpoint()
+    write_some(db, 11, 10)
+    durability.checkpoint()
+    write_some(db, 21, 10) # Only in the log after the last snapshot
+    durability.close()
+    assert _generations(directory, _SNAPSHOT_NAME) == [2]
+    assert _generations(directory, _LOG_NAME) == [2]
+
+    recovered = empty_store()
+    Durability(directory).recover(recovered).close()
+    assert state(recovered) == state(db)
+    assert recovered["clients"].next_id() == 31
+
+
+def test_snapshot_without_its_log_tail(tmp_path):
+    # A crash right after the snapshot was renamed into place, before any new write
+    directory = str(tmp_path)
+    db = empty_store()
+    durability = Durability(directory).recover(db)
+    write_some(db, 1, 5)
+    durability.checkpoint()
+    durability.close()
+    os.remove(os.path.join(directory, "wal-1.log"))
+    recovered = empty_store()
+    Durability(directory).recover(recovered).close()
+    assert state(recovered) == state(db)
@@ -0,0 +1,43 @@
+# backend/tests/test_etag.py
+
+import app
+
+
+def touch(name, record_id=1):
+    # A write that changes nothing but still moves the collection's version
+    app.db[name].update(record_id, {})
+
+
+def test_unchanged_data_is_a_304(client):
+    first = client.get("/api/clients")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    again = client.get("/api/clients", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.get_data() == b""
+    assert again.headers["ETag"] == etag
+    # Another validator in the list, or the strong form, still matches
+    assert client.get("/api/clients", headers={"If-None-Match": f'"other", {etag[2:]}'}).status_code == 304
+
+
+def test_a_write_to_any_read_collection_changes_the_etag(client):
+    etag = client.get("/api/quotes").headers["ETag"]
+    touch("tasks") # Not read by /api/quotes
+    assert client.get("/api/quotes", headers={"If-None-Match": etag}).status_code == 304
+    touch("clients") # Joined in for client_company
+    response = client.get("/api/quotes", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+
+def test_the_url_is_part_of_the_etag(client):
+    etags = {client.get(path).headers["ETag"] for path in
+             ("/api/tasks", "/api/tasks?limit=1", "/api/tasks?fields=id", "/api/tasks/1")}
+    assert len(etags) == 4
+
+
+def test_only_successful_reads_get_an_etag(client):
+    assert "ETag" not in client.get("/api/tasks/999999").headers
+    assert "ETag" not in client.get("/api/tasks?limit=0").headers
+    anonymous = app.app.test_client()
+    response = anonymous.get("/api/clients", headers={"If-None-Match": "*"})
+    assert response.status_code == 401 and "ETag" not in response.headers
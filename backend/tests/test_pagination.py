@@ -0,0 +1,64 @@
+# backend/tests/test_pagination.py
+
+import pytest
+
+from query import MAX_PAGE_LIMIT, QueryError, page_rows, parse_page, project
+
+
+def test_pages_walk_the_whole_collection(client):
+    everything = client.get("/api/tasks").get_json()
+    assert "X-Next-Cursor" not in client.get("/api/tasks").headers
+    rows, after = [], None
+    while True:
+        response = client.get("/api/tasks?limit=2" + (f"&after={after}" if after is not None else ""))
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 2
+        rows.extend(page)
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+        assert int(after) == page[-1]["id"]
+    assert rows == everything
+
+
+def test_bad_page_arguments(client):
+    for query in ("limit=0", "limit=-1", "limit=abc", "after=x"):
+        assert client.get(f"/api/clients?{query}").status_code == 400
+
+
+def test_parse_page():
+    assert parse_page({}) == (None, None)
+    assert parse_page({"after": "3"}) == (3, 50)
+    assert parse_page({"limit": str(MAX_PAGE_LIMIT * 10)}) == (None, MAX_PAGE_LIMIT)
+    with pytest.raises(QueryError):
+        parse_page({"limit": True})
+
+
+def test_fields_project_enriched_rows(client):
+    full = client.get("/api/invoices").get_json()
+    projected = client.get("/api/invoices?fields=id,client_company,missing").get_json()
+    assert projected == [{"id": row["id"], "client_company": row["client_company"]} for row in full]
+    page = client.get("/api/invoices?fields=id&limit=1").get_json()
+    assert page == [{"id": full[0]["id"]}]
+
+
+def test_batch_pages_and_projects(client):
+    response = client.post("/api/batch", json={"queries": [
+        {"collection": "clients", "limit": 1, "fields": ["id", "name"]},
+        {"collection": "clients", "key": "rest", "after": 1, "limit": 500},
+    ]})
+    body = response.get_json()
+    clients = client.get("/api/clients").get_json()
+    assert body["results"]["clients"] == [{"id": clients[0]["id"], "name": clients[0]["name"]}]
+    assert body["cursors"] == ({"clients": 1} if len(clients) > 1 else {})
+    assert body["results"]["rest"] == [row for row in clients if row["id"] > 1]
+
+
+def test_page_rows_and_project():
+    rows = [{"id": i, "name": str(i)} for i in (1, 2, 5, 9)]
+    assert page_rows(rows, None, 2) == (rows[:2], 2)
+    assert page_rows(rows, 2, 2) == (rows[2:], None)
+    assert page_rows(rows, 3, 1) == ([rows[2]], 5)
+    assert project(rows[:1], ["name", "other"]) == [{"name": "1"}]
+    assert project(rows, None) is rows
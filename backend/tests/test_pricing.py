@@ -0,0 +1,44 @@
+# backend/tests/test_pricing.py
+
+from decimal import Decimal
+
+import pytest
+
+from pricing import MAX_CENTS, PriceBook, PricingError, to_cents
+from store import Store
+
+
+@pytest.mark.parametrize("amount, cents", [
+    (0, 0),
+    (10, 1000),
+    (0.29, 29), # 0.29 * 100 is 28.999999999999996 as a float
+    (1.005, 101), # Half up, on the decimal the float prints as
+    (0.004, 0),
+    (0.005, 1),
+    (-2.5, -250),
+    ("19.99", 1999),
+    (" 7.5 ", 750),
+    ("1e3", 100000),
+    (MAX_CENTS // 100, MAX_CENTS),
+])
+def test_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+
+@pytest.mark.parametrize("amount", [
+    None, True, [], {}, "", "abc", "1,5", "nan", "NaN", "inf", "-Infinity", float("nan"), float("inf"),
+    "1e400", 1e308, -1e308, 10 ** 400, MAX_CENTS // 100 + 1, str(Decimal(MAX_CENTS) / 100 + Decimal("0.01")),
+])
+def test_to_cents_rejects(amount):
+    with pytest.raises(PricingError):
+        to_cents(amount)
+
+
+def test_price_items_rejects_amounts_too_large():
+    book = PriceBook(Store({"services": [], "quotes": [], "invoices": []}))
+    assert book.price_items([{"price": 2.5, "quantity": 1.5}], "Sent") == ([{"price": 2.5, "quantity": 1.5}], 375)
+    for item in ({"price": 1000, "quantity": 1e308}, {"price": 1000, "quantity": 10 ** 400}):
+        with pytest.raises(PricingError):
+            book.price_items([item], "Sent")
+    with pytest.raises(PricingError):
+        book.price_items([{"price": MAX_CENTS // 100, "quantity": 1}] * 2, "Sent")
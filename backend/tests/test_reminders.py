@@ -0,0 +1,57 @@
+# backend/tests/test_reminders.py
+
+from datetime import date
+
+from reminders import ReminderScheduler, SqliteSentReminders
+from store import Store
+
+TODAY = date(2024, 6, 1)
+
+
+def sample_data():
+    return {
+        "projects": [],
+        "tasks": [{"id": 1, "name": "Design", "status": "Pending", "due_date": "2024-06-02"},
+                  {"id": 2, "name": "Build", "status": "Pending", "due_date": "2024-07-01"}],
+        "invoices": [{"id": 1, "status": "Sent", "due_date": "2024-05-30"}],
+    }
+
+
+def scheduler(db, delivered, sent_store=None):
+    return ReminderScheduler(db, lambda batch: delivered.extend((item["collection"], item["record"]["id"]) for item in batch),
+                             sent_store=sent_store)
+
+
+def test_workers_sharing_the_sent_store_remind_once(tmp_path):
+    path = str(tmp_path / "reminders.db")
+    db = Store(sample_data())
+    delivered = []
+    first, second = scheduler(db, delivered, SqliteSentReminders(path, db.epoch)), scheduler(db, delivered, SqliteSentReminders(path, db.epoch))
+    assert first.tick(TODAY) == 2
+    assert second.tick(TODAY) == 0
+    # A restarted worker does not send them again
+    assert scheduler(db, delivered, SqliteSentReminders(path, db.epoch)).tick(TODAY) == 0
+    assert sorted(delivered) == [("invoices", 1), ("tasks", 1)]
+
+
+def test_a_moved_due_date_is_reminded_again(tmp_path):
+    path = str(tmp_path / "reminders.db")
+    db = Store(sample_data())
+    delivered = []
+    first, second = scheduler(db, delivered, SqliteSentReminders(path, db.epoch)), scheduler(db, delivered, SqliteSentReminders(path, db.epoch))
+    first.tick(TODAY)
+    db["tasks"].update(1, {"due_date": "2024-06-03"})
+    assert second.tick(TODAY) + first.tick(TODAY) == 1
+    assert delivered.count(("tasks", 1)) == 2
+
+
+def test_a_new_store_reusing_ids_is_reminded(tmp_path):
+    # An in-memory store starts over with a new epoch and the same ids after a restart
+    path = str(tmp_path / "reminders.db")
+    delivered = []
+    db = Store(sample_data())
+    assert scheduler(db, delivered, SqliteSentReminders(path, db.epoch)).tick(TODAY) == 2
+    restarted = Store(sample_data())
+    assert restarted.epoch != db.epoch
+    assert scheduler(restarted, delivered, SqliteSentReminders(path, restarted.epoch)).tick(TODAY) == 2
+    assert sorted(delivered) == [("invoices", 1), ("invoices", 1), ("tasks", 1), ("tasks", 1)]
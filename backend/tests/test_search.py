@@ -0,0 +1,52 @@
+# backend/tests/test_search.py
+
+import random
+
+from search import COLLECTIONS, SearchIndex
+from store import Store
+
+
+def sample_data():
+    return {
+        "users": [],
+        "clients": [{"id": i, "name": f"Client {i}", "company": "Acme" if i % 2 else "Bolt", "notes": ""} for i in range(1, 41)],
+        "services": [],
+        "quotes": [],
+        "projects": [{"id": i, "client_id": 1, "project_name": f"Acme site {i}", "description": "redesign"} for i in range(1, 21)],
+        "invoices": [],
+        "tasks": [{"id": i, "project_id": 1, "name": f"Task {i}", "description": "acme review"} for i in range(1, 31)],
+        "bugs": [],
+    }
+
+
+def test_hits_ordered_by_collection_then_id():
+    index = SearchIndex(Store(sample_data()))
+    hits = index.search("acme", limit=100)
+    assert hits == sorted(hits, key=lambda hit: (COLLECTIONS.index(hit[0]), hit[1]))
+    assert len(hits) == 20 + 20 + 30
+    assert index.search("acme", limit=5) == hits[:5]
+
+
+def test_incremental_index_answers_like_a_rebuild():
+    db = Store(sample_data())
+    index = SearchIndex(db)
+    rng = random.Random(7)
+    for step in range(200):
+        record_id = rng.randint(1, 60)
+        if db["tasks"].get(record_id) is None:
+            db["tasks"].insert({"id": record_id, "project_id": 1, "name": f"Task {record_id}", "description": rng.choice(["acme", "acme review", "other"])})
+        elif step % 3 == 0:
+            db["tasks"].delete(record_id)
+        else:
+            db["tasks"].update(record_id, {"description": rng.choice(["acme", "acme review", "other"])})
+    rebuilt = SearchIndex(db)
+    for query in ("acme", "acme r", "ac", "task 1", "review"):
+        for limit in (1, 7, 100):
+            assert index.search(query, limit=limit) == rebuilt.search(query, limit=limit)
+
+
+def test_collections_filter():
+    index = SearchIndex(Store(sample_data()))
+    hits = index.search("acme", collections=["tasks"], limit=3)
+    assert hits == [("tasks", 1), ("tasks", 2), ("tasks", 3)]
+    assert index.search("acme review", collections=["projects"]) == []
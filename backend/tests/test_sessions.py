@@ -0,0 +1,128 @@
+# backend/tests/test_sessions.py
+
+import time
+
+import pytest
+from flask import Flask, jsonify, session
+
+from sessions import LRUCache, MemorySessionBackend, ServerSideSessionInterface, SqliteSessionBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionBackend()
+    return SqliteSessionBackend(str(tmp_path / "sessions.db"))
+
+
+def test_backend_round_trip_and_expiry(backend):
+    now = time.time()
+    backend.save("a", {"user_id": 1}, now + 60)
+    backend.save("b", {"user_id": 2}, now - 1)
+    assert backend.load("a") == {"user_id": 1}
+    assert backend.load("b") is None # Expired
+    backend.purge()
+    backend.save("a", {"user_id": 3}, now + 60)
+    assert backend.load("a") == {"user_id": 3}
+    backend.delete("a")
+    assert backend.load("a") is None and backend.load("missing") is None
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(capacity=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", None) # A cached miss
+    assert cache.get("a") == (True, {"n": 1}) # Now the most recent
+    cache.put("c", {"n": 3})
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, {"n": 1}) and cache.get("c") == (True, {"n": 3})
+    cache.discard("a")
+    assert cache.get("a") == (False, None)
+
+
+def test_lru_cache_entries_expire():
+    cache = LRUCache(ttl=-1)
+    cache.put("a", {"n": 1})
+    assert cache.get("a") == (False, None)
+
+
+class CountingBackend:
+    # Wraps a backend, counting the reads and writes that reach it
+    def __init__(self, inner):
+        self.inner = inner
+        self.loads = self.saves = 0
+
+    def load(self, sid):
+        self.loads += 1
+        return self.inner.load(sid)
+
+    def save(self, sid, data, expires):
+        self.saves += 1
+        self.inner.save(sid, data, expires)
+
+    def delete(self, sid):
+        self.inner.delete(sid)
+
+    def purge(self):
+        self.inner.purge()
+
+
+def worker(backend):
+    # A minimal app standing in for one worker process
+    app = Flask(__name__)
+    app.session_interface = ServerSideSessionInterface(backend)
+
+    @app.route("/login", methods=["POST"])
+    def login():
+        session["user_id"] = 1
+        return "ok"
+
+    @app.route("/me")
+    def me():
+        return jsonify(session.get("user_id"))
+
+    @app.route("/logout", methods=["POST"])
+    def logout():
+        session.clear()
+        return "ok"
+
+    return app
+
+
+def session_cookie(client):
+    cookie = client.get_cookie("session")
+    return cookie.value if cookie is not None else None
+
+
+def test_workers_share_logins_through_the_backend(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = worker(SqliteSessionBackend(path)).test_client()
+    second_app = worker(SqliteSessionBackend(path))
+    second = second_app.test_client()
+
+    first.post("/login")
+    sid = session_cookie(first)
+    assert sid and "user_id" not in sid # The cookie holds only the id
+    second.set_cookie("session", sid)
+    assert second.get("/me").get_json() == 1
+
+    first.post("/logout")
+    assert session_cookie(first) is None
+    assert second.get("/me").get_json() == 1 # Still cached in the second worker, within the TTL
+    second_app.session_interface.cache.ttl = -1
+    assert second.get("/me").get_json() is None
+
+
+def test_cached_sessions_cost_no_backend_reads_or_writes():
+    backend = CountingBackend(MemorySessionBackend())
+    app = worker(backend)
+    client = app.test_client()
+    client.post("/login")
+    assert backend.saves == 1
+    for _ in range(5):
+        assert client.get("/me").get_json() == 1
+    assert backend.loads == 0 and backend.saves == 1 # Served by the LRU cache, never rewritten
+    forged = app.test_client()
+    forged.set_cookie("session", "forged")
+    assert forged.get("/me").get_json() is None and forged.get("/me").get_json() is None
+    assert backend.loads == 1 # The miss is cached too
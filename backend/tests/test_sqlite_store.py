@@ -0,0 +1,93 @@
+# backend/tests/test_sqlite_store.py
+
+import threading
+
+import pytest
+
+from sqlite_store import SqliteStore
+from store import Store
+
+
+def sample_data():
+    return {
+        "clients": [{"id": 1, "name": "Acme"}, {"id": 2, "name": "Bolt"}],
+        "projects": [{"id": 1, "client_id": 1, "project_name": "Site"}, {"id": 2, "client_id": 2, "project_name": "App"},
+                     {"id": 3, "client_id": 1, "project_name": "Shop"}],
+        "tasks": [],
+    }
+
+
+def exercise(db):
+    # The same writes on either backend; returns everything the store can be asked
+    events = []
+    db.subscribe(lambda name, op, old, new: events.append((name, op, old and old["id"], new and new["id"])))
+    db["clients"].insert({"id": db["clients"].next_id(), "name": "Core"})
+    db["projects"].update(2, {"client_id": 3, "status": "Active"})
+    db["projects"].delete(1)
+    first = db["tasks"].reserve_ids(3)
+    db["tasks"].insert_many([{"id": first + offset, "project_id": 3, "name": f"Task {offset}"} for offset in range(3)])
+    db["tasks"].update_many([first, first + 2, 99], lambda task: {"done": True} if task["id"] != first else None)
+    db["tasks"].delete_where(lambda task: task["name"] == "Task 1")
+    return {
+        "events": events,
+        "all": {name: db[name].all() for name in ("clients", "projects", "tasks")},
+        "get": (db["clients"].get(3), db["clients"].get(9), db["clients"].get("3")),
+        "get_many": db["projects"].get_many([3, 2, 1, "x"]),
+        "referencing": (db["projects"].referencing("client_id", 3), db["tasks"].referencing("project_id", 3)),
+        "pages": (db["tasks"].page(None, 1), db["tasks"].page(first, 1), db["clients"].page(None, 50)),
+        "versions": {name: db.version(name) for name in ("clients", "projects", "tasks")},
+        "sequence": db["tasks"].sequence,
+        "len": len(db["projects"]),
+    }
+
+
+def test_behaves_like_the_memory_store(tmp_path):
+    assert exercise(SqliteStore(str(tmp_path / "store.db"), sample_data())) == exercise(Store(sample_data()))
+
+
+def test_data_sequences_and_epoch_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "store.db")
+    db = SqliteStore(path, sample_data())
+    db["clients"].insert({"id": db["clients"].next_id(), "name": "Core"})
+    db["clients"].delete(3)
+    reopened = SqliteStore(path, sample_data()) # Seeding skips collections that have data
+    assert reopened.epoch == db.epoch
+    assert [client["name"] for client in reopened["clients"]] == ["Acme", "Bolt"]
+    assert reopened["clients"].next_id() == 4 # Ids are never reused
+    assert SqliteStore(str(tmp_path / "other.db")).epoch != db.epoch
+
+
+def test_workers_share_ids_and_versions(tmp_path):
+    path = str(tmp_path / "store.db")
+    first, second = SqliteStore(path, sample_data()), SqliteStore(path)
+    ids = [first["clients"].next_id(), second["clients"].next_id(), first["clients"].reserve_ids(2), second["clients"].next_id()]
+    assert ids == [3, 4, 5, 7]
+    before = second.version("clients")
+    first["clients"].update(1, {"name": "Acme Ltd"})
+    assert second.version("clients") == before + 1
+    assert second["clients"].get(1)["name"] == "Acme Ltd"
+
+
+def test_consistent_read_is_one_snapshot(tmp_path):
+    db = SqliteStore(str(tmp_path / "store.db"), sample_data())
+    with db.consistent_read("clients") as view:
+        assert view["clients"].get(1)["name"] == "Acme"
+        writer = threading.Thread(target=lambda: db["clients"].update(1, {"name": "Renamed"}))
+        writer.start()
+        writer.join()
+        assert view["clients"].get(1)["name"] == "Acme"
+    assert db["clients"].get(1)["name"] == "Renamed"
+
+
+def test_a_failed_write_hook_rolls_the_write_back(tmp_path):
+    db = SqliteStore(str(tmp_path / "store.db"), sample_data())
+    notified = []
+    db.subscribe(lambda *change: notified.append(change))
+
+    def hook(conn, name, op, old, new):
+        raise RuntimeError("journal full")
+    db.on_write(hook)
+    version = db.version("clients")
+    with pytest.raises(RuntimeError):
+        db["clients"].insert({"id": 3, "name": "Core"})
+    assert db["clients"].get(3) is None and db.version("clients") == version and not notified
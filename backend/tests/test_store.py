@@ -0,0 +1,55 @@
+# backend/tests/test_store.py
+
+from store import Store
+
+
+def sample_store():
+    return Store({"clients": [{"id": record_id, "name": f"Client {record_id}"} for record_id in range(1, 6)]})
+
+
+def test_a_view_stays_frozen_while_writes_land():
+    db = sample_store()
+    with db.consistent_read("clients") as view:
+        db["clients"].insert({"id": 6, "name": "New"})
+        db["clients"].update(1, {"name": "Renamed"})
+        db["clients"].delete(2)
+        assert [record["id"] for record in view["clients"].all()] == [1, 2, 3, 4, 5]
+        assert view["clients"].get(1)["name"] == "Client 1"
+    assert [record["id"] for record in db["clients"].all()] == [1, 3, 4, 5, 6]
+
+
+def test_writes_after_a_released_view_copy_nothing():
+    db = sample_store()
+    clients = db["clients"]
+    with db.consistent_read():
+        pass
+    rows = clients._rows
+    clients.insert({"id": 6, "name": "New"})
+    assert clients._rows is rows
+
+
+def test_only_the_last_live_view_keeps_the_copy_on_write():
+    db = sample_store()
+    clients = db["clients"]
+    with db.consistent_read() as first:
+        with db.consistent_read():
+            pass
+        clients.insert({"id": 6, "name": "Copied"}) # `first` is still alive
+        assert len(first["clients"].all()) == 5
+        with db.consistent_read():
+            pass # A view of the new dict, released before `first`
+    rows = clients._rows
+    clients.insert({"id": 7, "name": "Not copied"})
+    assert clients._rows is rows
+
+
+def test_an_exception_in_the_block_releases_the_view():
+    db = sample_store()
+    try:
+        with db.consistent_read():
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    rows = db["clients"]._rows
+    db["clients"].insert({"id": 6, "name": "New"})
+    assert db["clients"]._rows is rows
@@ -0,0 +1,26 @@
+# backend/tests/test_streaming.py
+
+import app
+from streaming import STREAM_PAGE_SIZE, iter_json_array
+from store import Store
+
+
+def test_stream_sends_the_same_body(client):
+    for path in ("/api/clients", "/api/quotes", "/api/tasks?fields=id,name"):
+        streamed = client.get(path + ("&" if "?" in path else "?") + "stream=1")
+        assert streamed.status_code == 200
+        assert streamed.get_data() == client.get(path).get_data()
+
+
+def test_stream_walks_every_page():
+    db = Store({"clients": [{"id": i, "name": f"Client {i}"} for i in range(1, 2 * STREAM_PAGE_SIZE + 2)]})
+    encode = lambda rows: [app.app.json.dumpb(row) for row in rows]
+    body = b"".join(iter_json_array(db, "clients", encode))
+    assert app.app.json.loads(body) == list(db["clients"])
+
+
+def test_stream_with_a_page_is_refused(client):
+    for query in ("stream=1&limit=2", "stream=1&after=1", "stream=1&after=1&limit=2"):
+        response = client.get(f"/api/clients?{query}")
+        assert response.status_code == 400
+        assert "X-Next-Cursor" not in response.headers